@@ -0,0 +1,140 @@
+"""
+VANT AI: Semantic Answer Cache
+Reuses answers for questions that are near-duplicates of ones already answered,
+skipping retrieval and the Groq round trip entirely. With several worker processes, each
+keeps its own cache; a per-tenant version file tells the others when documents changed.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by (question embedding, model, tenant).
+    A lookup hits when a live entry for the same model and tenant has cosine similarity >= `threshold`.
+    Entries expire after `ttl_seconds` and the least-recently-used are evicted past `max_entries`.
+    `version_path(tenant)` names a file shared by all processes; invalidating replaces it, and a
+    process that sees it changed drops all of that tenant's entries (it can't know which sources changed).
+    """
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000,
+                 version_path: Optional[Callable[[Optional[str]], str]] = None):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self._versions = {}  # Tenant -> version file signature this process is in sync with
+        self.version_path = version_path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _version(self, tenant: Optional[str]):
+        if self.version_path is None: return None
+        try:
+            st = os.stat(self.version_path(tenant))
+            return st.st_ino, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _sync(self, tenant: Optional[str]):
+        """Drop the tenant's entries if another process changed its documents (lock held)."""
+        current = self._version(tenant)
+        if tenant in self._versions and self._versions[tenant] != current:
+            stale = [i for i, e in self._entries.items() if e["tenant"] == tenant]
+            for entry_id in stale:
+                del self._entries[entry_id]
+            self.invalidations += len(stale)
+        self._versions[tenant] = current
+
+    def _bump(self, tenant: Optional[str]):
+        """Tell the other processes the tenant's documents changed (lock held)."""
+        if self.version_path is None: return
+        path = self.version_path(tenant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, "w") as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(temp, path)  # New inode: a changed signature even within one mtime tick
+        self._versions[tenant] = self._version(tenant)
+
+    def lookup(self, vector: List[float], model: str, tenant: Optional[str] = None) -> Optional[dict]:
+        """Return {"answer", "sources", "question", "similarity"} for the closest live match, or None."""
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            self._sync(tenant)
+            for entry_id in [i for i, e in self._entries.items() if now - e["created_at"] > self.ttl_seconds]:
+                del self._entries[entry_id]
+
+            candidates = [(i, e) for i, e in self._entries.items() if e["model"] == model and e["tenant"] == tenant]
+            if candidates:
+                similarities = np.stack([e["vector"] for _, e in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return {"answer": entry["answer"], "sources": list(entry["sources"]), "question": entry["question"], "similarity": float(similarities[best])}
+            self.misses += 1
+            return None
+
+    def store(self, question: str, vector: List[float], model: str, answer: str, sources: List[str], tenant: Optional[str] = None):
+        with self._lock:
+            self._sync(tenant)
+            self._entries[self._next_id] = {
+                "question": question,
+                "vector": self._normalize(vector),
+                "model": model,
+                "tenant": tenant,
+                "answer": answer,
+                "sources": set(sources),
+                "created_at": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_sources(self, sources: Iterable[str], tenant: Optional[str] = None) -> int:
+        """
+        Drop the tenant's entries citing any of `sources`, plus its entries that cited nothing
+        (a "not found" answer may change once new content is indexed).
+        """
+        changed = set(sources)
+        with self._lock:
+            self._sync(tenant)
+            self._bump(tenant)
+            stale = [i for i, e in self._entries.items() if e["tenant"] == tenant and (not e["sources"] or e["sources"] & changed)]
+            for entry_id in stale:
+                del self._entries[entry_id]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -2,22 +2,36 @@
 # This file handles HTTP requests, authentication, and orchestrates the AI engine.
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from rag_engine import RAGEngine
-from langchain_core.messages import HumanMessage, AIMessage
 import os  
 import shutil
+import json
+import uuid
+import base64
+import tempfile
+import asyncio
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 
 # Local Modules
 import session_db
 import auth
-from config import HOST, PORT, DEBUG, AVAILABLE_MODELS
+from jobs import JobManager
+from history import HistoryManager
+import loaders
+from batch_query import parse_questions
+import metrics
+from config import HOST, PORT, DEBUG, AVAILABLE_MODELS, INGEST_WORKERS, MAX_CONCURRENT_LLM_CALLS, TENANT_ISOLATION, BATCH_MAX_QUESTIONS
+from config import HISTORY_MAX_TURNS, HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_BATCH, SESSIONS_PAGE_SIZE, HISTORY_PAGE_SIZE
 
 # ---------------------------------------------------------
 # 1. SETUP & INITIALIZATION
@@ -26,24 +40,39 @@ from config import HOST, PORT, DEBUG, AVAILABLE_MODELS
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("VANT-AI")
 
-session_db.init_db()
 rag_engine: Optional[RAGEngine] = None
 
+# Blocking engine work runs off the event loop: a bounded job pool for parsing/embedding uploads,
+# and a semaphore capping concurrent LLM calls so a burst of chats can't exhaust Groq rate limits.
+# Spawned PDF workers re-import the launching script as __mp_main__; under `python app.py` that is
+# this module, and they must not open the database or start job threads.
+if __name__ != "__mp_main__":
+    session_db.init_db()
+    job_manager = JobManager(workers=INGEST_WORKERS, session_factory=session_db.SessionLocal)
+llm_slots = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+history_manager = HistoryManager(HISTORY_MAX_TURNS, HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_BATCH)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles background initialization of the AI Engine to ensure fast startup."""
     import threading
     def load_engine():
+        # Staged: keyword search + LLM come online first (chat works), then the embedding model and ChromaDB
         global rag_engine
         try:
             logger.info("Initializing RAG Engine...")
-            rag_engine = RAGEngine()
+            rag_engine = RAGEngine(lazy=True)
+            logger.info("RAG Engine serving keyword search; loading embeddings and vector store...")
+            rag_engine.warm_up()
             logger.info("RAG Engine ready.")
         except Exception as e:
             logger.error(f"Engine Startup Error: {e}")
 
+    loaders.start_pdf_pool()  # Before any upload thread runs, so PDF workers never inherit their state
     threading.Thread(target=load_engine, daemon=True).start()
     yield
+    job_manager.shutdown()
+    loaders.shutdown_pdf_pool()
 
 app = FastAPI(title="VANT AI API", debug=DEBUG, lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -54,6 +83,10 @@ def get_engine():
         raise HTTPException(status_code=503, detail="AI engine is still warming up. Please try again in 30 seconds.")
     return rag_engine
 
+def _tenant_id(user: session_db.User) -> Optional[str]:
+    """The user's workspace: their own document stores, or the shared one when isolation is off."""
+    return f"user_{user.id}" if TENANT_ISOLATION else None
+
 # ---------------------------------------------------------
 # 2. CORE UI & UTILITY ROUTES
 # ---------------------------------------------------------
@@ -66,12 +99,33 @@ async def serve_ui():
 
 @app.get("/health")
 async def health():
-    return {"status": "online"}
+    """Liveness plus per-component readiness (seconds from engine start until each came online)."""
+    if rag_engine is None:
+        return {"status": "online", "engine": "starting"}
+    return {"status": "online", "engine": rag_engine.readiness(), "tenants_loaded": len(rag_engine.tenants.loaded())}
 
 @app.get("/models")
 async def list_models():
     return {"models": AVAILABLE_MODELS}
 
+@app.get("/cache/stats")
+async def cache_stats(engine: RAGEngine = Depends(get_engine)):
+    """Hit/miss counters for the semantic answer cache and the embedding cache (for threshold tuning)."""
+    return {"answer_cache": engine.answer_cache.stats(), "embedding_cache": engine.embeddings.stats() if engine.embeddings else None}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-stage latency histograms (retrieval, prompt assembly, LLM TTFT/total, ingestion) in Prometheus format."""
+    counters = {}
+    if rag_engine:
+        counters = {
+            "vant_answer_cache_hits_total": rag_engine.answer_cache.hits,
+            "vant_answer_cache_misses_total": rag_engine.answer_cache.misses,
+            "vant_tenant_evictions_total": rag_engine.tenants.evictions,
+        }
+        if rag_engine.reranker: counters["vant_rerank_timeouts_total"] = rag_engine.reranker.timeouts
+    return PlainTextResponse(metrics.registry.render(counters), media_type="text/plain; version=0.0.4")
+
 @app.post("/models/change")
 async def switch_llm(model_id: str = Form(...), engine: RAGEngine = Depends(get_engine)):
     """Dynamically switch the underlying LLM model (e.g., Llama 3 -> Mixtral)."""
@@ -83,7 +137,7 @@ async def switch_llm(model_id: str = Form(...), engine: RAGEngine = Depends(get_
 # ---------------------------------------------------------
 
 @app.post("/signup")
-async def register(username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(session_db.get_db)):
+def register(username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(session_db.get_db)):
     if db.query(session_db.User).filter(session_db.User.username == username).first():
         return JSONResponse({"status": "error", "message": "Username taken"}, status_code=400)
     
@@ -93,7 +147,7 @@ async def register(username: str = Form(...), email: str = Form(...), password:
     return {"status": "success", "message": "Account created"}
 
 @app.post("/login")
-async def authenticate(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(session_db.get_db)):
+def authenticate(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(session_db.get_db)):
     user = db.query(session_db.User).filter(session_db.User.username == form_data.username).first()
     if not user or not auth.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
@@ -106,44 +160,78 @@ async def authenticate(form_data: OAuth2PasswordRequestForm = Depends(), db: Ses
 # ---------------------------------------------------------
 
 @app.get("/documents")
-async def list_files(engine: RAGEngine = Depends(get_engine)):
-    return {"documents": engine.list_documents()}
+def list_files(engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
+    return {"documents": engine.list_documents(_tenant_id(user))}
+
+def _save_upload(file: UploadFile) -> str:
+    """Spool an upload to a unique temp path, keeping its extension for loader detection."""
+    path = os.path.join(tempfile.gettempdir(), f"vant_{uuid.uuid4().hex}_{os.path.basename(file.filename)}")
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+    return path
 
 @app.post("/process")
-async def upload_document(file: UploadFile = File(...), engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
-    """Upload and index a document into the secure RAG knowledge base."""
-    temp_file = f"temp_{file.filename}"
-    try:
-        with open(temp_file, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        engine.process_document(temp_file)
-        return {"status": "success", "message": f"{file.filename} indexed successfully."}
-    except Exception as e:
-        logger.error(f"Index Error: {e}")
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
-    finally:
-        if os.path.exists(temp_file): os.remove(temp_file)
+async def upload_document(files: List[UploadFile] = File(...), engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
+    """Queue one or more documents for background indexing; poll /jobs/{job_id} for progress."""
+    jobs = []
+    for file in files:
+        try:
+            path = await run_in_threadpool(_save_upload, file)
+        except Exception as e:
+            logger.error(f"Upload Error: {e}")
+            return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
+        # submit() records the job in the database; keep those writes off the event loop
+        job = await run_in_threadpool(job_manager.submit, engine, os.path.basename(file.filename), path, user.id, _tenant_id(user))
+        jobs.append({"job_id": job.id, "filename": job.filename})
+    return {"status": "success", "jobs": jobs}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, user: session_db.User = Depends(auth.get_current_user)):
+    """Report an ingestion job's stage, chunk counts and throughput."""
+    job = job_manager.status(job_id, user.id)
+    if job is None: raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "job": job}
 
 @app.get("/summarize/{filename}")
 async def get_summary(filename: str, engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
-    return {"status": "success", "summary": engine.summarize_document(filename)}
+    summary = await engine.asummarize_document(filename, _tenant_id(user), llm_slots)  # One slot per map/reduce call
+    return {"status": "success", "summary": summary}
 
 @app.delete("/documents/{filename}")
-async def remove_document(filename: str, engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
-    engine.delete_document(filename)
+def remove_document(filename: str, engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
+    engine.delete_document(filename, _tenant_id(user))
     return {"status": "success", "message": f"{filename} deleted."}
 
 # ---------------------------------------------------------
 # 5. CHAT ENGINE (Multi-turn RAG)
 # ---------------------------------------------------------
 
+def _encode_cursor(row) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps([row.created_at.isoformat(), row.id]).encode()).decode()
+
+def _keyset_page(query, model, cursor: Optional[str], limit: int):
+    """Rows strictly older than the cursor, newest first, plus the cursor for the next page (None on the last)."""
+    if cursor:
+        try:
+            created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            created_at = datetime.fromisoformat(created_at)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(or_(model.created_at < created_at, and_(model.created_at == created_at, model.id < row_id)))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    return page, _encode_cursor(page[-1]) if len(rows) > limit else None
+
 @app.get("/sessions")
-async def get_sessions(db: Session = Depends(session_db.get_db), user: session_db.User = Depends(auth.get_current_user)):
-    sessions = db.query(session_db.ChatSession).filter(session_db.ChatSession.user_id == user.id).order_by(session_db.ChatSession.created_at.desc()).all()
-    return {"sessions": [{"id": s.id, "title": s.title, "created_at": s.created_at.isoformat()} for s in sessions]}
+def get_sessions(limit: int = Query(SESSIONS_PAGE_SIZE, ge=1, le=200), cursor: Optional[str] = None, db: Session = Depends(session_db.get_db), user: session_db.User = Depends(auth.get_current_user)):
+    """The user's sessions, newest first; pass `next_cursor` back as `cursor` for older ones."""
+    query = db.query(session_db.ChatSession).filter(session_db.ChatSession.user_id == user.id)
+    sessions, next_cursor = _keyset_page(query, session_db.ChatSession, cursor, limit)
+    return {"sessions": [{"id": s.id, "title": s.title, "created_at": s.created_at.isoformat()} for s in sessions], "next_cursor": next_cursor}
 
 @app.post("/sessions")
-async def start_session(db: Session = Depends(session_db.get_db), user: session_db.User = Depends(auth.get_current_user)):
+def start_session(db: Session = Depends(session_db.get_db), user: session_db.User = Depends(auth.get_current_user)):
     session = session_db.ChatSession(user_id=user.id)
     db.add(session)
     db.commit()
@@ -151,40 +239,148 @@ async def start_session(db: Session = Depends(session_db.get_db), user: session_
     return {"session_id": session.id, "title": session.title}
 
 @app.get("/sessions/{session_id}/history")
-async def get_history(session_id: str, db: Session = Depends(session_db.get_db), user: session_db.User = Depends(auth.get_current_user)):
-    msgs = db.query(session_db.ChatMessage).filter(session_db.ChatMessage.session_id == session_id).order_by(session_db.ChatMessage.created_at.asc()).all()
-    return {"messages": [{"role": m.role, "content": m.content} for m in msgs]}
+def get_history(session_id: str, limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=500), cursor: Optional[str] = None, db: Session = Depends(session_db.get_db), user: session_db.User = Depends(auth.get_current_user)):
+    """The latest `limit` messages in chronological order; `next_cursor` fetches the page before them."""
+    owned = db.query(session_db.ChatSession.id).filter(session_db.ChatSession.id == session_id, session_db.ChatSession.user_id == user.id).first()
+    if not owned: raise HTTPException(status_code=404, detail="Session not found")
+    query = db.query(session_db.ChatMessage).filter(session_db.ChatMessage.session_id == session_id)
+    msgs, next_cursor = _keyset_page(query, session_db.ChatMessage, cursor, limit)
+    return {"messages": [{"role": m.role, "content": m.content} for m in reversed(msgs)], "next_cursor": next_cursor}
 
-@app.post("/chat")
-async def chat_interaction(message: str = Form(...), session_id: str = Form(...), db: Session = Depends(session_db.get_db), engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
-    """Main RAG chat endpoint. Connects user input to document knowledge."""
-    # 1. Verify access
+def _load_chat_context(db: Session, session_id: str, user: session_db.User):
+    """Verify session ownership and load the token-budgeted history window (summary + recent turns)."""
     session = db.query(session_db.ChatSession).filter(session_db.ChatSession.id == session_id, session_db.ChatSession.user_id == user.id).first()
     if not session: raise HTTPException(status_code=404, detail="Session not found")
-        
-    # 2. Reconstruct chat history for the AI
-    history_records = db.query(session_db.ChatMessage).filter(session_db.ChatMessage.session_id == session_id).order_by(session_db.ChatMessage.created_at.asc()).all()
-    history = [HumanMessage(content=m.content) if m.role == 'user' else AIMessage(content=m.content) for m in history_records]
-    
-    # 3. Process with AI Engine
+    return session, history_manager.load(db, session)
+
+async def _refresh_history_summary(session_id: str, engine: RAGEngine):
+    """Background task: fold messages that left the history window into the session's rolling summary."""
+    db = session_db.SessionLocal()
     try:
-        result = engine.query(message, history)
+        session = await run_in_threadpool(db.get, session_db.ChatSession, session_id)
+        pending = await run_in_threadpool(history_manager.pending_summary, db, session)
+        if not pending: return
+        async with llm_slots:
+            summary = await engine.asummarize_history(session.summary, HistoryManager.format_messages(pending))
+        session.summary = summary
+        session.summarized_until = pending[-1].id
+        await run_in_threadpool(db.commit)
     except Exception as e:
-        logger.error(f"Chat Engine Error: {str(e)}")
-        return JSONResponse({"status": "error", "message": f"AI Engine failed to process: {str(e)}"}, status_code=500)
-    
-    # 4. Save interactions to database
-    db.add(session_db.ChatMessage(session_id=session_id, role='user', content=message))
-    db.add(session_db.ChatMessage(session_id=session_id, role='assistant', content=result["answer"]))
+        logger.error(f"History Summary Error: {e}")
+    finally:
+        db.close()
+
+def _save_exchange(db: Session, session: session_db.ChatSession, message: str, answer: str):
+    """Persist one user/assistant turn and auto-title the session on its first message."""
+    db.add(session_db.ChatMessage(session_id=session.id, role='user', content=message))
+    db.add(session_db.ChatMessage(session_id=session.id, role='assistant', content=answer))
     
     # Auto-title first message
     if session.title == "New Chat":
         session.title = message[:30] + "..." if len(message) > 30 else message
         
     db.commit()
-    return {"status": "success", "response": result["answer"], "sources": result["sources"]}
+
+def _parse_retrieval_options(raw: Optional[str]) -> Optional[dict]:
+    if not raw: return None
+    try:
+        options = json.loads(raw)
+        if not isinstance(options, dict): raise ValueError("retrieval must be a JSON object")
+        return RAGEngine.validate_retrieval_options(options)
+    except ValueError as e:  # Includes json.JSONDecodeError
+        raise HTTPException(status_code=400, detail=f"Invalid retrieval options: {e}")
+
+@app.post("/chat")
+async def chat_interaction(background_tasks: BackgroundTasks, message: str = Form(...), session_id: str = Form(...), retrieval: Optional[str] = Form(None), db: Session = Depends(session_db.get_db), engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
+    """
+    Main RAG chat endpoint. Connects user input to document knowledge.
+    `retrieval` is an optional JSON object overriding k, fetch_k, mmr_lambda, weights or fusion for this request.
+    """
+    options = _parse_retrieval_options(retrieval)
+    # 1. Verify access & reconstruct chat history for the AI
+    session, history = await run_in_threadpool(_load_chat_context, db, session_id, user)
+    
+    # 2. Process with AI Engine
+    try:
+        trace = metrics.start_trace() if DEBUG else None
+        async with llm_slots:
+            result = await engine.aquery(message, history, options, _tenant_id(user))
+    except Exception as e:
+        logger.error(f"Chat Engine Error: {str(e)}")
+        return JSONResponse({"status": "error", "message": f"AI Engine failed to process: {str(e)}"}, status_code=500)
+    
+    # 3. Save interactions to database
+    await run_in_threadpool(_save_exchange, db, session, message, result["answer"])
+    background_tasks.add_task(_refresh_history_summary, session_id, engine)
+    response = {"status": "success", "response": result["answer"], "sources": result["sources"], "cached": result.get("cached", False)}
+    if trace is not None: response["trace"] = trace  # Per-stage timings, debug mode only
+    return response
+
+def _persist_streamed_exchange(session_pk: str, message: str, answer: str):
+    db = session_db.SessionLocal()
+    try:
+        _save_exchange(db, db.get(session_db.ChatSession, session_pk), message, answer)
+    finally:
+        db.close()
+
+@app.post("/chat/stream")
+async def chat_stream(message: str = Form(...), session_id: str = Form(...), retrieval: Optional[str] = Form(None), db: Session = Depends(session_db.get_db), engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
+    """Streaming variant of /chat: sends sources first, then answer tokens as server-sent events."""
+    options = _parse_retrieval_options(retrieval)
+    session, history = await run_in_threadpool(_load_chat_context, db, session_id, user)
+    session_pk = session.id
+    tenant = _tenant_id(user)
+
+    def sse(payload: dict) -> str:
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def event_stream():
+        answer = []
+        trace = metrics.start_trace() if DEBUG else None
+        try:
+            async for event in engine.astream_query(message, history, options, tenant, llm_slots=llm_slots):
+                if event["type"] == "token":
+                    answer.append(event["content"])
+                yield sse(event)
+        except Exception as e:
+            logger.error(f"Chat Stream Error: {str(e)}")
+            yield sse({"type": "error", "message": f"AI Engine failed to process: {str(e)}"})
+            return
+
+        # The request-scoped DB session may already be closed once streaming ends, so persist with a fresh one
+        await run_in_threadpool(_persist_streamed_exchange, session_pk, message, "".join(answer))
+        yield sse({"type": "done", "trace": trace} if trace is not None else {"type": "done"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_refresh_history_summary, session_pk, engine),
+    )
+
+@app.post("/batch")
+async def batch_questions(file: UploadFile = File(...), retrieval: Optional[str] = Form(None), engine: RAGEngine = Depends(get_engine), user: session_db.User = Depends(auth.get_current_user)):
+    """
+    Answer a JSONL file of standalone questions ({"id": ..., "question": ...} per line) in bulk,
+    streaming one JSON result per line as each finishes. Resubmit the unanswered ones to resume.
+    """
+    options = _parse_retrieval_options(retrieval)
+    try:
+        items = parse_questions((await file.read()).decode("utf-8").splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid question file: {e}")
+    if not items: raise HTTPException(status_code=400, detail="The question file is empty.")
+    if len(items) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch.")
+
+    async def result_lines():
+        async for result in engine.abatch_query(items, options, _tenant_id(user), llm_slots=llm_slots):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
+    # Development convenience only; launch with `uvicorn app:app` or `python serve.py`
     import uvicorn
     uvicorn.run(app, host=HOST, port=PORT)
 
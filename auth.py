@@ -1,11 +1,12 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import threading
+import time
 import bcrypt
 import jwt
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_CACHE_TTL_SECONDS
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 import session_db
 
 # Password hashing setup (Direct bcrypt to avoid passlib-bcrypt 4.0 incompatibility)
@@ -30,7 +31,29 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(session_db.get_db)):
+# Token -> (expiry, detached User): authenticated requests within the TTL skip the user lookup
+_user_cache: Dict[str, Tuple[float, session_db.User]] = {}
+_user_cache_lock = threading.Lock()
+USER_CACHE_MAX_ENTRIES = 10_000
+
+def _cached_user(token: str) -> Optional[session_db.User]:
+    with _user_cache_lock:
+        hit = _user_cache.get(token)
+        if hit is None: return None
+        if hit[0] < time.monotonic():
+            del _user_cache[token]
+            return None
+        return hit[1]
+
+def _cache_user(token: str, user: session_db.User):
+    now = time.monotonic()
+    with _user_cache_lock:
+        if len(_user_cache) >= USER_CACHE_MAX_ENTRIES:
+            for key in [k for k, (expires, _) in _user_cache.items() if expires < now] or list(_user_cache)[:len(_user_cache) // 2]:
+                del _user_cache[key]
+        _user_cache[token] = (now + AUTH_CACHE_TTL_SECONDS, user)
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -43,8 +66,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-        
-    user = db.query(session_db.User).filter(session_db.User.username == username).first()
-    if user is None:
-        raise credentials_exception
+
+    user = _cached_user(token)
+    if user is not None: return user
+
+    with session_db.SessionLocal() as db:
+        user = db.query(session_db.User).filter(session_db.User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        db.expunge(user)  # Detached copy: safe to share across requests (only column attributes are used)
+    _cache_user(token, user)
     return user
@@ -0,0 +1,128 @@
+"""
+VANT AI: Batch Questions
+Answers a JSONL file of standalone questions (compliance checklists, evaluation sets) without
+a chat session: RAGEngine.abatch_query embeds and retrieves them in bulk and sends the Groq
+calls with bounded concurrency, retrying rate-limited ones (retry.py). The same engine path backs
+POST /batch; this script runs it in-process over the local stores.
+
+Input lines are {"id": ..., "question": "..."} (the id defaults to the line number). Each result
+is appended to the output as soon as it finishes, so an interrupted run resumes with the
+questions that have no successful result yet.
+
+Usage:
+    python batch_query.py questions.jsonl --output answers.jsonl
+    python batch_query.py questions.jsonl --output answers.jsonl --user alice --retrieval '{"k": 6}'
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Iterable, List, Optional
+
+from config import BATCH_MAX_CONCURRENCY, TENANT_ISOLATION
+
+
+def parse_questions(lines: Iterable[str]) -> List[dict]:
+    """[{"id", "question"}] from JSONL lines; raises ValueError on malformed lines or duplicate ids."""
+    items, seen = [], set()
+    for number, line in enumerate(lines, start=1):
+        if not line.strip(): continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {number}: {e}")
+        if not isinstance(record, dict) or not isinstance(record.get("question"), str) or not record["question"].strip():
+            raise ValueError(f"line {number}: expected an object with a non-empty \"question\"")
+        item_id = str(record.get("id", number))
+        if item_id in seen: raise ValueError(f"line {number}: duplicate id {item_id!r}")
+        seen.add(item_id)
+        items.append({"id": item_id, "question": record["question"]})
+    return items
+
+
+# ---------------------------------------------------------
+# Resumable output
+# ---------------------------------------------------------
+
+def completed_ids(output_path: str) -> set:
+    """Ids already answered without error in a previous run's output."""
+    done = set()
+    if not os.path.exists(output_path): return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:  # Line cut off by a crash; its question runs again
+                continue
+            if isinstance(result, dict) and result.get("error") is None: done.add(str(result.get("id")))
+    return done
+
+def open_for_append(output_path: str):
+    """Append handle, first dropping a partial last line left by an interrupted run."""
+    if os.path.exists(output_path):
+        with open(output_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    return open(output_path, "a", encoding="utf-8")
+
+
+def _tenant_for(username: Optional[str]) -> Optional[str]:
+    """The user's workspace, as the API resolves it (shared workspace without a user or isolation)."""
+    if not username or not TENANT_ISOLATION: return None
+    import session_db
+    db = session_db.SessionLocal()
+    try:
+        user = db.query(session_db.User).filter(session_db.User.username == username).first()
+    finally:
+        db.close()
+    if user is None: raise SystemExit(f"Unknown user: {username}")
+    return f"user_{user.id}"
+
+
+async def run(engine, items: List[dict], output_path: str, retrieval: Optional[dict], tenant: Optional[str], concurrency: int) -> int:
+    failed = 0
+    with open_for_append(output_path) as out:
+        async for result in engine.abatch_query(items, retrieval, tenant, max_concurrency=concurrency):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if result["error"] is not None: failed += 1
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions against the knowledge base.")
+    parser.add_argument("questions", help="JSONL file, one {\"id\", \"question\"} object per line")
+    parser.add_argument("--output", required=True, help="JSONL results; rerun with the same path to resume")
+    parser.add_argument("--user", help="Answer from this user's documents (when TENANT_ISOLATION is on)")
+    parser.add_argument("--retrieval", help="JSON object overriding k, fetch_k, mmr_lambda, weights or fusion")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY, help="Parallel Groq calls")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from rag_engine import RAGEngine
+    try:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            items = parse_questions(f)
+        retrieval = json.loads(args.retrieval) if args.retrieval else None
+        if retrieval is not None and not isinstance(retrieval, dict): raise ValueError("--retrieval must be a JSON object")
+        retrieval = RAGEngine.validate_retrieval_options(retrieval)
+    except ValueError as e:
+        raise SystemExit(f"Invalid input: {e}")
+
+    done = completed_ids(args.output)
+    pending = [item for item in items if item["id"] not in done]
+    print(f"{len(items)} questions, {len(items) - len(pending)} already answered, {len(pending)} to run", flush=True)
+    if not pending: return
+
+    tenant = _tenant_for(args.user)
+    engine = RAGEngine()
+    failed = asyncio.run(run(engine, pending, args.output, retrieval, tenant, args.concurrency))
+    print(f"Answered {len(pending) - failed}, failed {failed}; results in {args.output}")
+    if failed: sys.exit(1)  # Rerun to retry the failed questions
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+VANT AI: Cold-Start Benchmark
+Starts the API server and measures, from process launch: time until /health answers,
+time until each engine component reports ready, and time to the first successful /chat answer.
+With staged startup the first answer comes from keyword search and should not grow with corpus size.
+
+Usage:
+    python benchmarks/cold_start.py --port 9015 --output bench_cold_start.json
+    python benchmarks/cold_start.py --command "python my_server.py"   # custom launcher (must listen on --port)
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold start and time to first answer.")
+    parser.add_argument("--port", type=int, default=9015)
+    parser.add_argument("--command", help="Server command (default: uvicorn app:app on --port)")
+    parser.add_argument("--question", default="What documents are available?")
+    parser.add_argument("--timeout", type=float, default=300, help="Give up after this many seconds")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = shlex.split(args.command) if args.command else [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"]
+
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=REPO_DIR)
+    elapsed = lambda: round(time.perf_counter() - start, 3)
+    result = {"health_s": None, "components_s": {}, "first_answer_s": None, "fully_ready_s": None, "error": None}
+
+    try:
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            headers, session_id = None, None
+            while time.perf_counter() - start < args.timeout:
+                if server.poll() is not None:
+                    result["error"] = f"Server exited with code {server.returncode}"
+                    break
+                try:
+                    health = client.get("/health").json()
+                except httpx.TransportError:
+                    time.sleep(0.05)
+                    continue
+                if result["health_s"] is None: result["health_s"] = elapsed()
+
+                engine = health.get("engine")
+                if isinstance(engine, dict):
+                    for name, component in engine["components"].items():
+                        if component["ready"] and name not in result["components_s"]:
+                            result["components_s"][name] = elapsed()
+                    if engine.get("error"):
+                        result["error"] = engine["error"]
+                        break
+
+                    # First answer: as soon as the engine accepts chats
+                    if result["first_answer_s"] is None:
+                        if headers is None:
+                            username = f"coldstart_{uuid.uuid4().hex[:8]}"
+                            client.post("/signup", data={"username": username, "email": f"{username}@bench.local", "password": "bench"})
+                            token = client.post("/login", data={"username": username, "password": "bench"}).json()["access_token"]
+                            headers = {"Authorization": f"Bearer {token}"}
+                            session_id = client.post("/sessions", headers=headers).json()["session_id"]
+                        response = client.post("/chat", data={"message": args.question, "session_id": session_id}, headers=headers)
+                        if response.status_code == 200 and response.json().get("status") == "success":
+                            result["first_answer_s"] = elapsed()
+                        elif response.status_code != 503:
+                            result["error"] = f"/chat returned {response.status_code}: {response.text[:200]}"
+                            break
+
+                    if engine["ready"] and result["first_answer_s"] is not None:
+                        result["fully_ready_s"] = elapsed()
+                        break
+                time.sleep(0.05)
+            else:
+                result["error"] = "Timed out"
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+VANT AI: Chat Latency Under Upload Load
+Measures /chat latency (p50/p99) against a running server, first on its own and
+then while documents are being uploaded concurrently. A blocked event loop shows
+up as a large gap between the two phases.
+
+Usage:
+    uvicorn app:app --host 127.0.0.1 --port 9005      # or: python serve.py --workers 4
+    python benchmarks/load_test.py --chats 100 --concurrency 8 --uploaders 2 --output bench_load.json
+    python benchmarks/load_test.py --seed-docs 20 --uploaders 0    # throughput only, over a seeded corpus
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; returns None for an empty sample."""
+    if not values: return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p90_ms": round(percentile(latencies, 90) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+    }
+
+def make_upload_file(size_kb: int) -> str:
+    """Write a synthetic text document so the benchmark has no fixture dependency."""
+    path = os.path.join(tempfile.mkdtemp(prefix="vant_bench_"), "load_test.txt")
+    sentence = "VANT AI load test paragraph describing quarterly compliance controls and audit findings. "
+    with open(path, "w") as f:
+        f.write(sentence * (size_kb * 1024 // len(sentence) + 1))
+    return path
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    await client.post("/signup", data={"username": username, "email": f"{username}@bench.local", "password": password})
+    response = await client.post("/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def run_chats(client, headers, total, concurrency, question):
+    """Fire `total` chat requests with at most `concurrency` in flight; returns (latencies, errors, elapsed)."""
+    sessions = []
+    for _ in range(concurrency):
+        response = await client.post("/sessions", headers=headers)
+        sessions.append(response.json()["session_id"])
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total): queue.put_nowait(i)
+
+    async def worker(session_id):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/chat", data={"message": question, "session_id": session_id}, headers=headers)
+            if response.status_code == 200 and response.json().get("status") == "success":
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(s) for s in sessions))
+    return latencies, errors, time.perf_counter() - start
+
+async def upload(client, headers, name: str, payload: bytes) -> bool:
+    """Upload one file and wait for its ingestion job; True if it completed."""
+    response = await client.post("/process", files=[("files", (name, payload))], headers=headers)
+    if response.status_code != 200: return False
+    job_id = response.json()["jobs"][0]["job_id"]
+    while True:
+        job = (await client.get(f"/jobs/{job_id}", headers=headers)).json()["job"]
+        if job["status"] in ("completed", "failed"): return job["status"] == "completed"
+        await asyncio.sleep(0.2)
+
+async def run_uploads(client, headers, path, stop: asyncio.Event, uploaded: list):
+    """Upload the file under fresh names (waiting for each ingestion job) until `stop` is set."""
+    with open(path, "rb") as f:
+        payload = f.read()
+    while not stop.is_set():
+        name = f"bench_{uuid.uuid4().hex[:8]}.txt"
+        if await upload(client, headers, name, payload):
+            uploaded.append(name)
+
+
+async def main(args):
+    upload_path = args.upload_file or make_upload_file(args.upload_kb)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        headers = await login(client, args.username, args.password)
+        seeded = []
+        with open(upload_path, "rb") as f:
+            payload = f.read()
+        for i in range(args.seed_docs):
+            name = f"bench_seed_{i}.txt"
+            if await upload(client, headers, name, payload.replace(b"quarterly", f"section {i} quarterly".encode())):
+                seeded.append(name)
+
+        # Phase 1: chat only
+        latencies, errors, elapsed = await run_chats(client, headers, args.chats, args.concurrency, args.question)
+        baseline = summarize(latencies, errors, elapsed)
+
+        # Phase 2: chat while uploads run
+        stop, uploaded = asyncio.Event(), []
+        uploaders = [asyncio.create_task(run_uploads(client, headers, upload_path, stop, uploaded)) for _ in range(args.uploaders)]
+        latencies, errors, elapsed = await run_chats(client, headers, args.chats, args.concurrency, args.question)
+        stop.set()
+        await asyncio.gather(*uploaders)
+        under_load = summarize(latencies, errors, elapsed)
+        under_load["uploads_completed"] = len(uploaded)
+
+        for name in seeded + uploaded:
+            await client.delete(f"/documents/{name}", headers=headers)
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "password"},
+        "chat_only": baseline,
+        "chat_with_uploads": under_load,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure /chat latency while uploads run concurrently.")
+    parser.add_argument("--url", default="http://127.0.0.1:9005")
+    parser.add_argument("--username", default="bench_user")
+    parser.add_argument("--password", default="bench_password")
+    parser.add_argument("--question", default="Summarize the audit findings.")
+    parser.add_argument("--chats", type=int, default=50, help="Chat requests per phase")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent chat clients")
+    parser.add_argument("--uploaders", type=int, default=2, help="Concurrent upload loops in phase 2")
+    parser.add_argument("--upload-file", help="Document to upload repeatedly (defaults to a synthetic text file)")
+    parser.add_argument("--upload-kb", type=int, default=512, help="Size of the synthetic upload")
+    parser.add_argument("--seed-docs", type=int, default=0, help="Documents to ingest before measuring, so chats search a corpus")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    asyncio.run(main(parser.parse_args()))
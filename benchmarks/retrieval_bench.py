@@ -0,0 +1,218 @@
+"""
+VANT AI: Retrieval Benchmark
+Builds a synthetic corpus with planted facts, ingests it into an isolated RAGEngine per
+parameter set (CHUNK_SIZE, MMR fetch_k, hybrid weights, fusion method, reranking, context
+compression), and reports ingestion throughput, retrieval and end-to-end query latency
+percentiles, prompt context size, peak memory and recall (a planted fact reaching the LLM context).
+The Groq LLM is replaced by a local fake, so runs need no API key and measure only our code.
+
+Each parameter set runs in a fresh process so peak memory (ru_maxrss) is per configuration.
+
+Usage:
+    python benchmarks/retrieval_bench.py --docs 200 --queries 100 \\
+        --chunk-sizes 500,800,1200 --fetch-k 20,40 --weights 0.3:0.7,0.5:0.5 --fusion rrf,weighted --rerank off,on --compress off,on --output bench_retrieval.json
+    python benchmarks/retrieval_bench.py --fake-embeddings   # smoke run without the sentence-transformers model
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "audit budget client compliance contract delivery deadline finance forecast governance invoice "
+    "inventory license logistics margin milestone network onboarding payroll policy procurement "
+    "quarter region release revenue risk roadmap security server shipment supplier support "
+    "training vendor warehouse workflow analysis approval capacity customer dashboard incident"
+).split()
+PROJECTS = "Aurora Basalt Cobalt Dynamo Ember Falcon Glacier Harbor Indigo Juniper Krypton Lumen Meridian Nimbus Onyx Pioneer Quartz Raven Sierra Tundra".split()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; returns None for an empty sample."""
+    if not values: return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def latency_summary(latencies):
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+    }
+
+def peak_rss_mb():
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+
+
+# ---------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------
+
+def build_corpus(corpus_dir: str, docs: int, paragraphs: int, seed: int):
+    """
+    Write `docs` text files of filler paragraphs, each with one planted fact at a random position.
+    Returns [(question, expected_answer)], one per document.
+    """
+    rng = random.Random(seed)
+    facts = []
+    for d in range(docs):
+        project = f"{PROJECTS[d % len(PROJECTS)]}-{d}"
+        code = f"{rng.randint(0, 0xFFFFFF):06X}"
+        body = []
+        for _ in range(paragraphs):
+            sentences = [" ".join(rng.choices(WORDS, k=rng.randint(8, 16))).capitalize() + "." for _ in range(rng.randint(3, 6))]
+            body.append(" ".join(sentences))
+        body.insert(rng.randrange(len(body) + 1), f"The access code for project {project} is {code}.")
+        with open(os.path.join(corpus_dir, f"doc_{d:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(body))
+        facts.append((f"What is the access code for project {project}?", code))
+    return facts
+
+
+# ---------------------------------------------------------
+# One parameter set (runs in its own process)
+# ---------------------------------------------------------
+
+def run_config(params: dict, corpus_dir: str, facts: list, args_dict: dict) -> dict:
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-unused")  # The Groq client is replaced before any call
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from rag_engine import RAGEngine
+    from tokens import estimate_tokens
+
+    base_embeddings = None
+    if args_dict["fake_embeddings"]:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        base_embeddings = DeterministicFakeEmbedding(size=384)
+
+    db_dir = tempfile.mkdtemp(prefix="vant_retrieval_bench_")
+    try:
+        engine = RAGEngine(
+            db_dir=db_dir,
+            chunk_size=params["chunk_size"],
+            chunk_overlap=int(params["chunk_size"] * args_dict["overlap_ratio"]),
+            retriever_k=args_dict["k"],
+            fetch_k=params["fetch_k"],
+            hybrid_weights=params["weights"],
+            fusion=params["fusion"],
+            rerank=params["rerank"],
+            compress_context=params["compress"],
+            base_embeddings=base_embeddings,
+        )
+        # Local fake LLM: no network, constant-time answers
+        engine.llm = FakeListChatModel(responses=["Benchmark answer."])
+        engine._create_rag_chain()
+        engine.answer_cache.threshold = float("inf")  # Every query must exercise retrieval
+
+        # 1. Ingestion throughput
+        chunks, start = 0, time.perf_counter()
+        for name in sorted(os.listdir(corpus_dir)):
+            chunks += engine.process_document(os.path.join(corpus_dir, name), source=name)["chunks"]
+        ingest_seconds = time.perf_counter() - start
+
+        # 2. Retrieval latency + recall (a hit = a context chunk contains the planted answer).
+        # The context is exactly what the chain stuffs into the prompt: every fused chunk (up to 2k),
+        # or what reranking/compression pass on.
+        retrieval_latencies, context_tokens, hits = [], [], 0
+        for question, answer in facts:
+            start = time.perf_counter()
+            docs = engine.context_retriever.invoke({"input": question})
+            retrieval_latencies.append(time.perf_counter() - start)
+            context_tokens.append(sum(estimate_tokens(d.page_content) for d in docs))
+            hits += any(answer in d.page_content for d in docs)
+
+        # 3. End-to-end query latency (retrieval + prompt + fake LLM)
+        query_latencies = []
+        for question, _ in facts:
+            start = time.perf_counter()
+            engine.query(question)
+            query_latencies.append(time.perf_counter() - start)
+
+        return {
+            "params": params,
+            "documents": len(facts),
+            "chunks": chunks,
+            "ingest_seconds": round(ingest_seconds, 3),
+            "chunks_per_second": round(chunks / ingest_seconds, 1) if ingest_seconds else None,
+            "retrieval": latency_summary(retrieval_latencies),
+            "query": latency_summary(query_latencies),
+            "context_recall": round(hits / len(facts), 3) if facts else None,
+            "context_tokens_mean": round(statistics.mean(context_tokens), 1) if context_tokens else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "db_size_mb": round(sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(db_dir) for f in files) / 2**20, 2),
+        }
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+def parse_weights(value: str):
+    return [tuple(float(w) for w in pair.split(":")) for pair in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep retrieval parameters over a synthetic corpus.")
+    parser.add_argument("--docs", type=int, default=100, help="Documents in the synthetic corpus (one planted fact each)")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Filler paragraphs per document")
+    parser.add_argument("--queries", type=int, default=None, help="Questions to ask (default: one per document)")
+    parser.add_argument("--k", type=int, default=8, help="Chunks per retriever")
+    parser.add_argument("--chunk-sizes", default="800", help="Comma-separated CHUNK_SIZE values")
+    parser.add_argument("--overlap-ratio", type=float, default=150 / 800, help="CHUNK_OVERLAP as a fraction of chunk size")
+    parser.add_argument("--fetch-k", default="20", help="Comma-separated MMR fetch_k values")
+    parser.add_argument("--weights", default="0.3:0.7", help="Comma-separated keyword:semantic ensemble weights")
+    parser.add_argument("--fusion", default="rrf", help="Comma-separated fusion methods (rrf, weighted)")
+    parser.add_argument("--rerank", default="off", help="Comma-separated reranking settings to compare (off, on)")
+    parser.add_argument("--compress", default="off", help="Comma-separated context compression settings to compare (off, on)")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use deterministic fake embeddings (no model download; recall reflects keyword search only)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    corpus_dir = tempfile.mkdtemp(prefix="vant_corpus_")
+    facts = build_corpus(corpus_dir, args.docs, args.paragraphs, args.seed)
+    if args.queries is not None:
+        facts = random.Random(args.seed).sample(facts, min(args.queries, len(facts)))
+
+    sweep = [
+        {"chunk_size": chunk_size, "fetch_k": fetch_k, "weights": list(weights), "fusion": fusion, "rerank": rerank == "on", "compress": compress == "on"}
+        for chunk_size, fetch_k, weights, fusion, rerank, compress in itertools.product(
+            [int(v) for v in args.chunk_sizes.split(",")], [int(v) for v in args.fetch_k.split(",")], parse_weights(args.weights),
+            args.fusion.split(","), args.rerank.split(","), args.compress.split(",")
+        )
+    ]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    try:
+        for params in sweep:
+            print(f"Running {params} ...", flush=True)
+            with context.Pool(1) as pool:
+                result = pool.apply(run_config, (params, corpus_dir, facts, vars(args)))
+            results.append(result)
+            print(json.dumps(result, indent=2), flush=True)
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    report = {"corpus": {"docs": args.docs, "paragraphs": args.paragraphs, "queries": len(facts), "seed": args.seed, "fake_embeddings": args.fake_embeddings}, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
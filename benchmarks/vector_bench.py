@@ -0,0 +1,173 @@
+"""
+VANT AI: Vector Backend Benchmark
+Compares the Chroma backend with the quantized, memory-mapped backend (int8 / float16, with and
+without exact re-scoring) on synthetic clustered 384-d unit vectors (all-MiniLM-L6-v2's size).
+For each backend it reports build time, on-disk size, query latency percentiles, recall@k
+against exact float32 search, and the memory a fresh process gains by serving the queries
+(resident, and anonymous: resident minus memory-mapped file pages the kernel can drop).
+
+Vectors are generated batch by batch from a seed, so the benchmark itself never holds the
+whole corpus in memory. Build and query phases run in separate fresh processes.
+
+Usage:
+    python benchmarks/vector_bench.py --rows 100000 --backends chroma,int8,int8-exact-off,float16 --output bench_vectors.json
+    python benchmarks/vector_bench.py --rows 1000000 --backends int8,float16
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from retrieval_bench import latency_summary, peak_rss_mb
+
+BATCH_ROWS = 5000  # Rows generated and written per add call
+BACKENDS = {
+    "chroma": None,
+    "int8": {"dtype": "int8", "rescore": True},
+    "int8-exact-off": {"dtype": "int8", "rescore": False},
+    "float16": {"dtype": "float16", "rescore": True},
+}
+
+
+def current_memory_mb():
+    """(resident, anonymous) MB right now on Linux; resident also counts mapped file pages the kernel can drop."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return tuple(round(int(fields[name].split()[0]) / 1024, 1) for name in ("VmRSS", "RssAnon"))
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def disk_mb(path: str):
+    total = sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+    return round(total / (1024 * 1024), 1)
+
+
+# ---------------------------------------------------------
+# Synthetic vectors
+# ---------------------------------------------------------
+
+def centers(args: dict) -> np.ndarray:
+    return np.random.default_rng(args["seed"]).normal(size=(args["clusters"], args["dim"])).astype(np.float32)
+
+def batch_vectors(args: dict, batch: int) -> np.ndarray:
+    """Deterministic batch `batch` of unit vectors drawn around the cluster centers."""
+    rng = np.random.default_rng(args["seed"] + 1 + batch)
+    rows = min(BATCH_ROWS, args["rows"] - batch * BATCH_ROWS)
+    base = centers(args)[rng.integers(0, args["clusters"], rows)]
+    vectors = base + args["noise"] * rng.normal(size=base.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def query_vectors(args: dict) -> np.ndarray:
+    rng = np.random.default_rng(args["seed"] - 1)
+    base = centers(args)[rng.integers(0, args["clusters"], args["queries"])]
+    vectors = base + args["noise"] * rng.normal(size=base.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def batches(args: dict):
+    return range((args["rows"] + BATCH_ROWS - 1) // BATCH_ROWS)
+
+def exact_top_k(args: dict) -> list:
+    """Exact float32 top-k ids per query, streamed over the batches."""
+    queries = query_vectors(args)
+    best_scores = np.full((len(queries), args["k"]), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), args["k"]), dtype=np.int64)
+    for batch in batches(args):
+        scores = queries @ batch_vectors(args, batch).T
+        rows = np.broadcast_to(np.arange(scores.shape[1]) + batch * BATCH_ROWS, scores.shape)
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_rows = np.concatenate([best_rows, rows], axis=1)
+        top = np.argpartition(-merged_scores, args["k"] - 1, axis=1)[:, :args["k"]]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_rows = np.take_along_axis(merged_rows, top, axis=1)
+    return [{f"v{row}" for row in rows} for rows in best_rows]
+
+
+# ---------------------------------------------------------
+# Backends
+# ---------------------------------------------------------
+
+def open_backend(name: str, path: str, args: dict):
+    from vector_backends import ChromaVectors, QuantizedVectors
+    if BACKENDS[name] is None:
+        import chromadb
+        from langchain_chroma import Chroma
+        return ChromaVectors(Chroma(client=chromadb.PersistentClient(path=path), collection_name="bench", embedding_function=None))
+    return QuantizedVectors(path, nprobe=args["nprobe"], ivf_min_rows=args["ivf_min_rows"], **BACKENDS[name])
+
+def run_build(name: str, path: str, args: dict) -> dict:
+    from langchain_core.documents import Document
+    store = open_backend(name, path, args)
+    started = time.perf_counter()
+    for batch in batches(args):
+        vectors = batch_vectors(args, batch)
+        ids = [f"v{batch * BATCH_ROWS + i}" for i in range(len(vectors))]
+        store.add(ids, vectors.tolist(), [Document(page_content=i, metadata={"source": "bench"}) for i in ids])
+    return {"build_seconds": round(time.perf_counter() - started, 2), "build_peak_rss_mb": peak_rss_mb()}
+
+def run_queries(name: str, path: str, args: dict, truth: list) -> dict:
+    rss_before, anon_before = current_memory_mb()
+    store = open_backend(name, path, args)
+    latencies, recall = [], 0.0
+    for query, expected in zip(query_vectors(args), truth):
+        started = time.perf_counter()
+        ids, _, _ = store.search(query.tolist(), args["k"])
+        latencies.append(time.perf_counter() - started)
+        recall += len(expected & set(ids)) / args["k"]
+    rss, anon = current_memory_mb()
+    return {
+        f"recall_at_{args['k']}": round(recall / len(truth), 4),
+        **latency_summary(latencies),
+        **({"serving_rss_mb": round(rss - rss_before, 1), "serving_anon_mb": round(anon - anon_before, 1)} if rss_before is not None else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector backends on synthetic embeddings.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=None, help="Topic centers the vectors are drawn around (default: one per 100 rows)")
+    parser.add_argument("--noise", type=float, default=0.6, help="Spread of vectors around their center")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20, help="Neighbors per query (the engine's MMR fetch_k)")
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ivf-min-rows", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backends", default="chroma,int8,int8-exact-off,float16", help=f"Comma-separated: {', '.join(BACKENDS)}")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = vars(parser.parse_args())
+    args["clusters"] = args["clusters"] or max(1, args["rows"] // 100)
+
+    print("Computing exact neighbors ...", flush=True)
+    truth = exact_top_k(args)
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name in args["backends"].split(","):
+        path = tempfile.mkdtemp(prefix=f"vant_vectors_{name}_")
+        try:
+            print(f"Running {name} ...", flush=True)
+            with context.Pool(1) as pool:
+                result = {"backend": name, **pool.apply(run_build, (name, path, args))}
+            result["disk_mb"] = disk_mb(path)
+            with context.Pool(1) as pool:
+                result.update(pool.apply(run_queries, (name, path, args, truth)))
+            results.append(result)
+            print(json.dumps(result, indent=2), flush=True)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    report = {"vectors": {k: args[k] for k in ("rows", "dim", "clusters", "noise", "queries", "k", "nprobe")}, "results": results}
+    if args["output"]:
+        with open(args["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args['output']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+VANT AI: Context Compression
+Shrinks the retrieved chunks before they are stuffed into the generation prompt: chunks of
+the same page whose character ranges touch or overlap (neighbours repeat CHUNK_OVERLAP
+characters) are merged into one passage, lower-ranked near-duplicates are dropped using the
+vectors the hybrid retriever already fetched for MMR, and the passages are packed, best-ranked first, into a token budget.
+"""
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+import metrics
+from hybrid_retriever import EMBEDDING_METADATA_KEY
+from tokens import CHARS_PER_TOKEN, estimate_tokens
+
+MAX_GAP_CHARS = 2  # Whitespace the splitter strips between neighbouring chunks
+
+
+def _page_key(doc: Document):
+    return doc.metadata.get("source"), doc.metadata.get("sheet"), doc.metadata.get("page")
+
+def _span(doc: Document):
+    """(start, end) character offsets within the page, for chunks ingested with start_index."""
+    start = doc.metadata.get("start_index")
+    if not isinstance(start, int) or start < 0: return None
+    return start, start + len(doc.page_content)
+
+def _neighbours(a: Document, b: Document) -> bool:
+    span_a, span_b = _span(a), _span(b)
+    if span_a is None or span_b is None or _page_key(a) != _page_key(b): return False
+    return span_a[0] <= span_b[1] + MAX_GAP_CHARS and span_b[0] <= span_a[1] + MAX_GAP_CHARS
+
+
+class ContextCompressor:
+    """
+    Stateless apart from its threshold. Near-duplicates are judged on the vectors the retriever
+    attached (metadata[EMBEDDING_METADATA_KEY]); chunks without one (keyword-only hits) are kept
+    and never suppress others, and nothing is embedded here. The vectors are stripped from the
+    returned passages. Chunks without offsets (row-aligned table chunks, or files ingested before
+    offsets were recorded) are never merged.
+    """
+    def __init__(self, dedup_threshold: float = 0.95):
+        self.dedup_threshold = dedup_threshold
+
+    def compress(self, documents: List[Document], token_budget: int) -> List[Document]:
+        if not documents: return documents
+        before = sum(estimate_tokens(d.page_content) for d in documents)
+        with metrics.timer("context_compression"):
+            kept = self._drop_near_duplicates(documents)
+            packed = [self._without_embedding(d) for d in self._pack(self._merge_neighbours(kept), token_budget)]
+        metrics.record_tokens("context", before, sum(estimate_tokens(d.page_content) for d in packed))
+        return packed
+
+    def _drop_near_duplicates(self, documents: List[Document]) -> List[Document]:
+        """
+        Keep one chunk of each near-identical group (page neighbours never count as duplicates): the
+        best-ranked, unless a lower-ranked copy joins up with its page neighbours, which then takes its place.
+        """
+        with_vector = [i for i, d in enumerate(documents) if d.metadata.get(EMBEDDING_METADATA_KEY) is not None]
+        if len(with_vector) < 2: return list(documents)
+        vectors = np.asarray([documents[i].metadata[EMBEDDING_METADATA_KEY] for i in with_vector], dtype=np.float32)
+        unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        similarity = np.full((len(documents), len(documents)), -1.0, dtype=np.float32)
+        similarity[np.ix_(with_vector, with_vector)] = unit @ unit.T
+        connected = [any(_neighbours(a, b) for b in documents if b is not a) for a in documents]
+        kept = []
+        for i, doc in enumerate(documents):
+            slot = next((n for n, j in enumerate(kept) if similarity[i, j] >= self.dedup_threshold and not _neighbours(doc, documents[j])), None)
+            if slot is None: kept.append(i)
+            elif connected[i] and not connected[kept[slot]]: kept[slot] = i
+        return [documents[i] for i in kept]
+
+    @staticmethod
+    def _merge_neighbours(documents: List[Document]) -> List[Document]:
+        """One passage per run of touching/overlapping chunks, in document order, ranked by its best chunk."""
+        runs = {}  # Page key -> [(span, rank, doc)]
+        passages = []  # (rank, doc)
+        for rank, doc in enumerate(documents):
+            span = _span(doc)
+            if span is None: passages.append((rank, doc))
+            else: runs.setdefault(_page_key(doc), []).append((span, rank, doc))
+
+        for chunks in runs.values():
+            chunks.sort(key=lambda c: c[0])
+            (start, end), rank, first = chunks[0]
+            text = first.page_content
+            for (next_start, next_end), next_rank, doc in chunks[1:]:
+                overlap, offset = end - next_start, next_start - start  # `text` always spans [start, end)
+                shared = text[offset:offset + len(doc.page_content)]
+                if overlap < -MAX_GAP_CHARS or shared != doc.page_content[:max(overlap, 0)]:
+                    passages.append((rank, Document(page_content=text, metadata={**first.metadata, "start_index": start})))
+                    (start, end), rank, first, text = (next_start, next_end), next_rank, doc, doc.page_content
+                    continue
+                if next_end > end:
+                    text += doc.page_content[overlap:] if overlap >= 0 else "\n" * -overlap + doc.page_content
+                    end = next_end
+                rank = min(rank, next_rank)
+            passages.append((rank, Document(page_content=text, metadata={**first.metadata, "start_index": start})))
+        return [doc for _, doc in sorted(passages, key=lambda p: p[0])]
+
+    @staticmethod
+    def _without_embedding(doc: Document) -> Document:
+        if EMBEDDING_METADATA_KEY not in doc.metadata: return doc
+        return Document(page_content=doc.page_content, metadata={k: v for k, v in doc.metadata.items() if k != EMBEDDING_METADATA_KEY})
+
+    @staticmethod
+    def _pack(passages: List[Document], token_budget: int) -> List[Document]:
+        """Best-ranked passages that fit the budget; the top passage is truncated rather than dropped."""
+        kept, used = [], 0
+        for doc in passages:
+            tokens = estimate_tokens(doc.page_content)
+            if used + tokens > token_budget:
+                if kept: continue  # A later, shorter passage may still fit
+                doc = Document(page_content=doc.page_content[:token_budget * CHARS_PER_TOKEN], metadata=doc.metadata)
+                tokens = estimate_tokens(doc.page_content)
+            kept.append(doc)
+            used += tokens
+        return kept
@@ -0,0 +1,97 @@
+"""
+VANT AI: Document Catalog
+One row per ingested file (source name, content hash, chunk ids, size, ingest time) in the
+SQLAlchemy database, so listing, deleting and summarizing are indexed lookups instead of
+vector-store scans, and re-uploads of unchanged files can be skipped. Document summaries are
+stored per content hash and dropped once no catalog entry has that content any more.
+"""
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from session_db import IndexedDocument, DocumentSummary
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in blocks so large uploads aren't held in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentCatalog:
+    """Catalog reads and writes for one database; tenants are workspace ids (None: the shared workspace)."""
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def get(self, tenant: Optional[str], source: str) -> Optional[IndexedDocument]:
+        with self.session_factory() as db:
+            return db.query(IndexedDocument).filter_by(tenant=tenant or "", source=source).first()
+
+    def sources(self, tenant: Optional[str]) -> List[str]:
+        with self.session_factory() as db:
+            rows = db.query(IndexedDocument.source).filter_by(tenant=tenant or "").order_by(IndexedDocument.source).all()
+            return [source for (source,) in rows]
+
+    def put(self, tenant: Optional[str], source: str, chunk_ids: List[str], content_hash: Optional[str] = None, size_bytes: Optional[int] = None):
+        """Record (or replace) a source's entry after it has been indexed."""
+        with self.session_factory() as db:
+            entry = db.query(IndexedDocument).filter_by(tenant=tenant or "", source=source).first()
+            if entry is None:
+                entry = IndexedDocument(tenant=tenant or "", source=source)
+                db.add(entry)
+            elif entry.content_key != content_hash:
+                self._release_summaries(db, entry)
+            entry.content_hash = content_hash
+            entry.chunk_ids = json.dumps(chunk_ids)
+            entry.chunk_count = len(chunk_ids)
+            entry.size_bytes = size_bytes
+            db.commit()
+
+    def remove(self, tenant: Optional[str], source: str):
+        with self.session_factory() as db:
+            entry = db.query(IndexedDocument).filter_by(tenant=tenant or "", source=source).first()
+            if entry is None: return
+            self._release_summaries(db, entry)
+            db.delete(entry)
+            db.commit()
+
+    def backfill(self, tenant: Optional[str], source_chunks: Dict[str, List[str]]) -> int:
+        """Add entries (without a content hash) for sources indexed before the catalog existed; ids in document order."""
+        known = set(self.sources(tenant))
+        missing = {source: ids for source, ids in source_chunks.items() if source not in known}
+        if not missing: return 0
+        with self.session_factory() as db:
+            for source, ids in missing.items():
+                db.add(IndexedDocument(tenant=tenant or "", source=source, chunk_ids=json.dumps(ids), chunk_count=len(ids)))
+            db.commit()
+        return len(missing)
+
+    # ---------------------------------------------------------
+    # Summaries
+    # ---------------------------------------------------------
+
+    def get_summary(self, entry: IndexedDocument, model: str) -> Optional[str]:
+        with self.session_factory() as db:
+            row = db.query(DocumentSummary).filter_by(content_key=entry.content_key, model=model).first()
+            return row.summary if row else None
+
+    def put_summary(self, entry: IndexedDocument, model: str, summary: str):
+        with self.session_factory() as db:
+            db.add(DocumentSummary(content_key=entry.content_key, model=model, summary=summary))
+            try:
+                db.commit()
+            except IntegrityError:  # A concurrent request stored it first
+                db.rollback()
+
+    @staticmethod
+    def _release_summaries(db, entry: IndexedDocument):
+        """Drop the summaries of an entry's current content unless another entry has the same content."""
+        shared = entry.content_hash and db.query(IndexedDocument).filter(
+            IndexedDocument.content_hash == entry.content_hash, IndexedDocument.id != entry.id
+        ).first()
+        if not shared: db.query(DocumentSummary).filter_by(content_key=entry.content_key).delete()
@@ -0,0 +1,121 @@
+"""
+VANT AI: Embedding Cache
+Content-addressed, on-disk cache in front of the embedding model. Identical text
+(re-uploads, shared boilerplate, repeated questions) is embedded once per model.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper backed by a SQLite vector cache with LRU eviction.
+    Keys are sha256(model name + text); cache misses are embedded in batches of `batch_size`.
+    """
+    def __init__(self, underlying: Embeddings, model_name: str, cache_path: str, max_entries: int = 100_000, batch_size: int = 64):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    # ---------------------------------------------------------
+    # Embeddings interface
+    # ---------------------------------------------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, _ = self.embed_documents_with_stats(texts)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def embed_documents_with_stats(self, texts: List[str]) -> Tuple[List[List[float]], Dict[str, int]]:
+        """Embed texts, returning the vectors plus this call's cache hit/miss counts (each distinct text counted once)."""
+        keys = [self._key(t) for t in texts]
+        unique = list(dict.fromkeys(keys))
+        found = self._lookup(unique)
+
+        # Embed each distinct missing text once, in model-sized batches
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found: missing.setdefault(key, text)
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch = missing_keys[start:start + self.batch_size]
+            vectors = self.underlying.embed_documents([missing[k] for k in batch])
+            computed = dict(zip(batch, vectors))
+            self._store(computed)
+            found.update(computed)
+
+        stats = {"hits": len(unique) - len(missing), "misses": len(missing)}
+        self.hits += stats["hits"]
+        self.misses += stats["misses"]
+        return [found[k] for k in keys], stats
+
+    # ---------------------------------------------------------
+    # Storage
+    # ---------------------------------------------------------
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), 500):  # Stay under SQLite's bound-parameter limit
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, blob in self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch):
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            if found:
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in vectors.items()]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                # Evict least-recently-used entries down to 90% capacity to amortize eviction cost
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute("DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (excess,))
+                self._count -= excess
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Lifetime hit/miss counters for this process."""
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 3) if total else 0.0, "entries": self._count}
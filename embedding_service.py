@@ -0,0 +1,147 @@
+"""
+VANT AI: Shared Embedding Service
+With several API worker processes, one process loads the embedding model and its on-disk
+cache and serves every worker over a local socket, instead of each worker holding its own
+copy of torch and the model. Workers use RemoteEmbeddings, a drop-in LangChain Embeddings.
+The connection carries pickles, so it is only as safe as its key: serve.py listens on a Unix
+socket in a private directory and generates a random key per launch.
+"""
+import logging
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_SERVICE_AUTHKEY_ENV, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+from embedding_cache import CachedEmbeddings
+
+logger = logging.getLogger("VANT-AI")
+
+SERVED_METHODS = {"embed_documents", "embed_query", "embed_documents_with_stats", "stats"}
+
+
+def parse_address(address: str):
+    """TCP (host, port) for "host:port"; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    return (host, int(port)) if sep and port.isdigit() else address
+
+
+def service_authkey() -> bytes:
+    """Connection secret shared by the service and the workers (EMBEDDING_SERVICE_AUTHKEY, set per launch by serve.py)."""
+    key = os.environ.get(EMBEDDING_SERVICE_AUTHKEY_ENV)
+    if not key: raise RuntimeError(f"{EMBEDDING_SERVICE_AUTHKEY_ENV} is not set; start the service through serve.py")
+    return bytes.fromhex(key)
+
+
+def load_embeddings(base_embeddings: Embeddings = None, cache_path: str = EMBEDDING_CACHE_PATH) -> CachedEmbeddings:
+    """The sentence-transformers model (unless `base_embeddings` is given) behind the content-hash cache."""
+    if base_embeddings is None:
+        from langchain_huggingface import HuggingFaceEmbeddings  # Pulls in torch; imported only here
+        base_embeddings = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'batch_size': EMBEDDING_BATCH_SIZE}
+        )
+    return CachedEmbeddings(
+        base_embeddings,
+        model_name=EMBEDDING_MODEL,
+        cache_path=cache_path,
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+        batch_size=EMBEDDING_BATCH_SIZE
+    )
+
+
+# ---------------------------------------------------------
+# Server
+# ---------------------------------------------------------
+
+def serve(address: str, base_embeddings: Embeddings = None):
+    """Load the model once and answer embedding calls from any number of workers (one thread per connection)."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    authkey = service_authkey()
+    embeddings = load_embeddings(base_embeddings)
+    with Listener(parse_address(address), authkey=authkey) as listener:
+        if isinstance(parse_address(address), str): os.chmod(address, 0o600)  # Owner only, on top of the key
+        logger.info(f"Embedding service listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:  # A client with the wrong key (or a dropped handshake) must not stop the service
+                logger.warning(f"Embedding Service Connection Error: {e}")
+                continue
+            threading.Thread(target=_handle, args=(conn, embeddings), daemon=True, name="embedding-conn").start()
+
+
+def _handle(conn, embeddings: CachedEmbeddings):
+    with conn:
+        while True:
+            try:
+                method, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if method not in SERVED_METHODS: raise ValueError(f"Unknown method {method!r}")
+                conn.send(("ok", getattr(embeddings, method)(*args)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def wait_for_service(address: str, timeout: float = 300.0):
+    """Block until the service accepts connections (the model can take a while to load)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            Client(parse_address(address), authkey=service_authkey()).close()
+            return
+        except (ConnectionError, FileNotFoundError):
+            if time.monotonic() > deadline: raise TimeoutError(f"Embedding service at {address} did not start")
+            time.sleep(0.2)
+
+
+# ---------------------------------------------------------
+# Client
+# ---------------------------------------------------------
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Embeddings served by the shared embedding service. Each thread keeps its own connection,
+    so concurrent requests in one worker don't queue behind each other.
+    """
+    def __init__(self, address: str):
+        self.address = address
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(parse_address(self.address), authkey=service_authkey())
+        return conn
+
+    def _call(self, method: str, *args):
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((method, args))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._local.conn = None  # Service restarted: reconnect once
+                if attempt: raise
+        if status == "error": raise RuntimeError(f"Embedding service error: {result}")
+        return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call("embed_documents", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call("embed_query", text)
+
+    def embed_documents_with_stats(self, texts: List[str]) -> Tuple[List[List[float]], Dict[str, int]]:
+        return self._call("embed_documents_with_stats", texts)
+
+    def stats(self) -> Dict[str, float]:
+        """The service's cache counters (shared by every worker)."""
+        return self._call("stats")
@@ -0,0 +1,26 @@
+"""
+VANT AI: Inter-Process File Locks
+Advisory locks that let several API worker processes share the on-disk keyword indexes
+and table catalogs: writers take the lock exclusively, readers catching up take it shared.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only, so locking is unnecessary
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """Hold an flock on `path` (created if missing) for the duration of the block."""
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Closing the descriptor releases the lock
@@ -0,0 +1,72 @@
+"""
+VANT AI: Chat History Window
+Keeps the prompt size of long conversations bounded: the most recent turns are sent
+verbatim (within a token budget) and everything older is folded into a rolling
+summary stored on the ChatSession.
+"""
+from typing import List
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from sqlalchemy.orm import Session
+
+import session_db
+from tokens import estimate_tokens
+
+
+class HistoryManager:
+    """Loads only the messages a turn needs, using the (session_id, created_at) index."""
+    def __init__(self, max_turns: int, token_budget: int, summary_batch: int):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_batch = summary_batch
+
+    @property
+    def window(self) -> int:
+        return self.max_turns * 2  # One user + one assistant message per turn
+
+    def _unsummarized(self, db: Session, session: session_db.ChatSession):
+        return (
+            db.query(session_db.ChatMessage)
+            .filter(session_db.ChatMessage.session_id == session.id, session_db.ChatMessage.id > (session.summarized_until or 0))
+            .order_by(session_db.ChatMessage.created_at.desc(), session_db.ChatMessage.id.desc())
+        )
+
+    def _verbatim(self, db: Session, session: session_db.ChatSession) -> List[session_db.ChatMessage]:
+        """Unsummarized messages sent verbatim (newest first): the window, cut off at the token budget."""
+        recent = self._unsummarized(db, session).limit(self.window).all()
+
+        # Newest first: keep messages until the token budget is spent
+        kept, used = [], 0
+        for message in recent:
+            used += estimate_tokens(message.content)
+            if kept and used > self.token_budget: break
+            kept.append(message)
+        return kept
+
+    def load(self, db: Session, session: session_db.ChatSession) -> list:
+        """Build the LangChain history for the next turn: rolling summary + recent messages within budget."""
+        kept = self._verbatim(db, session)
+        history = [HumanMessage(content=m.content) if m.role == 'user' else AIMessage(content=m.content) for m in reversed(kept)]
+        if session.summary:
+            history.insert(0, SystemMessage(content=f"Summary of the earlier conversation:\n{session.summary}"))
+        return history
+
+    def pending_summary(self, db: Session, session: session_db.ChatSession, max_messages: int = 40) -> List[session_db.ChatMessage]:
+        """
+        Messages to fold into the summary (oldest first): every unsummarized message that `load()` no longer
+        sends, topped up to `summary_batch` with the oldest verbatim ones (never the latest turn) so the
+        summary isn't rewritten every turn. Capped so legacy sessions fold in steps.
+        """
+        kept = self._verbatim(db, session)
+        query = db.query(session_db.ChatMessage).filter(
+            session_db.ChatMessage.session_id == session.id,
+            session_db.ChatMessage.id > (session.summarized_until or 0),
+        )
+        if kept: query = query.filter(session_db.ChatMessage.id < kept[-1].id)
+        overflow = query.order_by(session_db.ChatMessage.id.asc()).limit(max_messages).all()
+        if not overflow: return []
+        return overflow + list(reversed(kept[2:]))[:self.summary_batch - len(overflow)]
+
+    @staticmethod
+    def format_messages(messages: List[session_db.ChatMessage]) -> str:
+        return "\n".join(f"{m.role.capitalize()}: {m.content}" for m in messages)
@@ -0,0 +1,141 @@
+"""
+VANT AI: Native Hybrid Retriever
+Runs the BM25 and vector searches concurrently, diversifies the vector candidates with
+MMR computed as matrix operations over the embeddings ChromaDB already returned, and
+fuses both rankings with vectorized NumPy scoring (reciprocal rank fusion or weighted scores).
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import ConfigurableField
+
+import metrics
+
+FUSION_METHODS = ("rrf", "weighted")
+EMBEDDING_METADATA_KEY = "_embedding"  # Stored vector of a vector-search candidate, when attach_embeddings is set
+
+# Per-request overrides accepted through config={"configurable": {...}}
+CONFIGURABLE_FIELDS = ("k", "fetch_k", "mmr_lambda", "weights", "fusion")
+
+# Keyword searches run here while the calling thread does the vector search
+_keyword_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="keyword-search")
+
+
+def mmr_select(query_vector: np.ndarray, embeddings: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Maximal marginal relevance over an (n, d) candidate matrix; returns the selected row indices in order.
+    Query relevance and all pairwise similarities come from two matrix products, and each pick
+    updates the running max-similarity vector with one row instead of re-scoring every pair.
+    """
+    n = len(embeddings)
+    if n == 0 or k <= 0: return []
+    unit = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    relevance = unit @ (query_vector / max(float(np.linalg.norm(query_vector)), 1e-12))
+    pairwise = unit @ unit.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_similarity = pairwise[first].copy()
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, pairwise[pick], out=max_similarity)
+    return selected
+
+
+def fuse(rankings: List[List[str]], weights: List[float], method: str = "rrf",
+         scores: Optional[List[List[float]]] = None, rrf_c: int = 60) -> List[str]:
+    """
+    Fuse ranked id lists into one ordering.
+    "rrf": sum of weight / (rrf_c + rank). "weighted": sum of weight * min-max normalized score.
+    Ties keep first-seen order.
+    """
+    if method not in FUSION_METHODS: raise ValueError(f"Unknown fusion method: {method}")
+    ids = list(dict.fromkeys(cid for ranking in rankings for cid in ranking))
+    position = {cid: i for i, cid in enumerate(ids)}
+    total = np.zeros(len(ids))
+    for i, (ranking, weight) in enumerate(zip(rankings, weights)):
+        if not ranking: continue
+        columns = np.fromiter((position[cid] for cid in ranking), dtype=np.int64, count=len(ranking))
+        if method == "rrf":
+            total[columns] += weight / (rrf_c + np.arange(1, len(ranking) + 1))
+        else:
+            raw = np.asarray(scores[i], dtype=np.float64)
+            spread = raw.max() - raw.min()
+            total[columns] += weight * ((raw - raw.min()) / spread if spread else np.ones_like(raw))
+    return [ids[i] for i in np.argsort(-total, kind="stable")]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Keyword (BM25) + vector retrieval in one retriever, scoped to one tenant.
+    `stores(tenant)` returns that tenant's (keyword_index, vector_search); `vector_search(query, fetch_k)`
+    must return (query_vector, ids, documents, embeddings), and while it is None (vector store still
+    loading) results are keyword-only. With `attach_embeddings`, every result that was among the vector
+    candidates carries its stored vector in metadata[EMBEDDING_METADATA_KEY] for later stages.
+    """
+    stores: Callable
+    tenant: Optional[str] = None
+    k: int = 8                  # Chunks taken from each side before fusion
+    fetch_k: int = 20           # Vector candidates MMR chooses from
+    mmr_lambda: float = 0.5
+    weights: List[float] = [0.3, 0.7]  # (keyword, semantic)
+    fusion: str = "rrf"
+    rrf_c: int = 60
+    attach_embeddings: bool = False
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        keyword_index, vector_search = self.stores(self.tenant)
+        # The keyword search runs in a pool thread (with this request's trace context) alongside the vector search
+        keyword_future = _keyword_pool.submit(contextvars.copy_context().run, self._keyword_search, keyword_index, query)
+        vector_ids, vector_docs, vector_scores, candidates = self._vector_search(vector_search, query) if vector_search else ([], [], [], {})
+        keyword_hits = keyword_future.result()
+
+        with metrics.timer("retrieval_fusion"):
+            documents = {cid: doc for cid, _, doc in keyword_hits}
+            documents.update(zip(vector_ids, vector_docs))
+            order = fuse(
+                [[cid for cid, _, _ in keyword_hits], vector_ids],
+                self.weights,
+                method=self.fusion,
+                scores=[[score for _, score, _ in keyword_hits], vector_scores],
+                rrf_c=self.rrf_c,
+            )
+        if self.attach_embeddings:
+            for cid in order:
+                if cid in candidates: documents[cid].metadata[EMBEDDING_METADATA_KEY] = candidates[cid]
+        return [documents[cid] for cid in order]
+
+    def _keyword_search(self, keyword_index, query: str):
+        with metrics.timer("retrieval_keyword"):
+            return keyword_index.search_scored(query, self.k)
+
+    def _vector_search(self, vector_search: Callable, query: str):
+        with metrics.timer("retrieval_vector"):
+            query_vector, ids, docs, embeddings = vector_search(query, max(self.fetch_k, self.k))
+        with metrics.timer("retrieval_mmr"):
+            selected = mmr_select(query_vector, embeddings, self.k, self.mmr_lambda)
+            if not selected: return [], [], [], {}
+            unit = embeddings[selected] / np.maximum(np.linalg.norm(embeddings[selected], axis=1, keepdims=True), 1e-12)
+            similarity = unit @ (query_vector / max(float(np.linalg.norm(query_vector)), 1e-12))
+        # Every candidate's vector, so keyword hits that were also vector candidates get one too
+        candidates = dict(zip(ids, embeddings)) if self.attach_embeddings else {}
+        return [ids[i] for i in selected], [docs[i] for i in selected], similarity.tolist(), candidates
+
+    def with_request_options(self):
+        """
+        Expose k, fetch_k, mmr_lambda, weights and fusion as per-request `configurable` fields,
+        plus the tenant (set by the engine from the caller, never from user-supplied options).
+        """
+        fields = {name: ConfigurableField(id=name) for name in CONFIGURABLE_FIELDS + ("tenant",)}
+        return self.configurable_fields(**fields)
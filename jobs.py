@@ -0,0 +1,165 @@
+"""
+VANT AI: Background Ingestion Jobs
+Uploads are queued as jobs and run on a local worker pool, so HTTP requests return
+a job id immediately and clients poll /jobs/{id} for stage, chunk counts and throughput.
+Progress is also written to the database, so any API worker process can answer the poll.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from session_db import IngestJobRecord
+
+logger = logging.getLogger("VANT-AI")
+
+JOB_RETENTION_SECONDS = 3600  # Finished jobs stay queryable for an hour
+PERSIST_INTERVAL_SECONDS = 0.5  # Counter-only progress updates are written to the database at most this often
+
+@dataclass
+class IngestJob:
+    """Progress record for one uploaded file."""
+    filename: str
+    path: str
+    user_id: str
+    tenant: Optional[str] = None  # Workspace the document is indexed into (None: shared)
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"      # queued | running | completed | failed
+    stage: str = "queued"       # queued | loading | parsing | chunking | embedding | indexing | done
+    documents: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_indexed: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    skipped: bool = False       # Identical to the already-indexed file of the same name
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _persisted: tuple = field(default=(None, None, 0.0), repr=False)  # (status, stage, time) of the last database write
+
+    def update(self, stage: Optional[str] = None, **counters):
+        """Progress callback handed to RAGEngine.process_document (called from worker threads)."""
+        with self._lock:
+            if stage: self.stage = stage
+            for name, value in counters.items():
+                setattr(self, name, value)
+
+    def to_dict(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "status": self.status,
+                "stage": self.stage,
+                "documents": self.documents,
+                "chunks_total": self.chunks_total,
+                "chunks_embedded": self.chunks_embedded,
+                "chunks_indexed": self.chunks_indexed,
+                "elapsed_seconds": round(elapsed, 2),
+                "chunks_per_second": round(self.chunks_indexed / elapsed, 1) if elapsed > 0 else 0.0,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": round(self.cache_hits / (self.cache_hits + self.cache_misses), 3) if self.cache_hits + self.cache_misses else 0.0,
+                "skipped": self.skipped,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    Runs ingestion jobs on a bounded thread pool and keeps their progress in memory.
+    With a `session_factory`, progress is mirrored to the ingest_jobs table (throttled, but
+    every stage or status change is written) for polls that land on another worker process.
+    """
+    def __init__(self, workers: int, session_factory=None):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, IngestJob] = {}
+        self.session_factory = session_factory
+
+    def submit(self, engine, filename: str, path: str, user_id: str, tenant: Optional[str] = None) -> IngestJob:
+        """Queue a saved upload for ingestion into the tenant's stores; the temp file is removed when the job ends."""
+        self._prune()
+        job = IngestJob(filename=filename, path=path, user_id=user_id, tenant=tenant)
+        self._jobs[job.id] = job
+        self._persist(job)
+        self._pool.submit(self._run, job, engine)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def status(self, job_id: str, user_id: str) -> Optional[dict]:
+        """Progress of a user's job, whether it runs in this process or another one."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict() if job.user_id == user_id else None
+        if self.session_factory is None: return None
+        with self.session_factory() as db:
+            record = db.query(IngestJobRecord).filter_by(id=job_id, user_id=user_id).first()
+            return json.loads(record.state) if record else None
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                self._jobs.pop(job_id, None)
+        if self.session_factory is None: return
+        try:
+            with self.session_factory() as db:
+                db.query(IngestJobRecord).filter(IngestJobRecord.finished_at < datetime.utcnow() - timedelta(seconds=JOB_RETENTION_SECONDS)).delete()
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Job Prune Error: {e}")
+
+    def _progress(self, job: IngestJob):
+        """Progress callback that also mirrors the job to the database."""
+        def report(stage: Optional[str] = None, **counters):
+            job.update(stage, **counters)
+            self._persist(job)
+        return report
+
+    def _persist(self, job: IngestJob, force: bool = False):
+        if self.session_factory is None: return
+        status, stage, written_at = job._persisted
+        now = time.time()
+        if not force and (job.status, job.stage) == (status, stage) and now - written_at < PERSIST_INTERVAL_SECONDS:
+            return
+        job._persisted = (job.status, job.stage, now)
+        try:
+            with self.session_factory() as db:
+                db.merge(IngestJobRecord(
+                    id=job.id, user_id=job.user_id, state=json.dumps(job.to_dict()),
+                    finished_at=datetime.utcfromtimestamp(job.finished_at) if job.finished_at else None,
+                    updated_at=datetime.utcnow(),
+                ))
+                db.commit()
+        except Exception as e:  # Progress reporting must never fail the ingest itself
+            logger.warning(f"Job Persist Error ({job.filename}): {e}")
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: IngestJob, engine):
+        progress = self._progress(job)
+        progress(status="running", started_at=time.time())
+        try:
+            engine.process_document(job.path, source=job.filename, progress=progress, tenant=job.tenant)
+            job.update("done", status="completed")
+        except Exception as e:
+            logger.error(f"Index Error ({job.filename}): {e}")
+            job.update(status="failed", error=str(e))
+        finally:
+            job.update(finished_at=time.time())
+            self._persist(job, force=True)
+            if os.path.exists(job.path): os.remove(job.path)
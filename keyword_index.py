@@ -0,0 +1,526 @@
+"""
+VANT AI: Persistent Keyword Index
+An incrementally updatable BM25 inverted index that lives next to the vector store.
+Uploads add postings for new chunks and deletes drop postings for a source,
+so the corpus never has to be re-read from ChromaDB.
+
+Compacted generations are written as flat arrays (postings keyed by a 64-bit term hash, chunk
+text and metadata as byte blobs) that every process memory-maps read-only, so API workers share
+one copy of the index in the page cache. Each process keeps in memory only a deleted-row mask
+and the chunks journaled since the last compaction, and tails the journal (reloading after
+another process compacts).
+"""
+import hashlib
+import json
+import math
+import os
+import pickle
+import re
+import shutil
+import threading
+from collections import Counter, defaultdict
+from heapq import nlargest
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from file_lock import file_lock
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit key for a term (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _Snapshot:
+    """
+    One compacted generation, memory-mapped read-only. Rows are in indexing order; `source_rows`
+    lists each source's rows in document order (page, then offset, then row).
+    """
+    ARRAYS = ("ids", "sorted_ids", "sorted_id_rows", "lengths", "pages", "starts", "row_source", "source_rows",
+              "text_offsets", "metadata_offsets", "term_hashes", "posting_offsets", "posting_rows", "posting_tfs")
+
+    def __init__(self, path: Optional[str] = None):
+        self.rows, self.total_length, self.source_names, self.sources = 0, 0, [], {}
+        if path is None: return
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.rows, self.total_length = meta["rows"], meta["total_length"]
+        self.source_names = [name for name, _, _ in meta["sources"]]
+        self.sources = {name: (start, end) for name, start, end in meta["sources"]}
+        if not self.rows: return
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        blob = lambda name: np.memmap(os.path.join(path, name), dtype=np.uint8, mode="r") if os.path.getsize(os.path.join(path, name)) else np.zeros(0, np.uint8)
+        self.texts, self.metadatas = blob("texts.bin"), blob("metadata.bin")
+
+    def row_of(self, chunk_id: str) -> Optional[int]:
+        if not self.rows: return None
+        key = chunk_id.encode("utf-8")
+        if len(key) > self.sorted_ids.dtype.itemsize: return None
+        i = int(np.searchsorted(self.sorted_ids, key))
+        return int(self.sorted_id_rows[i]) if i < self.rows and self.sorted_ids[i] == key else None
+
+    def chunk_id(self, row: int) -> str:
+        return self.ids[row].decode("utf-8")
+
+    def text(self, row: int) -> str:
+        return self.texts[self.text_offsets[row]:self.text_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def metadata(self, row: int) -> dict:
+        return json.loads(self.metadatas[self.metadata_offsets[row]:self.metadata_offsets[row + 1]].tobytes())
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, term frequencies) of a term, dead rows included."""
+        if not self.rows: return np.zeros(0, np.int32), np.zeros(0, np.int32)
+        key = np.uint64(term_hash(term))
+        i = int(np.searchsorted(self.term_hashes, key))
+        if i == len(self.term_hashes) or self.term_hashes[i] != key: return np.zeros(0, np.int32), np.zeros(0, np.int32)
+        start, end = self.posting_offsets[i], self.posting_offsets[i + 1]
+        return np.asarray(self.posting_rows[start:end]), np.asarray(self.posting_tfs[start:end])
+
+    def rows_of_source(self, source: str) -> np.ndarray:
+        start, end = self.sources.get(source, (0, 0))
+        return np.asarray(self.source_rows[start:end]) if end > start else np.zeros(0, np.int32)
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index persisted as a memory-mapped snapshot plus an append-only journal.
+    Every mutation is journaled immediately; the journal is folded into a new
+    snapshot once it grows past `compact_every` operations.
+    Writers hold an exclusive file lock and first apply other processes' journal entries;
+    reads call `refresh()`, which costs two stat() calls when nothing changed.
+    """
+    SNAPSHOT_DIR = "snapshot-{}"              # One directory per generation
+    LEGACY_SNAPSHOT_FILE = "snapshot.pkl"     # Pickled snapshot of older releases, converted on first load
+    JOURNAL_FILE = "journal.jsonl"
+    VERSION_FILE = "version"  # Snapshot generation, bumped by every compaction
+    LOCK_FILE = "lock"
+
+    def __init__(self, index_dir: str, k1: float = 1.5, b: float = 0.75, compact_every: int = 5000):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._reset()
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+        if self._legacy: self.compact()  # Rewrites the pickle in the memory-mapped format
+
+    def _reset(self):
+        self._base = _Snapshot()
+        self._alive = np.zeros(0, dtype=bool)                       # Snapshot rows not deleted since
+        self._base_live = 0
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # Journaled chunks: term -> {chunk_id: term frequency}
+        self.chunks: Dict[str, tuple] = {}                           # Journaled chunks: chunk_id -> (text, metadata, length)
+        self.sources: Dict[str, set] = defaultdict(set)              # Journaled chunks: source -> {chunk_id}
+        self.total_length = 0                                        # Over live snapshot rows and journaled chunks
+        self._legacy = False
+        self._journal_ops = 0
+        self._generation = 0
+        self._journal_offset = 0   # Bytes of the journal already applied
+        self._seen = None          # (journal size, journal mtime, version mtime) at the last catch-up
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.index_dir, self.SNAPSHOT_DIR.format(self._generation))
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.index_dir, self.JOURNAL_FILE)
+
+    @property
+    def version_path(self):
+        return os.path.join(self.index_dir, self.VERSION_FILE)
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.index_dir, self.LOCK_FILE)
+
+    def exists(self) -> bool:
+        """True if the index has ever been persisted (even if it is empty now)."""
+        return any(os.path.exists(p) for p in (self.journal_path, self.version_path, os.path.join(self.index_dir, self.LEGACY_SNAPSHOT_FILE)))
+
+    def __len__(self):
+        return self._base_live + len(self.chunks)
+
+    def _lookup(self, chunk_id: str) -> Optional[Tuple[str, dict]]:
+        if chunk_id in self.chunks: return self.chunks[chunk_id][0], self.chunks[chunk_id][1]
+        row = self._base.row_of(chunk_id)
+        if row is None or not self._alive[row]: return None
+        return self._base.text(row), self._base.metadata(row)
+
+    def list_sources(self) -> List[str]:
+        """Names of the indexed source documents."""
+        self.refresh()
+        with self._lock:
+            live = {source for source in self._base.sources if self._alive[self._base.rows_of_source(source)].any()}
+            return sorted(live | set(self.sources))
+
+    def source_chunks(self) -> Dict[str, List[str]]:
+        """Chunk ids per source document, in document order (page, then offset, then indexing order)."""
+        self.refresh()
+        with self._lock:
+            result = {}
+            for source in self._base.sources:
+                rows = self._base.rows_of_source(source)
+                rows = rows[self._alive[rows]]
+                if len(rows): result[source] = [self._base.chunk_id(row) for row in rows]
+            position = {cid: i for i, cid in enumerate(self.chunks)}
+            def order(cid):
+                metadata = self.chunks[cid][1] if cid in self.chunks else self._lookup(cid)[1]
+                page, start = metadata.get("page"), metadata.get("start_index")
+                return (page if isinstance(page, int) else -1, start if isinstance(start, int) else -1,
+                        self._base.rows + position[cid] if cid in position else self._base.row_of(cid))
+            for source, ids in self.sources.items():
+                result[source] = sorted(result.get(source, []) + list(ids), key=order)
+            return result
+
+    def documents(self, ids: List[str]) -> List[Optional[Document]]:
+        """Stored chunks for `ids` as Documents, aligned with `ids` (None for unknown ids)."""
+        self.refresh()
+        with self._lock:
+            found = [self._lookup(i) for i in ids]
+            return [Document(page_content=f[0], metadata=dict(f[1])) if f is not None else None for f in found]
+
+    def texts(self, ids: List[str]) -> List[str]:
+        """Stored chunk texts for `ids` (in the given order, skipping unknown ids)."""
+        self.refresh()
+        with self._lock:
+            return [found[0] for found in map(self._lookup, ids) if found is not None]
+
+    # ---------------------------------------------------------
+    # Mutations
+    # ---------------------------------------------------------
+
+    def add_documents(self, ids: List[str], documents: List[Document]):
+        """Index new chunks under their vector-store ids."""
+        with self._lock, file_lock(self.lock_path):
+            self._catch_up()
+            ops = []
+            for chunk_id, doc in zip(ids, documents):
+                self._add(chunk_id, doc.page_content, dict(doc.metadata))
+                ops.append({"op": "add", "id": chunk_id, "text": doc.page_content, "metadata": doc.metadata})
+            self._journal(ops)
+
+    def remove_source(self, source: str):
+        """Drop every chunk that belongs to a source document."""
+        with self._lock, file_lock(self.lock_path):
+            self._catch_up()
+            if source not in self.sources and not self._alive[self._base.rows_of_source(source)].any(): return
+            self._remove_source(source)
+            self._journal([{"op": "remove", "source": source}])
+
+    def remove_chunks(self, ids: List[str]):
+        """Drop specific chunks by id (e.g. to roll back a partially ingested file)."""
+        with self._lock, file_lock(self.lock_path):
+            self._catch_up()
+            ids = [i for i in ids if self._lookup(i) is not None]
+            if not ids: return
+            for chunk_id in ids:
+                self._remove_chunk(chunk_id)
+            self._journal([{"op": "remove_ids", "ids": ids}])
+
+    def _add(self, chunk_id: str, text: str, metadata: dict):
+        self._remove_chunk(chunk_id)
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        for term, tf in terms.items():
+            self.postings[term][chunk_id] = tf
+        self.chunks[chunk_id] = (text, metadata, length)
+        self.sources[metadata.get("source", "Unknown")].add(chunk_id)
+        self.total_length += length
+
+    def _remove_chunk(self, chunk_id: str):
+        if chunk_id not in self.chunks:
+            row = self._base.row_of(chunk_id)
+            if row is not None and self._alive[row]: self._kill_rows(np.array([row]))
+            return
+        text, metadata, length = self.chunks.pop(chunk_id)
+        for term in set(tokenize(text)):
+            bucket = self.postings.get(term)
+            if bucket is None: continue
+            bucket.pop(chunk_id, None)
+            if not bucket: del self.postings[term]
+        source = metadata.get("source", "Unknown")
+        self.sources[source].discard(chunk_id)
+        if not self.sources[source]: del self.sources[source]
+        self.total_length -= length
+
+    def _remove_source(self, source: str):
+        for chunk_id in list(self.sources.get(source, ())):
+            self._remove_chunk(chunk_id)
+        rows = self._base.rows_of_source(source)
+        self._kill_rows(rows[self._alive[rows]])
+
+    def _kill_rows(self, rows: np.ndarray):
+        """Mark live snapshot rows deleted."""
+        if not len(rows): return
+        self._alive[rows] = False
+        self._base_live -= len(rows)
+        self.total_length -= int(self._base.lengths[rows].sum())
+
+    # ---------------------------------------------------------
+    # Search
+    # ---------------------------------------------------------
+
+    def search(self, query: str, k: int = 8) -> List[Document]:
+        """Return the top-k chunks ranked by BM25."""
+        return [doc for _, _, doc in self.search_scored(query, k)]
+
+    def search_scored(self, query: str, k: int = 8) -> List[Tuple[str, float, Document]]:
+        """Return the top-k (chunk id, BM25 score, document) triples, best first."""
+        self.refresh()
+        with self._lock:
+            n = len(self)
+            if n == 0 or k <= 0: return []
+            avgdl = self.total_length / n or 1.0
+            base_rows, base_scores = [], []
+            scores: Dict[str, float] = defaultdict(float)  # Journaled chunks
+            for term in tokenize(query):
+                rows, tfs = self._base.postings(term)
+                live = self._alive[rows]
+                rows, tfs = rows[live], tfs[live].astype(np.float64)
+                bucket = self.postings.get(term, {})
+                df = len(rows) + len(bucket)
+                if not df: continue
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                if len(rows):
+                    dl = self._base.lengths[rows]
+                    base_rows.append(rows)
+                    base_scores.append(idf * tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * dl / avgdl)))
+                for chunk_id, tf in bucket.items():
+                    dl = self.chunks[chunk_id][2]
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / avgdl))
+
+            candidates = [(score, cid, None) for cid, score in scores.items()]
+            if base_rows:
+                rows, inverse = np.unique(np.concatenate(base_rows), return_inverse=True)
+                totals = np.bincount(inverse, weights=np.concatenate(base_scores))
+                best = np.argpartition(-totals, k - 1)[:k] if len(totals) > k else np.arange(len(totals))
+                candidates += [(float(totals[i]), None, int(rows[i])) for i in best]
+            top = nlargest(k, candidates, key=lambda c: c[0])
+            results = []
+            for score, cid, row in top:
+                if row is None:
+                    text, metadata, _ = self.chunks[cid]
+                else:
+                    cid, text, metadata = self._base.chunk_id(row), self._base.text(row), self._base.metadata(row)
+                results.append((cid, score, Document(page_content=text, metadata=dict(metadata))))
+            return results
+
+    # ---------------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------------
+
+    def _journal(self, ops: List[dict]):
+        """Append ops (caller holds the exclusive file lock and has caught up)."""
+        if not ops: return
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for op in ops:
+                f.write(json.dumps(op) + "\n")
+            self._journal_offset = f.tell()
+        self._journal_ops += len(ops)
+        if self._journal_ops >= self.compact_every:
+            self._compact()
+        self._seen = self._signature()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with self._lock, file_lock(self.lock_path):
+            self._catch_up()
+            self._compact()
+            self._seen = self._signature()
+
+    def _compact(self):
+        """Write live snapshot rows plus journaled chunks as the next generation (file lock held)."""
+        base, live = self._base, np.flatnonzero(self._alive)
+        added = list(self.chunks.items())
+        rows = len(live) + len(added)
+        generation = self._generation + 1
+        path = os.path.join(self.index_dir, self.SNAPSHOT_DIR.format(generation))
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        # Sources: names shared by old rows (by code) and new ones
+        names = list(dict.fromkeys([base.source_names[c] for c in np.unique(base.row_source[live])] if len(live) else []))
+        names += [s for s in dict.fromkeys(m.get("source", "Unknown") for _, (_, m, _) in added) if s not in set(names)]
+        code = {name: i for i, name in enumerate(names)}
+        int_or = lambda value: value if isinstance(value, int) and not isinstance(value, bool) else -1
+
+        arrays = {}
+        if rows:
+            new_ids = np.array([cid.encode("utf-8") for cid, _ in added]) if added else np.zeros(0, "S1")
+            ids = np.concatenate([np.asarray(base.ids[live]) if len(live) else np.zeros(0, "S1"), new_ids])
+            arrays["ids"] = ids
+            arrays["sorted_id_rows"] = np.argsort(ids, kind="stable").astype(np.int32)
+            arrays["sorted_ids"] = ids[arrays["sorted_id_rows"]]
+            old_code = {i: code[name] for i, name in enumerate(base.source_names) if name in code}
+            def column(name, new_values, dtype):
+                old = np.asarray(getattr(base, name)[live]) if len(live) else np.zeros(0, dtype)
+                return np.concatenate([old, np.asarray(new_values, dtype=dtype)]).astype(dtype)
+            arrays["lengths"] = column("lengths", [length for _, (_, _, length) in added], np.int32)
+            arrays["pages"] = column("pages", [int_or(m.get("page")) for _, (_, m, _) in added], np.int32)
+            arrays["starts"] = column("starts", [int_or(m.get("start_index")) for _, (_, m, _) in added], np.int64)
+            old_sources = np.vectorize(old_code.get, otypes=[np.int32])(base.row_source[live]) if len(live) else np.zeros(0, np.int32)
+            arrays["row_source"] = np.concatenate([old_sources, np.asarray([code[m.get("source", "Unknown")] for _, (_, m, _) in added], dtype=np.int32)])
+            row_numbers = np.arange(rows)
+            arrays["source_rows"] = np.lexsort((row_numbers, arrays["starts"], arrays["pages"], arrays["row_source"])).astype(np.int32)
+            bounds = np.searchsorted(arrays["row_source"][arrays["source_rows"]], np.arange(len(names) + 1))
+            arrays["text_offsets"] = self._write_blob(os.path.join(tmp_path, "texts.bin"), base, "texts", "text_offsets", live,
+                                                      [text.encode("utf-8") for _, (text, _, _) in added])
+            arrays["metadata_offsets"] = self._write_blob(os.path.join(tmp_path, "metadata.bin"), base, "metadatas", "metadata_offsets", live,
+                                                          [json.dumps(m).encode("utf-8") for _, (_, m, _) in added])
+            arrays.update(self._merged_postings(base, live, added))
+        else:
+            bounds = np.zeros(len(names) + 1, dtype=np.int64)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        meta = {"rows": rows, "total_length": self.total_length,
+                "sources": [[name, int(bounds[i]), int(bounds[i + 1])] for i, name in enumerate(names) if bounds[i + 1] > bounds[i]]}
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+        # Other processes see the new generation and map the new snapshot instead of tailing
+        with open(self.version_path + ".tmp", "w") as f:
+            f.write(str(generation))
+        os.replace(self.version_path + ".tmp", self.version_path)
+        # Journal replay is idempotent, so a crash between these steps is harmless
+        open(self.journal_path, "w").close()
+        for name in os.listdir(self.index_dir):  # Processes still mapping an old generation keep its pages until they reload
+            if name != os.path.basename(path) and (name.startswith(self.SNAPSHOT_DIR.format("")) or name == self.LEGACY_SNAPSHOT_FILE):
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True) if os.path.isdir(os.path.join(self.index_dir, name)) \
+                    else os.remove(os.path.join(self.index_dir, name))
+
+        total_length = self.total_length
+        self._reset()
+        self._generation = generation
+        self._base = _Snapshot(path)
+        self._alive = np.ones(self._base.rows, dtype=bool)
+        self._base_live, self.total_length = self._base.rows, total_length
+        self._seen = self._signature()
+
+    @staticmethod
+    def _write_blob(path: str, base: _Snapshot, blob: str, offsets: str, live: np.ndarray, new: List[bytes]) -> np.ndarray:
+        """Copy the live rows' byte ranges (one write per run of consecutive rows), append `new`; returns the offsets."""
+        with open(path, "wb") as f:
+            sizes = [np.zeros(0, np.int64)]
+            if len(live):
+                starts, ends = np.asarray(getattr(base, offsets)[live]), np.asarray(getattr(base, offsets)[live + 1])
+                breaks = np.flatnonzero(np.diff(live) != 1) + 1
+                for first, last in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [len(live)]]) - 1):
+                    f.write(getattr(base, blob)[starts[first]:ends[last]].tobytes())
+                sizes.append(ends - starts)
+            for data in new:
+                f.write(data)
+            sizes.append(np.asarray([len(d) for d in new], dtype=np.int64))
+        return np.concatenate([[0], np.cumsum(np.concatenate(sizes))]).astype(np.int64)
+
+    def _merged_postings(self, base: _Snapshot, live: np.ndarray, added: list) -> dict:
+        """Postings of the live snapshot rows (renumbered) and the journaled chunks, grouped by term hash."""
+        hashes, rows, tfs = [], [], []
+        if len(live):
+            renumber = np.cumsum(self._alive) - 1
+            keep = self._alive[base.posting_rows]
+            hashes.append(np.repeat(np.asarray(base.term_hashes), np.diff(base.posting_offsets))[keep])
+            rows.append(renumber[np.asarray(base.posting_rows)[keep]].astype(np.int32))
+            tfs.append(np.asarray(base.posting_tfs)[keep])
+        new_row = {cid: len(live) + i for i, (cid, _) in enumerate(added)}
+        new = [(term_hash(term), new_row[cid], tf) for term, bucket in self.postings.items() for cid, tf in bucket.items()]
+        if new:
+            h, r, t = zip(*new)
+            hashes.append(np.asarray(h, dtype=np.uint64)); rows.append(np.asarray(r, dtype=np.int32)); tfs.append(np.asarray(t, dtype=np.int32))
+        hashes = np.concatenate(hashes) if hashes else np.zeros(0, np.uint64)
+        rows = np.concatenate(rows) if rows else np.zeros(0, np.int32)
+        tfs = np.concatenate(tfs) if tfs else np.zeros(0, np.int32)
+        order = np.lexsort((rows, hashes))
+        hashes, rows, tfs = hashes[order], rows[order], tfs[order]
+        unique, first = np.unique(hashes, return_index=True)
+        return {"term_hashes": unique.astype(np.uint64), "posting_offsets": np.append(first, len(hashes)).astype(np.int64),
+                "posting_rows": rows.astype(np.int32), "posting_tfs": tfs.astype(np.int32)}
+
+    # ---------------------------------------------------------
+    # Cross-process refresh
+    # ---------------------------------------------------------
+
+    def _signature(self):
+        def stat(path):
+            try:
+                st = os.stat(path)
+                return st.st_size, st.st_mtime_ns
+            except FileNotFoundError:
+                return None
+        return stat(self.journal_path), stat(self.version_path)
+
+    def refresh(self):
+        """Apply changes other processes made since the last read (no-op when the files are unchanged)."""
+        if self._signature() == self._seen: return
+        with self._lock, file_lock(self.lock_path, shared=True):
+            self._catch_up()
+
+    def _catch_up(self):
+        """Reload after another process compacted, else replay journal entries past our offset (file lock held)."""
+        if self._read_generation() != self._generation:
+            self._reset()
+            self._load_files()
+        else:
+            self._replay_journal()
+        self._seen = self._signature()
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self.version_path, "r") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _load(self):
+        with file_lock(self.lock_path, shared=True):
+            self._load_files()
+            self._seen = self._signature()
+
+    def _load_files(self):
+        """Map the current snapshot (or read a legacy pickle) and replay any journaled operations on top of it."""
+        self._generation = self._read_generation()
+        legacy_path = os.path.join(self.index_dir, self.LEGACY_SNAPSHOT_FILE)
+        if os.path.exists(self.snapshot_path):
+            self._base = _Snapshot(self.snapshot_path)
+            self._alive = np.ones(self._base.rows, dtype=bool)
+            self._base_live, self.total_length = self._base.rows, self._base.total_length
+        elif os.path.exists(legacy_path):
+            with open(legacy_path, "rb") as f:
+                state = pickle.load(f)
+            for chunk_id, (text, metadata, _) in state["chunks"].items():
+                self._add(chunk_id, text, metadata)
+            self._legacy = True
+        self._replay_journal()
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path): return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            for line in iter(f.readline, b""):
+                if not line.strip(): continue
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Skip a torn write left behind by a crash
+                if op["op"] == "add":
+                    self._add(op["id"], op["text"], op["metadata"])
+                elif op["op"] == "remove":
+                    self._remove_source(op["source"])
+                elif op["op"] == "remove_ids":
+                    for chunk_id in op["ids"]:
+                        self._remove_chunk(chunk_id)
+                self._journal_ops += 1
+            self._journal_offset = f.tell()
@@ -0,0 +1,163 @@
+"""
+VANT AI: Streaming Document Loaders
+Generators that yield a file's content as pages or row-chunks instead of loading it
+whole, so ingestion memory stays flat regardless of file size. PDF pages are parsed
+across a process pool.
+"""
+import csv
+import io
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from config import CHUNK_SIZE, PDF_PARSE_WORKERS, PDF_PAGES_PER_TASK, TABLE_WRITE_BATCH_ROWS
+
+_pdf_pool = None
+
+def start_pdf_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by all PDF uploads. The API creates it at startup; scripts get it on first use.
+    Workers are spawned, not forked: the parent already runs torch, tokenizer and job threads, and a
+    forked copy of their held locks can deadlock the children.
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(cancel_futures=True)
+        _pdf_pool = None
+
+
+def iter_documents(file_path: str, table_sink: Optional[Callable] = None) -> Iterator[Document]:
+    """
+    Yield a file's content (PDF, DOCX, CSV, XLSX, TXT) as a stream of documents.
+    For tabular files, raw rows are also passed to `table_sink(sheet, header, rows)` for columnar storage.
+    """
+    ext = file_path.lower()
+    if ext.endswith('.pdf'):
+        return iter_pdf_pages(file_path)
+    elif ext.endswith('.docx'):
+        from langchain_community.document_loaders import Docx2txtLoader
+        return Docx2txtLoader(file_path).lazy_load()
+    elif ext.endswith('.csv'):
+        return iter_csv_rows(file_path, table_sink)
+    elif ext.endswith('.xlsx'):
+        return iter_excel_rows(file_path, table_sink)
+    else:
+        from langchain_community.document_loaders import TextLoader
+        return TextLoader(file_path).lazy_load()
+
+
+# ---------------------------------------------------------
+# PDF: page ranges parsed in parallel worker processes
+# ---------------------------------------------------------
+
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Worker-process entry point: extract text for pages [start, end)."""
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    return [(i, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+def iter_pdf_pages(file_path: str) -> Iterator[Document]:
+    """
+    Yield one document per PDF page, in order.
+    Page ranges are farmed out to the process pool with a bounded look-ahead window,
+    so at most a few ranges of extracted text are held in memory at once.
+    """
+    from pypdf import PdfReader
+    total_pages = len(PdfReader(file_path).pages)
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, total_pages)) for start in range(0, total_pages, PDF_PAGES_PER_TASK)]
+
+    def page_docs(pages):
+        for page, text in pages:
+            yield Document(page_content=text, metadata={"page": page, "total_pages": total_pages})
+
+    # Small files aren't worth the inter-process hop
+    if len(ranges) <= 1:
+        for start, end in ranges:
+            yield from page_docs(_extract_pdf_pages(file_path, start, end))
+        return
+
+    pool = start_pdf_pool()
+    window = deque()
+    pending = iter(ranges)
+    for start, end in pending:
+        window.append(pool.submit(_extract_pdf_pages, file_path, start, end))
+        if len(window) >= PDF_PARSE_WORKERS * 2: break
+    while window:
+        pages = window.popleft().result()
+        next_range = next(pending, None)
+        if next_range:
+            window.append(pool.submit(_extract_pdf_pages, file_path, *next_range))
+        yield from page_docs(pages)
+
+
+# ---------------------------------------------------------
+# Tables: row-aligned chunks with the header repeated
+# ---------------------------------------------------------
+
+def _format_rows(rows: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(["" if v is None else v for v in row] for row in rows)
+    return buffer.getvalue()
+
+def _iter_row_chunks(header: list, rows: Iterator[list], metadata: dict, table_sink: Optional[Callable] = None) -> Iterator[Document]:
+    """
+    Pack whole rows into chunks of up to CHUNK_SIZE characters, each starting with the header line,
+    so a chunk never cuts a row in half. Marked `row_aligned` so the text splitter leaves them intact.
+    Rows are also forwarded to `table_sink(sheet, header, rows)` in TABLE_WRITE_BATCH_ROWS batches.
+    """
+    header_line = _format_rows([header])
+    chunk_lines, chunk_len, chunk_first_row = [], len(header_line), 0
+    pending_rows = []
+
+    for index, row in enumerate(rows):
+        line = _format_rows([row])
+        if chunk_lines and chunk_len + len(line) > CHUNK_SIZE:
+            yield Document(page_content=(header_line + "".join(chunk_lines)).rstrip("\n"), metadata={**metadata, "row": chunk_first_row, "row_aligned": True})
+            chunk_lines, chunk_len, chunk_first_row = [], len(header_line), index
+        chunk_lines.append(line)
+        chunk_len += len(line)
+
+        if table_sink:
+            pending_rows.append(row)
+            if len(pending_rows) >= TABLE_WRITE_BATCH_ROWS:
+                table_sink(metadata.get("sheet"), header, pending_rows)
+                pending_rows = []
+
+    if chunk_lines:
+        yield Document(page_content=(header_line + "".join(chunk_lines)).rstrip("\n"), metadata={**metadata, "row": chunk_first_row, "row_aligned": True})
+    if table_sink and pending_rows:
+        table_sink(metadata.get("sheet"), header, pending_rows)
+
+def iter_csv_rows(file_path: str, table_sink: Optional[Callable] = None) -> Iterator[Document]:
+    """Yield a CSV as row-aligned chunks, each starting with the header."""
+    with open(file_path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None: return
+        yield from _iter_row_chunks(header, reader, {}, table_sink)
+
+def iter_excel_rows(file_path: str, table_sink: Optional[Callable] = None) -> Iterator[Document]:
+    """Yield every sheet of a workbook as row-aligned chunks, streaming rows via openpyxl's read-only mode."""
+    from openpyxl import load_workbook
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    except Exception as e:
+        raise Exception(f"Excel Processing Error: {str(e)}")
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None: continue
+            header = ["" if h is None else h for h in header]
+            yield from _iter_row_chunks(header, rows, {"sheet": sheet.title}, table_sink)
+    finally:
+        workbook.close()
@@ -0,0 +1,169 @@
+"""
+VANT AI: Latency Metrics
+Per-stage timing histograms (retrieval per retriever, prompt assembly, LLM time-to-first-token
+and total, ingestion embedding/indexing) and prompt-token counters rendered in Prometheus text
+format, plus optional per-request traces for debug mode.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace: ContextVar[Optional[List[dict]]] = ContextVar("vant_trace", default=None)
+
+
+class StageHistogram:
+    """Cumulative-bucket latency histogram for one stage."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms: Dict[str, StageHistogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def render(self, counters: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition of all stage histograms plus any extra counters."""
+        lines = [
+            "# HELP vant_stage_duration_seconds Latency of RAG engine stages.",
+            "# TYPE vant_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            counters = {**self._counters, **(counters or {})}
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'vant_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'vant_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'vant_stage_duration_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'vant_stage_duration_seconds_count{{stage="{stage}"}} {h.count}')
+        for name, value in counters.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ---------------------------------------------------------
+# Recording helpers
+# ---------------------------------------------------------
+
+def observe(stage: str, seconds: float):
+    """Record a stage duration in the histograms and in the active request trace, if any."""
+    registry.observe(stage, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append({"stage": stage, "ms": round(seconds * 1000, 2)})
+
+def record_tokens(stage: str, before: int, after: int):
+    """Count the prompt tokens a stage received and passed on, in counters and the active request trace."""
+    registry.increment(f"vant_{stage}_tokens_before_total", before)
+    registry.increment(f"vant_{stage}_tokens_after_total", after)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append({"stage": f"{stage}_tokens", "before": before, "after": after})
+
+@contextmanager
+def timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+def start_trace() -> List[dict]:
+    """Begin collecting stage timings for the current request (context-local); returns the live list."""
+    trace: List[dict] = []
+    _current_trace.set(trace)
+    return trace
+
+
+class LatencyCallbackHandler(BaseCallbackHandler):
+    """
+    Times one chain run through LangChain callbacks: retrieval, prompt assembly,
+    and the LLM's time-to-first-token and total time.
+    """
+    run_inline = True  # Run in the caller's context so request traces see the observations
+
+    def __init__(self):
+        self._starts: Dict = {}
+        self._streamed = set()
+
+    # Retrieval
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        self._starts[run_id] = (time.perf_counter(), kwargs.get("name") or "retriever", parent_run_id)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        if run_id not in self._starts: return
+        start, name, _ = self._starts.pop(run_id)
+        # The hybrid retriever records its keyword/vector/MMR/fusion phases itself; here it's the total
+        observe("retrieval_total" if name == "hybrid" else f"retrieval_{name}", time.perf_counter() - start)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+    # Prompt assembly
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        if kwargs.get("name") == "ChatPromptTemplate":
+            self._starts[run_id] = (time.perf_counter(), "prompt_assembly", None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self._starts and self._starts[run_id][1] == "prompt_assembly":
+            observe("prompt_assembly", time.perf_counter() - self._starts.pop(run_id)[0])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+    # LLM
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = (time.perf_counter(), "llm", None)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = (time.perf_counter(), "llm", None)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._starts and run_id not in self._streamed:
+            self._streamed.add(run_id)
+            observe("llm_ttft", time.perf_counter() - self._starts[run_id][0])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id not in self._starts: return
+        elapsed = time.perf_counter() - self._starts.pop(run_id)[0]
+        if run_id not in self._streamed:
+            observe("llm_ttft", elapsed)  # Non-streaming call: the first token arrives with the full answer
+        self._streamed.discard(run_id)
+        observe("llm_total", elapsed)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+        self._streamed.discard(run_id)
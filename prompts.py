@@ -26,9 +26,63 @@ RAG_SYSTEM_PROMPT = (
     "Context:\n{context}"
 )
 
+# Prompt for folding older chat turns into the session's rolling summary
+# Keeps long conversations within a fixed prompt budget
+HISTORY_SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an AI assistant. "
+    "Keep facts, names, numbers, decisions and open questions the assistant may need later; "
+    "drop pleasantries. Reply with the updated summary only, in under 200 words.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New messages to fold in:\n{messages}"
+)
+
 # Prompt for generating a 3-bullet document summary
 SUMMARIZATION_PROMPT_TEMPLATE = (
     "Please provide a concise 3-bullet point summary of the following document content. "
     "Focus on the main topics and key takeaways.\n\n"
     "Content:\n{content}"
 )
+
+# Map-reduce summarization of long documents: each group of consecutive chunks is summarized,
+# then the partial summaries are merged (in several rounds if needed) into the final 3 bullets.
+SUMMARY_MAP_PROMPT = (
+    "Summarize part {part} of {parts} of a document. "
+    "Keep the main topics, key facts, names and numbers; reply in under 150 words.\n\n"
+    "Content:\n{content}"
+)
+
+SUMMARY_COMBINE_PROMPT = (
+    "The following are summaries of consecutive parts of one document, in order. "
+    "Merge them into a single summary that keeps the main topics, key facts, names and numbers; "
+    "reply in under 200 words.\n\n"
+    "Summaries:\n{summaries}"
+)
+
+SUMMARY_REDUCE_PROMPT = (
+    "The following are summaries of consecutive parts of one document, in order. "
+    "Please provide a concise 3-bullet point summary of the whole document. "
+    "Focus on the main topics and key takeaways.\n\n"
+    "Summaries:\n{summaries}"
+)
+
+# Planner prompt for the structured (tabular) query path.
+# The LLM only produces a JSON query spec; it is executed with pandas, never as code.
+TABLE_QUERY_PLANNER_PROMPT = (
+    "You translate questions about spreadsheet data into a JSON query.\n\n"
+    "Available tables (column types in parentheses):\n{tables}\n\n"
+    "Return ONLY a JSON object with these keys:\n"
+    '- "table": exact table name from the list, or null if the question is not answerable from one table\n'
+    '- "filters": list of {{"column", "op", "value"}} where op is one of ==, !=, >, >=, <, <=, contains, in\n'
+    '- "group_by": list of column names (may be empty)\n'
+    '- "aggregations": list of {{"column", "func"}} where func is one of sum, mean, min, max, count, median, nunique (may be empty)\n'
+    '- "columns": columns to return when there are no aggregations (empty means all)\n'
+    '- "sort_by": {{"column", "descending"}} or null (you may sort by an aggregation output named <func>_<column>)\n'
+    '- "limit": maximum number of rows to return\n\n'
+    "Question: {question}"
+)
+
+# Wrapper that presents structured query results to the answer prompt as context
+TABLE_RESULT_CONTEXT_TEMPLATE = (
+    "Structured query result from table \"{table}\" "
+    "({matched_rows} of {total_rows} rows matched the filters):\n{rows}"
+)
@@ -1,151 +1,565 @@
 import os
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader, CSVLoader
+import json
+import time
+import shutil
+import uuid
+import logging
+import asyncio
+import numpy as np
+import threading
+from collections import deque
+from functools import partial
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from urllib.parse import urlparse
 from langchain_core.documents import Document 
-import pandas as pd 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_classic.chains import create_history_aware_retriever, create_retrieval_chain
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
-from langchain_classic.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 
 # Externalized Configuration & Prompts
-from config import GROQ_API_KEY, DEFAULT_MODEL, DB_DIR, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP
-from prompts import CONTEXTUALIZE_Q_SYSTEM_PROMPT, RAG_SYSTEM_PROMPT, SUMMARIZATION_PROMPT_TEMPLATE
+from config import GROQ_API_KEY, DEFAULT_MODEL, AVAILABLE_MODELS, DB_DIR, KEYWORD_INDEX_DIR, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_BATCH_SIZE, MAX_PENDING_WRITES, TABLE_DIR
+from config import RETRIEVER_K, MMR_FETCH_K, MMR_LAMBDA, HYBRID_WEIGHTS, HYBRID_FUSION
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_SERVICE_ADDRESS, CHROMA_SERVER_URL
+from config import VECTOR_BACKEND, VECTOR_INDEX_DIR, QUANTIZED_DTYPE, QUANTIZED_RESCORE, IVF_MIN_ROWS, IVF_NPROBE
+from config import ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_VERSION_FILE
+from config import TENANT_DIR, TENANT_IDLE_SECONDS, MAX_LOADED_TENANTS
+from config import SUMMARY_GROUP_TOKENS, SUMMARY_MAX_CONCURRENCY, BATCH_CHUNK_SIZE, BATCH_MAX_CONCURRENCY
+from config import RERANK_ENABLED, RERANK_MODEL, RERANK_TOP_N, RERANK_TOKEN_BUDGET, RERANK_MAX_LATENCY_MS, RERANK_BATCH_SIZE
+from config import CONTEXT_COMPRESSION, CONTEXT_DEDUP_THRESHOLD, DEFAULT_CONTEXT_TOKENS
+from prompts import CONTEXTUALIZE_Q_SYSTEM_PROMPT, RAG_SYSTEM_PROMPT
+from prompts import TABLE_QUERY_PLANNER_PROMPT, TABLE_RESULT_CONTEXT_TEMPLATE, HISTORY_SUMMARY_PROMPT
+from keyword_index import KeywordIndex
+from hybrid_retriever import HybridRetriever, CONFIGURABLE_FIELDS, FUSION_METHODS
+from embedding_service import RemoteEmbeddings, load_embeddings
+from vector_backends import ChromaVectors, QuantizedVectors
+from answer_cache import SemanticAnswerCache
+from reranker import CrossEncoderReranker
+from context_compression import ContextCompressor
+from loaders import iter_documents
+from tabular import TableStore, looks_tabular
+from tenants import Tenant, TenantRegistry
+from document_catalog import DocumentCatalog, file_digest
+from summarizer import DocumentSummarizer
+from retry import acall_with_retry
+from file_lock import file_lock
+import session_db
+import metrics
+from metrics import LatencyCallbackHandler
+
+logger = logging.getLogger("VANT-AI")
+
+# Startup stages, in the order they come online (see RAGEngine.readiness); "reranker" follows when enabled
+COMPONENTS = ("keyword_index", "llm", "embeddings", "vector_store")
 
 class RAGEngine:
     """
     The core AI engine of VANT AI. 
     Handles document indexing, hybrid search (Vector + BM25), and RAG chain orchestration.
     """
-    def __init__(self):
-        """Initialize embeddings, vector store, and the Groq LLM client."""
-        # 1. Initialize Local Embeddings (CPU-based)
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
-            model_kwargs={'device': 'cpu'}
-        )
-        
-        # 2. Connect to Persistent ChromaDB
-        self.vectorstore = Chroma(
-            persist_directory=DB_DIR,
-            embedding_function=self.embeddings
+    def __init__(self, db_dir: Optional[str] = None, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 retriever_k: int = RETRIEVER_K, fetch_k: int = MMR_FETCH_K, mmr_lambda: float = MMR_LAMBDA,
+                 hybrid_weights=HYBRID_WEIGHTS, fusion: str = HYBRID_FUSION, rerank: bool = RERANK_ENABLED, base_embeddings=None, lazy: bool = False,
+                 vector_backend: str = VECTOR_BACKEND, compress_context: bool = CONTEXT_COMPRESSION):
+        """
+        Initialize the keyword index and the Groq LLM client; embeddings and the vector store follow in `warm_up()`.
+        With `lazy=True` the caller runs `warm_up()` itself (the API does so in the background, answering from
+        keyword search meanwhile); otherwise it runs here and the engine is fully loaded on return.
+        Arguments default to config.py; overriding them (and `db_dir`, which relocates every on-disk store)
+        lets benchmarks/retrieval_bench.py build isolated engines per parameter set.
+        Document methods take a `tenant` id; each tenant has its own collection, keyword index and
+        table store, and None is the shared workspace. `vector_backend` is "chroma" or "quantized".
+        """
+        if vector_backend not in ("chroma", "quantized"): raise ValueError(f"Unknown vector backend: {vector_backend}")
+        self._started = time.perf_counter()
+        self._readiness = {name: None for name in COMPONENTS}  # Component -> seconds until it came online
+        self._vector_ready = threading.Event()
+        self._warm_up_error = None
+
+        self.chunk_size, self.chunk_overlap = chunk_size, chunk_overlap
+        self.retriever_k, self.fetch_k, self.mmr_lambda = retriever_k, fetch_k, mmr_lambda
+        self.hybrid_weights, self.fusion = list(hybrid_weights), fusion
+        self._db_dir = db_dir or DB_DIR
+        self._relocate = (lambda path: path) if db_dir is None else (lambda path: os.path.join(db_dir, os.path.relpath(path, DB_DIR)))
+        self._base_embeddings = base_embeddings
+        self._shared_services = db_dir is None and base_embeddings is None  # Relocated/benchmark engines stay self-contained
+
+        # Optional cross-encoder between retrieval and generation (model loads in warm_up)
+        self.reranker = CrossEncoderReranker(
+            RERANK_MODEL,
+            top_n=RERANK_TOP_N,
+            token_budget=RERANK_TOKEN_BUDGET,
+            max_latency_ms=RERANK_MAX_LATENCY_MS,
+            batch_size=RERANK_BATCH_SIZE
+        ) if rerank else None
+        if self.reranker: self._readiness["reranker"] = None
+
+        # Merges neighbouring chunks, drops near-duplicates and fits the context to the model's budget
+        self.compressor = ContextCompressor(dedup_threshold=CONTEXT_DEDUP_THRESHOLD) if compress_context else None
+
+        # Loaded by warm_up(); until then queries use keyword search only
+        self.embeddings = None
+        self.vector_backend = vector_backend
+        self._chroma_client = None  # Shared by every tenant's collection (Chroma backend)
+        self._vectors_online = False
+
+        # 1. Catalog of ingested files (relocated engines get their own database next to their stores)
+        if db_dir is None:
+            session_db.init_db()
+            self.catalog = DocumentCatalog(session_db.SessionLocal)
+        else:
+            os.makedirs(db_dir, exist_ok=True)
+            self.catalog = DocumentCatalog(session_db.create_session_factory(f"sqlite:///{os.path.join(db_dir, 'catalog.db')}"))
+
+        # 2. Per-tenant keyword indexes (and table stores), each loaded from its snapshot on first use
+        self.tenants = TenantRegistry(
+            self._open_tenant,
+            shared_dir=self._db_dir,
+            tenants_dir=self._relocate(TENANT_DIR),
+            idle_seconds=TENANT_IDLE_SECONDS,
+            max_loaded=MAX_LOADED_TENANTS
         )
-        
+        self._mark_ready("keyword_index")
+
         # 3. Setup Groq LLM
-        self.llm = ChatGroq(
-            model_name=DEFAULT_MODEL,
+        self.model_name = DEFAULT_MODEL
+        self.llm = self._make_llm(DEFAULT_MODEL)
+        self._mark_ready("llm")
+        self._create_rag_chain()
+
+        # 4. Single writer thread so concurrent ingestion jobs never interleave index writes
+        self._index_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-writer")
+        # Quantized-backend conversions of existing workspaces run here, off the request path
+        self._vector_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-backfill")
+        self._vector_builds = {}  # Tenant root dir -> Future of its running conversion
+        self._vector_builds_lock = threading.Lock()
+
+        # 5. Semantic cache for repeated questions (skips retrieval + LLM on a hit)
+        self.answer_cache = SemanticAnswerCache(
+            threshold=ANSWER_CACHE_THRESHOLD,
+            ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+            max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            version_path=lambda tenant_id: os.path.join(self.tenants.root_dir(tenant_id), ANSWER_CACHE_VERSION_FILE)
+        )
+
+        # 6. Whole-document summaries: chunk groups summarized concurrently, then merged
+        self.summarizer = DocumentSummarizer(group_tokens=SUMMARY_GROUP_TOKENS, max_concurrency=SUMMARY_MAX_CONCURRENCY)
+
+        if not lazy: self.warm_up()
+
+    def warm_up(self):
+        """Load the embedding model and ChromaDB, then switch queries over to hybrid search."""
+        try:
+            # 1. Local embeddings (CPU-based) behind a content-hash cache, or the shared embedding service under serve.py
+            if self._shared_services and EMBEDDING_SERVICE_ADDRESS:
+                self.embeddings = RemoteEmbeddings(EMBEDDING_SERVICE_ADDRESS)
+            else:
+                self.embeddings = load_embeddings(self._base_embeddings, cache_path=self._relocate(EMBEDDING_CACHE_PATH))
+            self._mark_ready("embeddings")
+
+            # 2. Connect to ChromaDB (on disk, or the shared server); tenants attach their collections on next use.
+            # The quantized backend opens each tenant's files on attach instead.
+            if self.vector_backend == "chroma":
+                import chromadb
+                if self._shared_services and CHROMA_SERVER_URL:
+                    url = urlparse(CHROMA_SERVER_URL)
+                    self._chroma_client = chromadb.HttpClient(host=url.hostname, port=url.port or 8000, ssl=url.scheme == "https")
+                else:
+                    self._chroma_client = chromadb.PersistentClient(path=self._db_dir)
+            self._vectors_online = True
+            self._mark_ready("vector_store")
+        except Exception as e:
+            self._warm_up_error = e
+            raise
+        finally:
+            self._vector_ready.set()
+
+        # 3. Reranker last: hybrid search is already live, and until the model loads chunks keep their fused order
+        if self.reranker:
+            try:
+                self.reranker.load()
+                self._mark_ready("reranker")
+            except Exception as e:
+                logger.warning(f"Reranker unavailable, using fused order: {e}")
+                self._readiness.pop("reranker", None)
+
+    def _mark_ready(self, component: str):
+        seconds = time.perf_counter() - self._started
+        self._readiness[component] = seconds
+        metrics.observe(f"startup_{component}", seconds)
+        logger.info(f"{component} ready after {seconds:.2f}s")
+
+    def readiness(self) -> dict:
+        """Per-component startup state, with seconds from engine creation until each came online."""
+        return {
+            "ready": all(v is not None for v in self._readiness.values()),
+            "error": str(self._warm_up_error) if self._warm_up_error else None,
+            "components": {
+                name: {"ready": seconds is not None, "seconds": round(seconds, 3) if seconds is not None else None}
+                for name, seconds in self._readiness.items()
+            },
+        }
+
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """Block until warm_up() finished; raises if it failed (or timed out)."""
+        if not self._vector_ready.wait(timeout):
+            raise RuntimeError("Vector store is still loading.")
+        if not self._vectors_online:
+            raise RuntimeError(f"Vector store failed to load: {self._warm_up_error}")
+
+    @property
+    def vector_ready(self) -> bool:
+        return self._vectors_online
+
+    @staticmethod
+    def _make_llm(model_name: str):
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            model_name=model_name,
             temperature=0,
             groq_api_key=GROQ_API_KEY
         )
-        
-        # 4. Prepare Search & Retrieval Layers
-        self.vector_retriever = self.vectorstore.as_retriever(search_type="mmr", search_kwargs={"k": 8, "fetch_k": 20, "lambda_mult": 0.5})
-        self.bm25_retriever = None
-        self._initialize_bm25()
-        self._create_rag_chain()
 
-    def _initialize_bm25(self):
-        """Prepare the BM25 (Keyword) retriever using current documents in ChromaDB."""
-        data = self.vectorstore.get()
-        if data and 'documents' in data and data['documents']:
+    # ---------------------------------------------------------
+    # Tenant stores
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def _in_root(root_dir: str, path: str) -> str:
+        """A DB_DIR-relative config path inside a tenant's directory."""
+        return os.path.join(root_dir, os.path.relpath(path, DB_DIR))
+
+    def _open_tenant(self, tenant_id: Optional[str], root_dir: str) -> Tenant:
+        """Registry callback: load a tenant's keyword index and table store from its directory."""
+        in_root = partial(self._in_root, root_dir)
+        tenant = Tenant(tenant_id, root_dir, KeywordIndex(in_root(KEYWORD_INDEX_DIR)), TableStore(in_root(TABLE_DIR)))
+        if tenant.keyword_index.exists(): self._backfill_catalog(tenant)
+        return tenant
+
+    def _tenant(self, tenant_id: Optional[str]) -> Tenant:
+        """The tenant's stores, with its vector backend attached once the vector store has loaded."""
+        tenant = self.tenants.get(tenant_id)
+        if tenant.vectorstore is None and self.vector_ready: self._attach_vectorstore(tenant)
+        return tenant
+
+    def _attach_vectorstore(self, tenant: Tenant, wait: bool = False):
+        """
+        Open the tenant's vector backend. While an existing workspace is still being converted to the
+        quantized backend it stays detached (retrieval is keyword-only) unless `wait`, which writers pass.
+        """
+        if tenant.vectorstore is None and self.vector_backend == "quantized":
+            build = self._pending_vector_build(tenant)
+            if build is not None:
+                if not wait: return
+                build.result()
+        with tenant.lock:
+            if tenant.vectorstore is not None: return
+            if self.vector_backend == "quantized":
+                vectorstore = self._quantized_vectors(self._in_root(tenant.root_dir, VECTOR_INDEX_DIR))
+            else:
+                from langchain_chroma import Chroma
+                vectorstore = ChromaVectors(Chroma(
+                    client=self._chroma_client,
+                    collection_name=tenant.collection_name,
+                    embedding_function=self.embeddings
+                ))
+                if not tenant.keyword_index.exists():
+                    self._initialize_keyword_index(vectorstore, tenant.keyword_index)
+                    self._backfill_catalog(tenant)
+            tenant.vectorstore = vectorstore
+
+    @staticmethod
+    def _quantized_vectors(index_dir: str) -> QuantizedVectors:
+        return QuantizedVectors(index_dir, dtype=QUANTIZED_DTYPE, rescore=QUANTIZED_RESCORE, nprobe=IVF_NPROBE, ivf_min_rows=IVF_MIN_ROWS)
+
+    def _pending_vector_build(self, tenant: Tenant):
+        """Future of the tenant's running quantized conversion (started if it is needed), or None once it has vectors."""
+        index_dir = self._in_root(tenant.root_dir, VECTOR_INDEX_DIR)
+        if os.path.exists(os.path.join(index_dir, QuantizedVectors.META_FILE)) or not len(tenant.keyword_index): return None
+        with self._vector_builds_lock:
+            build = self._vector_builds.get(tenant.root_dir)
+            if build is None:
+                build = self._vector_builder.submit(self._backfill_vectors, tenant, index_dir)
+                build.add_done_callback(partial(self._vector_build_done, tenant))
+                self._vector_builds[tenant.root_dir] = build
+            return build
+
+    def _vector_build_done(self, tenant: Tenant, build):
+        with self._vector_builds_lock:
+            self._vector_builds.pop(tenant.root_dir, None)  # A failed conversion is retried by the next request
+        if build.exception() is not None:
+            logger.error(f"Quantized vector conversion failed for tenant {tenant.tenant_id or '(shared)'}: {build.exception()}")
+
+    def _backfill_vectors(self, tenant: Tenant, index_dir: str):
+        """
+        Switching an existing workspace to the quantized backend: embed the keyword index's chunks
+        (mostly embedding-cache hits, since every chunk was embedded once at upload) into a staging
+        directory that is moved into place when complete, so a crash never leaves a partial index.
+        """
+        with file_lock(index_dir + ".lock"):  # Another worker process may be converting the same tenant
+            if os.path.exists(os.path.join(index_dir, QuantizedVectors.META_FILE)): return
+            staging = index_dir + ".building"
+            shutil.rmtree(staging, ignore_errors=True)  # Left by an interrupted conversion
+            vectorstore = self._quantized_vectors(staging)
+            ids = [cid for chunk_ids in tenant.keyword_index.source_chunks().values() for cid in chunk_ids]
+            for start in range(0, len(ids), INGEST_BATCH_SIZE):
+                batch = ids[start:start + INGEST_BATCH_SIZE]
+                vectors, _ = self.embeddings.embed_documents_with_stats(tenant.keyword_index.texts(batch))
+                vectorstore.add(batch, vectors)
+            shutil.rmtree(index_dir, ignore_errors=True)  # Empty directory from an earlier open
+            os.rename(staging, index_dir)
+        logger.info(f"Built quantized vectors for {len(ids)} chunks of tenant {tenant.tenant_id or '(shared)'}")
+
+    def _backfill_catalog(self, tenant: Tenant):
+        """Catalog documents indexed before the catalog existed (taken from the keyword index, no vector-store scan)."""
+        added = self.catalog.backfill(tenant.tenant_id, tenant.keyword_index.source_chunks())
+        if added: logger.info(f"Catalogued {added} existing documents for tenant {tenant.tenant_id or '(shared)'}")
+
+    def _retrieval_stores(self, tenant_id: Optional[str]):
+        """HybridRetriever callback: (keyword_index, vector_search or None) for one tenant."""
+        tenant = self._tenant(tenant_id)
+        vector_search = partial(self._vector_search, tenant) if tenant.vectorstore is not None else None
+        return tenant.keyword_index, vector_search
+
+    @staticmethod
+    def _initialize_keyword_index(vectorstore, keyword_index: KeywordIndex, page_size: int = 1000):
+        """
+        One-time migration for stores created before the persistent keyword index existed.
+        Pages through ChromaDB so memory stays bounded; afterwards the index is updated incrementally.
+        """
+        offset = 0
+        while True:
+            data = vectorstore.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not data or not data['ids']: break
             docs = [
-                Document(page_content=data['documents'][i], metadata=data['metadatas'][i])
-                for i in range(len(data['documents']))
+                Document(page_content=data['documents'][i], metadata=data['metadatas'][i] or {})
+                for i in range(len(data['ids']))
             ]
-            self.bm25_retriever = BM25Retriever.from_documents(docs)
-            self.bm25_retriever.k = 8
+            keyword_index.add_documents(data['ids'], docs)
+            offset += len(data['ids'])
+        keyword_index.compact()
 
     def change_model(self, model_name: str):
         """Update the LLM model used for inference (e.g., switching from Llama to Mixtral)."""
-        self.llm = ChatGroq(
-            model_name=model_name,
-            temperature=0,
-            groq_api_key=GROQ_API_KEY
-        )
+        self.llm = self._make_llm(model_name)
+        self.model_name = model_name
         self._create_rag_chain()
         return True
 
-    def process_document(self, file_path: str):
+    def process_document(self, file_path: str, source: Optional[str] = None, progress: Optional[Callable] = None, tenant: Optional[str] = None):
         """
         Load a file (PDF, DOCX, CSV, XLSX, TXT), split it into chunks, 
         and add it to the vector database.
+
+        The file is streamed (pages / row-chunks) through the splitter and embedder in bounded batches,
+        so peak memory doesn't grow with file size. Embedding of batch N+1 overlaps with the ChromaDB
+        write of batch N. `progress(stage=None, **counters)` is called as work advances.
+        If any stage fails, chunks already written for this file are rolled back.
+        A byte-identical re-upload under the same name is skipped; new content under an existing
+        name replaces the old version once the new chunks are indexed.
         """
-        ext = file_path.lower()
-        if ext.endswith('.pdf'):
-            loader = PyPDFLoader(file_path)
-            docs = loader.load()
-        elif ext.endswith('.docx'):
-            loader = Docx2txtLoader(file_path)
-            docs = loader.load()
-        elif ext.endswith('.csv'):
-            loader = CSVLoader(file_path)
-            docs = loader.load()
-        elif ext.endswith('.xlsx'):
-            docs = self._load_excel_sheets(file_path)
-        else:
-            loader = TextLoader(file_path)
-            docs = loader.load()
-
-        # Add uniform metadata
-        for doc in docs:
-            doc.metadata["source"] = os.path.basename(file_path)
-            
-        # Split documents into manageable chunks
-        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        self.vectorstore.add_documents(documents=splitter.split_documents(docs))
-        
-        # Refresh the search chain with new data
-        self._initialize_bm25()
-        self._create_rag_chain()
+        report = progress or (lambda stage=None, **counters: None)
+        source = source or os.path.basename(file_path)
+        if not self.vector_ready:
+            report("loading")  # Uploads accepted during startup wait for the embedding model
+            self.wait_until_ready()
+        content_hash, size_bytes = file_digest(file_path), os.path.getsize(file_path)
+
+        # Pinned so the tenant's index can't be evicted and reloaded while this file is written to it
+        with self.tenants.use(tenant) as store, store.source_lock(source):
+            self._attach_vectorstore(store, wait=True)
+            previous = self.catalog.get(tenant, source)
+            if previous is not None and previous.content_hash == content_hash:
+                logger.info(f"Skipped unchanged upload: {source}")
+                report(skipped=True, chunks_total=previous.chunk_count, chunks_indexed=previous.chunk_count)
+                return {"source": source, "chunks": previous.chunk_count, "ids": previous.chunk_id_list, "skipped": True, "cache_hits": 0, "cache_misses": 0}
+
+            result = self._ingest(store, file_path, source, report)
+            if previous is not None:
+                self._delete_chunks(store, previous.chunk_id_list)
+                if not self._is_table_file(file_path): store.table_store.remove_source(source)
+            # Only once the old version is gone: answers cached before this point may cite either version
+            self.answer_cache.invalidate_sources([source], store.tenant_id)
+            self.catalog.put(tenant, source, result["ids"], content_hash, size_bytes)
+            return result
+
+    @staticmethod
+    def _is_table_file(file_path: str) -> bool:
+        return file_path.lower().endswith(('.csv', '.xlsx'))
+
+    def _ingest(self, store: Tenant, file_path: str, source: str, report: Callable):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        # start_index records each chunk's offset in its page, so context compression can merge neighbours
+        splitter = RecursiveCharacterTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap, add_start_index=True)
+
+        ids, writes = [], deque()
+        tables = store.table_store.ingest(source) if self._is_table_file(file_path) else None
+        counters = {"documents": 0, "chunks_total": 0, "chunks_embedded": 0, "chunks_indexed": 0, "cache_hits": 0, "cache_misses": 0}
+
+        def write_batch(batch_ids, batch, vectors):
+            with metrics.timer("ingest_indexing"):
+                self._write_chunks(store, batch_ids, batch, vectors)
+            counters["chunks_indexed"] += len(batch)
+            report(chunks_indexed=counters["chunks_indexed"])
+
+        def embed_batch(batch):
+            report("embedding")
+            batch_ids = [str(uuid.uuid4()) for _ in batch]
+            with metrics.timer("ingest_embedding"):
+                vectors, stats = self.embeddings.embed_documents_with_stats([c.page_content for c in batch])
+            counters["chunks_embedded"] += len(batch)
+            counters["cache_hits"] += stats["hits"]
+            counters["cache_misses"] += stats["misses"]
+            report(chunks_embedded=counters["chunks_embedded"], cache_hits=counters["cache_hits"], cache_misses=counters["cache_misses"])
+            ids.extend(batch_ids)
+            writes.append(self._index_writer.submit(write_batch, batch_ids, batch, vectors))
+            # Backpressure: don't hold more than a few embedded-but-unwritten batches in memory
+            while len(writes) > MAX_PENDING_WRITES:
+                writes.popleft().result()
+
+        def table_sink(sheet, header, rows):
+            # The columnar copy is an optimization; a bad sheet must not fail the whole upload
+            nonlocal tables
+            if tables is None: return
+            try:
+                tables.append(sheet, header, rows)
+            except Exception as e:
+                logger.warning(f"Table Store Error ({source}): {e}")
+                tables.abort()
+                tables = None
 
-    def _load_excel_sheets(self, file_path: str):
-        """Helper to process multi-sheet Excel files into documents."""
         try:
-            df_dict = pd.read_excel(file_path, sheet_name=None)
-            sheets = []
-            for sheet_name, df in df_dict.items():
-                sheets.append(Document(
-                    page_content=df.to_string(index=False), 
-                    metadata={"source": os.path.basename(file_path), "sheet": sheet_name}
-                ))
-            return sheets
-        except Exception as e:
-            raise Exception(f"Excel Processing Error: {str(e)}")
+            # 1. Parse -> 2. Chunk, one streamed document (page / row-chunk) at a time
+            report("parsing")
+            buffer = []
+            for doc in iter_documents(file_path, table_sink=table_sink):
+                doc.metadata["source"] = source  # Add uniform metadata
+                # Row-aligned table chunks are already sized; splitting them would cut rows apart
+                new_chunks = [doc] if doc.metadata.get("row_aligned") else splitter.split_documents([doc])
+                buffer.extend(new_chunks)
+                counters["documents"] += 1
+                counters["chunks_total"] += len(new_chunks)
+                report(documents=counters["documents"], chunks_total=counters["chunks_total"])
 
-    def delete_document(self, filename: str):
-        """Remove a document's embeddings from the database by its filename."""
-        if not self.vectorstore: return
-        
-        data = self.vectorstore.get(where={"source": filename})
-        if data and 'ids' in data and data['ids']:
-            self.vectorstore.delete(ids=data['ids'])
-            
-        self._initialize_bm25()
-        self._create_rag_chain()
+                # 3. Embed full batches as soon as they're available
+                while len(buffer) >= INGEST_BATCH_SIZE:
+                    embed_batch(buffer[:INGEST_BATCH_SIZE])
+                    buffer = buffer[INGEST_BATCH_SIZE:]
+                    report("parsing")
+            if buffer:
+                embed_batch(buffer)
+
+            # 4. Drain pending writes (re-raises the first write error, if any)
+            report("indexing")
+            while writes:
+                writes.popleft().result()
+        except Exception:
+            for future in writes:
+                future.exception()  # Wait for in-flight writes before rolling back
+            self._delete_chunks(store, ids)
+            if tables: tables.abort()
+            raise
+
+        if tables: tables.commit()
+        return {"source": source, "chunks": len(ids), "ids": ids, "cache_hits": counters["cache_hits"], "cache_misses": counters["cache_misses"]}
+
+    def _write_chunks(self, tenant: Tenant, ids: list, chunks: list, vectors: list):
+        """Store pre-computed embeddings in the tenant's vector backend and add postings to its keyword index."""
+        tenant.vectorstore.add(ids, vectors, chunks)
+        # Add postings for the new chunks only (no corpus re-read)
+        tenant.keyword_index.add_documents(ids, chunks)
+
+    def _vector_search(self, tenant: Tenant, query: str, fetch_k: int):
+        """
+        Top `fetch_k` chunks for a query straight from the vector backend, with their stored
+        embeddings so MMR needs no re-embedding. Returns (query_vector, ids, documents, embeddings).
+        """
+        query_vector = self.embeddings.embed_query(query)
+        ids, docs, embeddings = tenant.vectorstore.search(query_vector, fetch_k)
+        if docs is None:  # Quantized backend: chunk text and metadata come from the keyword index
+            found = tenant.keyword_index.documents(ids)
+            keep = [i for i, doc in enumerate(found) if doc is not None]
+            ids, docs, embeddings = [ids[i] for i in keep], [found[i] for i in keep], embeddings[keep]
+        return np.asarray(query_vector, dtype=np.float32), ids, docs, embeddings
+
+    def _delete_chunks(self, tenant: Tenant, ids: list):
+        """Remove specific chunks from the tenant's vector backend and keyword index."""
+        if not ids: return
+        tenant.vectorstore.delete(ids=ids)
+        tenant.keyword_index.remove_chunks(ids)
+
+    def delete_document(self, filename: str, tenant: Optional[str] = None):
+        """Remove a document's chunks from the tenant's stores, by the chunk ids in its catalog entry."""
+        self.wait_until_ready()
+        with self.tenants.use(tenant) as store, store.source_lock(filename):
+            self._attach_vectorstore(store, wait=True)
+            entry = self.catalog.get(tenant, filename)
+            if entry is not None: self._delete_chunks(store, entry.chunk_id_list)
+
+            store.keyword_index.remove_source(filename)  # No-op unless chunks were indexed outside the catalog
+            store.table_store.remove_source(filename)
+            self.catalog.remove(tenant, filename)
+        self.answer_cache.invalidate_sources([filename], tenant)
         return True
 
-    def list_documents(self):
-        """Get the unique names of all indexed documents."""
-        data = self.vectorstore.get()
-        if not data or 'metadatas' not in data: return []
-        return sorted(list(set(m['source'] for m in data['metadatas'] if 'source' in m)))
-
-    def summarize_document(self, filename: str):
-        """Generate a 3-bullet summary for a specific document using LLM-based distillation."""
-        data = self.vectorstore.get(where={"source": filename})
-        if not data or not data['documents']: return "Document not found."
-            
-        content = "\n".join(data['documents'])[:10000] # Cap content to avoid context limits
-        prompt = SUMMARIZATION_PROMPT_TEMPLATE.format(content=content)
-        
+    def list_documents(self, tenant: Optional[str] = None):
+        """Get the names of the tenant's indexed documents from the catalog."""
+        store = self._tenant(tenant)
+        if not store.keyword_index.exists():  # Pre-snapshot store: migrated (and catalogued) once the vector store is open
+            self.wait_until_ready()
+            self._attach_vectorstore(store)
+        return self.catalog.sources(tenant)
+
+    def summarize_document(self, filename: str, tenant: Optional[str] = None):
+        """
+        Generate a 3-bullet summary covering the whole document (map-reduce over all its chunks).
+        Summaries are stored per content hash and model, so repeat requests skip the LLM.
+        """
+        entry, summary, texts = self._summary_inputs(filename, tenant)
+        if summary is not None: return summary
+        if not texts: return "Document not found."
+
+        llm, model = self.llm, self.model_name
+        try:
+            summary = self.summarizer.summarize(llm, texts)
+        except Exception as e:
+            return f"Summarization Error: {str(e)}"
+        self.catalog.put_summary(entry, model, summary)
+        return summary
+
+    async def asummarize_document(self, filename: str, tenant: Optional[str] = None, llm_slots: Optional[asyncio.Semaphore] = None):
+        """
+        Async variant of summarize_document; catalog reads and writes run in a worker thread and
+        each LLM call takes one of the caller's `llm_slots`.
+        """
+        entry, summary, texts = await asyncio.to_thread(self._summary_inputs, filename, tenant)
+        if summary is not None: return summary
+        if not texts: return "Document not found."
+
+        llm, model = self.llm, self.model_name
         try:
-            return self.llm.invoke(prompt).content
+            summary = await self.summarizer.asummarize(llm, texts, llm_slots)
         except Exception as e:
             return f"Summarization Error: {str(e)}"
+        await asyncio.to_thread(self.catalog.put_summary, entry, model, summary)
+        return summary
+
+    def _summary_inputs(self, filename: str, tenant: Optional[str] = None):
+        """(catalog entry, stored summary or None, chunk texts in document order) for a document."""
+        store = self._tenant(tenant)
+        entry = self.catalog.get(tenant, filename)
+        if entry is None: return None, None, []
+        summary = self.catalog.get_summary(entry, self.model_name)
+        if summary is not None: return entry, summary, []
+        # Chunk texts are already in memory in the keyword index; no vector-store read
+        return entry, None, store.keyword_index.texts(entry.chunk_id_list)
+
+    async def asummarize_history(self, summary: Optional[str], transcript: str) -> str:
+        """Fold older chat turns into a session's rolling summary."""
+        prompt = HISTORY_SUMMARY_PROMPT.format(summary=summary or "(none yet)", messages=transcript)
+        return (await self.llm.ainvoke(prompt)).content
 
     def _create_rag_chain(self):
         """
@@ -153,10 +567,19 @@ class RAGEngine:
         Combines history-awareness, hybrid retrieval (Ensemble), and prompt templates.
         """
         # 1. Setup Retrieval Layer (Hybrid Search)
-        base_retriever = EnsembleRetriever(
-            retrievers=[self.bm25_retriever, self.vector_retriever],
-            weights=[0.3, 0.7] # 0.7 weight for semantic, 0.3 for keyword
-        ) if self.bm25_retriever else self.vector_retriever
+        # Keyword and vector searches run concurrently and are fused in NumPy; both read the calling tenant's
+        # live stores, so uploads and deletes don't require a rebuild. Until warm_up() has loaded the
+        # vector store, retrieval is keyword-only.
+        self.retriever = HybridRetriever(
+            name="hybrid",
+            stores=self._retrieval_stores,
+            k=self.retriever_k,
+            fetch_k=self.fetch_k,
+            mmr_lambda=self.mmr_lambda,
+            weights=self.hybrid_weights, # Default 0.7 weight for semantic, 0.3 for keyword
+            fusion=self.fusion,
+            attach_embeddings=self.compressor is not None,  # Compression dedupes on the vectors MMR already has
+        ).with_request_options()
 
         # 2. Dedicated Answer Generation
         qa_prompt = ChatPromptTemplate.from_messages([
@@ -164,19 +587,356 @@ class RAGEngine:
             MessagesPlaceholder("chat_history"),
             ("human", "{input}"),
         ])
-        doc_chain = create_stuff_documents_chain(self.llm, qa_prompt)
+        self.doc_chain = create_stuff_documents_chain(self.llm, qa_prompt)
         
-        # 3. Final RAG Chain (Direct Retrieval to save 1 LLM call)
-        self.rag_chain = create_retrieval_chain(base_retriever, doc_chain)
+        # 3. Optional reranking: only the best few fused chunks (within a token budget) reach the prompt
+        self.context_retriever = itemgetter("input") | self.retriever
+        if self.reranker:
+            self.context_retriever = RunnablePassthrough.assign(candidates=self.context_retriever) | RunnableLambda(self._rerank, name="rerank")
+        if self.compressor:
+            self.context_retriever = self.context_retriever | RunnableLambda(self._compress_context, name="compress_context")
+
+        # 4. Final RAG Chain (Direct Retrieval to save 1 LLM call)
+        self.rag_chain = create_retrieval_chain(self.context_retriever, self.doc_chain)
+
+    def _rerank(self, inputs: dict) -> list:
+        return self.reranker.rerank(inputs["input"], inputs["candidates"])
+
+    def _compress_context(self, documents: list) -> list:
+        return self.compressor.compress(documents, self.context_token_budget())
 
-    def query(self, question: str, chat_history: list = []):
-        """Execute a RAG query and return the answer along with unique sources."""
+    def context_token_budget(self) -> int:
+        """Retrieved-context tokens allowed in the current model's prompt."""
+        model = next((m for m in AVAILABLE_MODELS if m["id"] == self.model_name), {})
+        return model.get("context_tokens", DEFAULT_CONTEXT_TOKENS)
+
+    def query(self, question: str, chat_history: list = [], retrieval: Optional[dict] = None, tenant: Optional[str] = None):
+        """
+        Execute a RAG query over the tenant's documents and return the answer along with unique sources.
+        `retrieval` optionally overrides k, fetch_k, mmr_lambda, weights or fusion for this request.
+        """
+        retrieval = self.validate_retrieval_options(retrieval)
         if not self.rag_chain:
             return {"answer": "AI Engine is initializing...", "sources": []}
+
+        model = self.model_name
+        with metrics.timer("answer_cache_lookup"):
+            vector = self._answer_cache_key(question, chat_history, retrieval)
+            cached = self._cached_answer(vector, model, tenant)
+        if cached: return cached
+
+        # Aggregate/filter questions over spreadsheets: answer from the structured result rows only
+        context = self._query_tables(question, tenant)
+        if context is not None:
+            answer = self.doc_chain.invoke({"input": question, "chat_history": chat_history, "context": context}, config=self._run_config(tenant=tenant))
+            result = {"answer": answer, "sources": self._extract_sources(context)}
+            self._remember_answer(question, vector, model, result, tenant)
+            return result
         
-        raw_result = self.rag_chain.invoke({"input": question, "chat_history": chat_history})
-        
-        # Extract unique sources from retrieved context chunks
-        sources = sorted(list(set(d.metadata.get("source", "Unknown") for d in raw_result.get("context", []))))
+        raw_result = self.rag_chain.invoke({"input": question, "chat_history": chat_history}, config=self._run_config(retrieval, tenant))
         
-        return {"answer": raw_result["answer"], "sources": sources}
+        result = {"answer": raw_result["answer"], "sources": self._extract_sources(raw_result.get("context", []))}
+        self._remember_answer(question, vector, model, result, tenant)
+        return result
+
+    async def aquery(self, question: str, chat_history: list = [], retrieval: Optional[dict] = None, tenant: Optional[str] = None):
+        """Async variant of query; the Groq call never blocks the event loop."""
+        retrieval = self.validate_retrieval_options(retrieval)
+        if not self.rag_chain:
+            return {"answer": "AI Engine is initializing...", "sources": []}
+
+        model = self.model_name
+        with metrics.timer("answer_cache_lookup"):
+            vector = await asyncio.to_thread(self._answer_cache_key, question, chat_history, retrieval)
+            cached = self._cached_answer(vector, model, tenant)
+        if cached: return cached
+
+        context = await self._aquery_tables(question, tenant)
+        if context is not None:
+            answer = await self.doc_chain.ainvoke({"input": question, "chat_history": chat_history, "context": context}, config=self._run_config(tenant=tenant))
+            result = {"answer": answer, "sources": self._extract_sources(context)}
+            self._remember_answer(question, vector, model, result, tenant)
+            return result
+
+        raw_result = await self.rag_chain.ainvoke({"input": question, "chat_history": chat_history}, config=self._run_config(retrieval, tenant))
+
+        result = {"answer": raw_result["answer"], "sources": self._extract_sources(raw_result.get("context", []))}
+        self._remember_answer(question, vector, model, result, tenant)
+        return result
+
+    async def astream_query(self, question: str, chat_history: list = [], retrieval: Optional[dict] = None, tenant: Optional[str] = None,
+                            llm_slots: Optional[asyncio.Semaphore] = None):
+        """
+        Stream a RAG answer as events: one 'sources' event once retrieval finishes,
+        followed by 'token' events as the LLM generates the answer.
+        With `llm_slots`, generation runs in a task holding one slot and buffers its events, so
+        the slot is released as soon as the LLM finishes, however slowly the caller reads.
+        """
+        retrieval = self.validate_retrieval_options(retrieval)
+        if not self.rag_chain:
+            yield {"type": "token", "content": "AI Engine is initializing..."}
+            return
+
+        model = self.model_name
+        with metrics.timer("answer_cache_lookup"):
+            vector = await asyncio.to_thread(self._answer_cache_key, question, chat_history, retrieval)
+            cached = self._cached_answer(vector, model, tenant)
+        if cached:
+            yield {"type": "sources", "sources": cached["sources"], "cached": True}
+            yield {"type": "token", "content": cached["answer"]}
+            return
+
+        events = self._astream_answer(question, chat_history, retrieval, tenant, vector, model)
+        if llm_slots is None:
+            async for event in events:
+                yield event
+            return
+
+        buffered = asyncio.Queue()  # Unbounded: holds at most one answer
+        async def generate():
+            try:
+                async with llm_slots:
+                    async for event in events:
+                        buffered.put_nowait(event)
+            except Exception as e:
+                buffered.put_nowait(e)
+            finally:
+                buffered.put_nowait(None)
+
+        task = asyncio.create_task(generate())
+        try:
+            while (event := await buffered.get()) is not None:
+                if isinstance(event, Exception): raise event
+                yield event
+        finally:
+            task.cancel()  # Stop generating if the caller went away; no-op once it finished
+
+    async def _astream_answer(self, question: str, chat_history: list, retrieval: dict, tenant: Optional[str], vector, model: str):
+        sources, answer = [], []
+        context = await self._aquery_tables(question, tenant)
+        if context is not None:
+            sources = self._extract_sources(context)
+            yield {"type": "sources", "sources": sources}
+            async for token in self.doc_chain.astream({"input": question, "chat_history": chat_history, "context": context}, config=self._run_config(tenant=tenant)):
+                if token:
+                    answer.append(token)
+                    yield {"type": "token", "content": token}
+            self._remember_answer(question, vector, model, {"answer": "".join(answer), "sources": sources}, tenant)
+            return
+
+        async for chunk in self.rag_chain.astream({"input": question, "chat_history": chat_history}, config=self._run_config(retrieval, tenant)):
+            if "context" in chunk:
+                sources = self._extract_sources(chunk["context"])
+                yield {"type": "sources", "sources": sources}
+            if chunk.get("answer"):
+                answer.append(chunk["answer"])
+                yield {"type": "token", "content": chunk["answer"]}
+        self._remember_answer(question, vector, model, {"answer": "".join(answer), "sources": sources}, tenant)
+
+    # ---------------------------------------------------------
+    # Batch question sets
+    # ---------------------------------------------------------
+
+    async def abatch_query(self, items: list, retrieval: Optional[dict] = None, tenant: Optional[str] = None,
+                           max_concurrency: int = BATCH_MAX_CONCURRENCY, llm_slots: Optional[asyncio.Semaphore] = None):
+        """
+        Answer standalone questions ({"id", "question"} items, no chat history), yielding
+        {"id", "question", "answer", "sources", "cached", "error"} for each as it finishes.
+        Every BATCH_CHUNK_SIZE questions are embedded in one call and retrieved as one batch while
+        earlier answers generate; at most `max_concurrency` Groq calls run at once (each also takes
+        one of the caller's `llm_slots`) and rate-limited calls back off and retry. A failed question
+        yields its error instead of stopping the batch. At most max_concurrency x BATCH_CHUNK_SIZE
+        questions are planned but not yet yielded, so memory stays bounded however long the input is
+        and a slow reader pauses planning.
+        """
+        retrieval = self.validate_retrieval_options(retrieval)
+        results, tasks = asyncio.Queue(), set()
+        limit = asyncio.Semaphore(max_concurrency)
+        window = asyncio.Semaphore(max(max_concurrency, 1) * BATCH_CHUNK_SIZE)  # Released as each result is yielded
+
+        async def finish(item, work):
+            try:
+                async with limit:  # Held through rate-limit backoff, so a throttled batch slows down as a whole
+                    result = await work
+                result = {"answer": result["answer"], "sources": result["sources"], "cached": result.get("cached", False), "error": None}
+            except Exception as e:
+                logger.error(f"Batch Question Error ({item['id']}): {e}")
+                result = {"answer": None, "sources": [], "cached": False, "error": f"{type(e).__name__}: {e}"}
+            await results.put({"id": item["id"], "question": item["question"], **result})
+
+        async def produce():
+            for start in range(0, len(items), BATCH_CHUNK_SIZE):
+                chunk = items[start:start + BATCH_CHUNK_SIZE]
+                for _ in chunk: await window.acquire()
+                try:
+                    planned = await self._aplan_batch(chunk, retrieval, tenant, max_concurrency, llm_slots)
+                except Exception as e:
+                    planned = [(item, self._afail(e)) for item in chunk]
+                for item, work in planned:
+                    task = asyncio.create_task(finish(item, work))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+        producer = asyncio.create_task(produce())
+        try:
+            for _ in range(len(items)):
+                result = await results.get()
+                window.release()
+                yield result
+        finally:  # Client went away: stop generating answers nobody will read
+            producer.cancel()
+            for task in list(tasks): task.cancel()
+
+    async def _aplan_batch(self, chunk: list, retrieval: Optional[dict], tenant: Optional[str], max_concurrency: int, llm_slots) -> list:
+        """Embed and retrieve a chunk of questions together; returns (item, awaitable answer) pairs."""
+        questions = [item["question"] for item in chunk]
+        model = self.model_name
+        vectors = [None] * len(chunk)
+        if self.vector_ready:
+            # One embedding call for the chunk; the retriever's per-question embed_query then hits the embedding cache
+            with metrics.timer("batch_embedding"):
+                vectors = await asyncio.to_thread(self.embeddings.embed_documents, questions)
+        if retrieval: vectors = [None] * len(chunk)  # Custom retrieval options bypass the answer cache
+        table_store = (await asyncio.to_thread(self._tenant, tenant)).table_store
+
+        planned, to_retrieve = [], []
+        for item, vector in zip(chunk, vectors):
+            cached = self._cached_answer(vector, model, tenant)
+            if cached:
+                planned.append((item, self._adone(cached)))
+            elif self._table_planner_prompt(item["question"], table_store) is not None:
+                planned.append((item, self._abatch_table_answer(item["question"], vector, model, retrieval, tenant, llm_slots)))
+            else:
+                to_retrieve.append((item, vector))
+
+        if to_retrieve:
+            configs = [dict(self._run_config(retrieval, tenant), max_concurrency=max_concurrency) for _ in to_retrieve]
+            with metrics.timer("batch_retrieval"):
+                contexts = await asyncio.to_thread(
+                    self.context_retriever.batch, [{"input": item["question"]} for item, _ in to_retrieve], configs, return_exceptions=True
+                )
+            for (item, vector), context in zip(to_retrieve, contexts):
+                work = self._afail(context) if isinstance(context, Exception) else self._abatch_answer(item["question"], context, vector, model, tenant, llm_slots)
+                planned.append((item, work))
+        return planned
+
+    async def _abatch_answer(self, question: str, context: list, vector, model: str, tenant: Optional[str], llm_slots) -> dict:
+        inputs = {"input": question, "chat_history": [], "context": context}
+        answer = await acall_with_retry(lambda: self.doc_chain.ainvoke(inputs, config=self._run_config(tenant=tenant)), llm_slots)
+        result = {"answer": answer, "sources": self._extract_sources(context)}
+        self._remember_answer(question, vector, model, result, tenant)
+        return result
+
+    async def _abatch_table_answer(self, question: str, vector, model: str, retrieval: Optional[dict], tenant: Optional[str], llm_slots) -> dict:
+        """Spreadsheet questions plan a structured query first, falling back to retrieval like aquery."""
+        context = await acall_with_retry(lambda: self._aquery_tables(question, tenant), llm_slots)
+        if context is None:
+            context = await asyncio.to_thread(self.context_retriever.invoke, {"input": question}, self._run_config(retrieval, tenant))
+        return await self._abatch_answer(question, context, vector, model, tenant, llm_slots)
+
+    @staticmethod
+    async def _adone(result: dict) -> dict:
+        return result
+
+    @staticmethod
+    async def _afail(error: Exception):
+        raise error
+
+    # ---------------------------------------------------------
+    # Structured (tabular) query path
+    # ---------------------------------------------------------
+
+    @staticmethod
+    def _table_planner_prompt(question: str, table_store: TableStore) -> Optional[str]:
+        """Planner prompt for aggregation/filter questions that name a known table or column, else None."""
+        if not len(table_store) or not looks_tabular(question) or not table_store.mentioned_in(question): return None
+        return TABLE_QUERY_PLANNER_PROMPT.format(tables=table_store.describe(), question=question)
+
+    @staticmethod
+    def _table_context(planner_output: str, table_store: TableStore) -> Optional[list]:
+        """Execute the planner's JSON query; returns the result rows as context, or None to fall back to retrieval."""
+        try:
+            plan = json.loads(planner_output[planner_output.index("{"):planner_output.rindex("}") + 1])
+            result = table_store.execute(plan)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.info(f"Structured query skipped: {e}")
+            return None
+        if result is None or result.empty: return None
+
+        content = TABLE_RESULT_CONTEXT_TEMPLATE.format(
+            table=result.attrs["table"],
+            matched_rows=result.attrs["matched_rows"],
+            total_rows=result.attrs["total_rows"],
+            rows=result.to_csv(index=False),
+        )
+        return [Document(page_content=content, metadata={"source": result.attrs["source"]})]
+
+    def _query_tables(self, question: str, tenant: Optional[str] = None) -> Optional[list]:
+        table_store = self._tenant(tenant).table_store
+        prompt = self._table_planner_prompt(question, table_store)
+        if prompt is None: return None
+        with metrics.timer("table_planner"):
+            return self._table_context(self.llm.invoke(prompt).content, table_store)
+
+    async def _aquery_tables(self, question: str, tenant: Optional[str] = None) -> Optional[list]:
+        table_store = (await asyncio.to_thread(self._tenant, tenant)).table_store
+        prompt = self._table_planner_prompt(question, table_store)
+        if prompt is None: return None
+        with metrics.timer("table_planner"):
+            response = await self.llm.ainvoke(prompt)
+            return await asyncio.to_thread(self._table_context, response.content, table_store)
+
+    # ---------------------------------------------------------
+    # Semantic answer cache helpers
+    # ---------------------------------------------------------
+
+    def _answer_cache_key(self, question: str, chat_history: list, retrieval: Optional[dict] = None):
+        """
+        Embed the question for cache lookup. Follow-up turns are not cached because
+        their answer depends on the conversation, not just the question text; neither are
+        requests with custom retrieval options.
+        """
+        if chat_history or retrieval or not self.vector_ready: return None
+        return self.embeddings.embed_query(question)
+
+    def _cached_answer(self, vector, model: str, tenant: Optional[str] = None):
+        if vector is None: return None
+        hit = self.answer_cache.lookup(vector, model, tenant)
+        if not hit: return None
+        return {"answer": hit["answer"], "sources": hit["sources"], "cached": True}
+
+    def _remember_answer(self, question: str, vector, model: str, result: dict, tenant: Optional[str] = None):
+        if vector is None or not result["answer"]: return
+        self.answer_cache.store(question, vector, model, result["answer"], result["sources"], tenant)
+
+    @staticmethod
+    def _run_config(retrieval: Optional[dict] = None, tenant: Optional[str] = None) -> dict:
+        """
+        Per-call config that records retrieval, prompt and LLM stage latencies, applies retrieval
+        overrides and scopes retrieval to the tenant.
+        """
+        config = {"callbacks": [LatencyCallbackHandler()]}
+        if retrieval or tenant is not None: config["configurable"] = dict(retrieval or {}, tenant=tenant)
+        return config
+
+    @staticmethod
+    def validate_retrieval_options(options: Optional[dict]) -> Optional[dict]:
+        """Check per-request retrieval overrides; raises ValueError on unknown keys or values."""
+        if not options: return None
+        unknown = set(options) - set(CONFIGURABLE_FIELDS)
+        if unknown: raise ValueError(f"Unknown retrieval options: {', '.join(sorted(unknown))}")
+        if "fusion" in options and options["fusion"] not in FUSION_METHODS:
+            raise ValueError(f"fusion must be one of: {', '.join(FUSION_METHODS)}")
+        for key in ("k", "fetch_k"):
+            if key in options and not (isinstance(options[key], int) and 1 <= options[key] <= 100):
+                raise ValueError(f"{key} must be an integer between 1 and 100")
+        if "mmr_lambda" in options and not (isinstance(options["mmr_lambda"], (int, float)) and 0 <= options["mmr_lambda"] <= 1):
+            raise ValueError("mmr_lambda must be between 0 and 1")
+        if "weights" in options and not (isinstance(options["weights"], list) and len(options["weights"]) == 2 and all(isinstance(w, (int, float)) and w >= 0 for w in options["weights"])):
+            raise ValueError("weights must be [keyword, semantic] non-negative numbers")
+        return dict(options)
+
+    @staticmethod
+    def _extract_sources(context: list):
+        """Extract unique sources from retrieved context chunks."""
+        return sorted(list(set(d.metadata.get("source", "Unknown") for d in context)))
@@ -0,0 +1,84 @@
+"""
+VANT AI: Cross-Encoder Reranker
+Optional CPU stage between retrieval and generation. Scores (question, chunk) pairs in
+batches with a small cross-encoder and keeps only the best few within a token budget.
+Scoring has a hard latency cap; when it is exceeded the fused retrieval order is used instead.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+import metrics
+from tokens import estimate_tokens
+
+logger = logging.getLogger("VANT-AI")
+
+
+class CrossEncoderReranker:
+    """
+    Reorders retrieved chunks by cross-encoder relevance.
+    The model (sentence-transformers, already installed for embeddings) is loaded by `load()`;
+    until then, and whenever scoring exceeds `max_latency_ms`, chunks keep their fused order.
+    Either way the result is trimmed to `top_n` chunks and `token_budget` tokens.
+    """
+    def __init__(self, model_name: str, top_n: int = 4, token_budget: int = 1200, max_latency_ms: int = 300, batch_size: int = 16):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.token_budget = token_budget
+        self.max_latency_ms = max_latency_ms
+        self.batch_size = batch_size
+        self.model = None
+        self.timeouts = 0
+        # One scoring thread: requests queue for the CPU instead of oversubscribing it
+        self._scorer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+
+    def load(self):
+        from sentence_transformers import CrossEncoder  # Pulls in torch; imported only when reranking is enabled
+        self.model = CrossEncoder(self.model_name, device="cpu")
+
+    def rerank(self, question: str, documents: List[Document]) -> List[Document]:
+        if not documents: return documents
+        ordered = documents
+        if self.model is not None:
+            scores = self._score_within_cap(question, documents)
+            if scores is not None:
+                ordered = [doc for _, doc in sorted(zip(scores, documents), key=lambda pair: -pair[0])]
+        return self._within_budget(ordered)
+
+    def _score_within_cap(self, question: str, documents: List[Document]) -> Optional[List[float]]:
+        cancelled = threading.Event()
+        pairs = [(question, doc.page_content) for doc in documents]
+
+        def score():
+            scores = []
+            for start in range(0, len(pairs), self.batch_size):
+                if cancelled.is_set(): return None  # Caller already fell back; free the CPU
+                scores.extend(float(s) for s in self.model.predict(pairs[start:start + self.batch_size], batch_size=self.batch_size))
+            return scores
+
+        start = time.perf_counter()
+        future = self._scorer.submit(score)
+        try:
+            scores = future.result(timeout=self.max_latency_ms / 1000)
+        except TimeoutError:
+            cancelled.set()
+            self.timeouts += 1
+            metrics.observe("rerank_timeout", time.perf_counter() - start)
+            logger.info(f"Rerank exceeded {self.max_latency_ms}ms; using fused order")
+            return None
+        metrics.observe("rerank", time.perf_counter() - start)
+        return scores
+
+    def _within_budget(self, documents: List[Document]) -> List[Document]:
+        """First `top_n` chunks that fit in the token budget (always at least one)."""
+        kept, used = [], 0
+        for doc in documents[:self.top_n]:
+            tokens = estimate_tokens(doc.page_content)
+            if kept and used + tokens > self.token_budget: break
+            kept.append(doc)
+            used += tokens
+        return kept
@@ -0,0 +1,57 @@
+"""
+VANT AI: Rate-Limit-Aware Retries
+Used by the batch and summary paths: Groq calls that hit a per-minute request or token
+limit wait (Retry-After, else exponential backoff with jitter) and try again instead of
+failing the whole request. Interactive /chat calls are not retried.
+"""
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from typing import Optional
+
+from config import BATCH_MAX_RETRIES
+
+logger = logging.getLogger("VANT-AI")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Groq (and most HTTP APIs) answer 429 when a per-minute request or token limit is hit."""
+    return getattr(error, "status_code", None) == 429 or "rate limit" in str(error).lower()
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header), if it said."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+def _backoff(error: Exception, attempt: int, max_retries: int, base_delay: float, max_delay: float) -> float:
+    """Seconds to wait before retrying `error`; re-raises it when it isn't a rate limit or retries are used up."""
+    if attempt == max_retries or not is_rate_limited(error): raise error
+    delay = retry_after(error) or min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+    logger.warning(f"Rate limited; retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+    return delay
+
+async def acall_with_retry(call, slot: Optional[asyncio.Semaphore] = None, max_retries: int = BATCH_MAX_RETRIES,
+                           base_delay: float = 1.0, max_delay: float = 60.0):
+    """
+    Await `call()` inside `slot`; on a rate-limit error wait (Retry-After, else exponential backoff
+    with jitter) with the slot released, and try again up to `max_retries` times. Other errors raise at once.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            async with slot or contextlib.nullcontext():
+                return await call()
+        except Exception as e:
+            await asyncio.sleep(_backoff(e, attempt, max_retries, base_delay, max_delay))
+
+def call_with_retry(call, max_retries: int = BATCH_MAX_RETRIES, base_delay: float = 1.0, max_delay: float = 60.0):
+    """Blocking variant of acall_with_retry, for synchronous callers (no slot)."""
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            time.sleep(_backoff(e, attempt, max_retries, base_delay, max_delay))
@@ -0,0 +1,99 @@
+"""
+VANT AI: Multi-Worker Launcher
+Runs several uvicorn worker processes of app.py that share one embedding service and one
+ChromaDB server, so the model is loaded once and every worker sees the same vectors.
+Keyword indexes are memory-mapped snapshots that all workers share through the page cache
+(keyword_index.py), table catalogs are shared on disk (tabular.py),
+and ingestion job progress lives in the database.
+
+Usage:
+    SECRET_KEY=... python serve.py --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import secrets
+import shutil
+import subprocess
+import tempfile
+import time
+
+import uvicorn
+
+import session_db
+from config import HOST, PORT, DB_DIR, API_WORKERS, EMBEDDING_SERVICE_ADDRESS, CHROMA_SERVER_URL, VECTOR_BACKEND
+from config import SECRET_KEY, INSECURE_DEFAULT_SECRET_KEY, EMBEDDING_SERVICE_AUTHKEY_ENV
+from embedding_service import serve as serve_embeddings, wait_for_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("VANT-AI")
+
+
+def start_chroma_server(port: int, timeout: float = 60.0) -> subprocess.Popen:
+    """`chroma run` on DB_DIR (the same files the embedded client uses), once its heartbeat answers."""
+    import chromadb
+    process = subprocess.Popen(["chroma", "run", "--path", DB_DIR, "--host", "127.0.0.1", "--port", str(port)])
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            chromadb.HttpClient(host="127.0.0.1", port=port).heartbeat()
+            return process
+        except Exception:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"ChromaDB server did not start on port {port}")
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run VANT AI with several worker processes.")
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--embedding-address", default=EMBEDDING_SERVICE_ADDRESS,
+                        help="Existing embedding service to use, with EMBEDDING_SERVICE_AUTHKEY set (default: start one on a private Unix socket)")
+    parser.add_argument("--chroma-url", default=CHROMA_SERVER_URL,
+                        help="Existing ChromaDB server to use (default: start one on port+2)")
+    args = parser.parse_args()
+    if SECRET_KEY == INSECURE_DEFAULT_SECRET_KEY:
+        raise SystemExit("SECRET_KEY is still the public default from config.py; set the SECRET_KEY environment variable first.")
+
+    # Create/migrate the schema once, before workers race to do it
+    session_db.init_db()
+
+    children, socket_dir = [], None
+    try:
+        if not args.embedding_address:
+            # Fresh key per launch, inherited by the service and the workers through the environment
+            os.environ[EMBEDDING_SERVICE_AUTHKEY_ENV] = secrets.token_hex(32)
+            if hasattr(os, "fchmod"):  # POSIX: Unix socket inside a 0700 directory only we can enter
+                socket_dir = tempfile.mkdtemp(prefix="vant-embeddings-")
+                args.embedding_address = os.path.join(socket_dir, "service.sock")
+            else:
+                args.embedding_address = f"127.0.0.1:{args.port + 1}"
+            service = multiprocessing.Process(target=serve_embeddings, args=(args.embedding_address,), daemon=True, name="embedding-service")
+            service.start()
+            children.append(service)
+        wait_for_service(args.embedding_address)
+        logger.info(f"Embedding service ready at {args.embedding_address}")
+
+        if VECTOR_BACKEND == "quantized":
+            args.chroma_url = None  # Each worker maps the vector files directly
+        elif not args.chroma_url:
+            children.append(start_chroma_server(args.port + 2))
+            args.chroma_url = f"http://127.0.0.1:{args.port + 2}"
+            logger.info(f"ChromaDB server ready at {args.chroma_url}")
+
+        # Workers are fresh interpreters that read these through config.py
+        os.environ["EMBEDDING_SERVICE_ADDRESS"] = args.embedding_address
+        if args.chroma_url: os.environ["CHROMA_SERVER_URL"] = args.chroma_url
+        uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        for child in children:
+            child.terminate()
+        if socket_dir: shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
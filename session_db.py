@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, event, inspect, text, Column, String, Integer, DateTime, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import json
 import uuid
 
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
 Base = declarative_base()
 
 class User(Base):
@@ -23,10 +26,14 @@ class ChatSession(Base):
  # Temporarily nullable for migration
     title = Column(String, default="New Chat")
     created_at = Column(DateTime, default=datetime.utcnow)
+    summary = Column(Text, nullable=True)                     # Rolling summary of turns older than the history window
+    summarized_until = Column(Integer, default=0)             # Last ChatMessage.id folded into `summary`
     
     user = relationship("User", back_populates="sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
 
+    __table_args__ = (Index("ix_sessions_user_created", "user_id", "created_at"),)
+
 class ChatMessage(Base):
     __tablename__ = 'messages'
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -36,11 +43,92 @@ class ChatMessage(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     session = relationship("ChatSession", back_populates="messages")
 
-engine = create_engine('sqlite:///chat_history.db', connect_args={"check_same_thread": False})
+    __table_args__ = (Index("ix_messages_session_created", "session_id", "created_at"),)
+
+class IndexedDocument(Base):
+    """Catalog entry for one ingested file, so listing, deleting and summarizing never scan the vector store."""
+    __tablename__ = 'documents'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tenant = Column(String, nullable=False, default="")      # Workspace id; "" is the shared workspace
+    source = Column(String, nullable=False)                  # Filename shown to the user
+    content_hash = Column(String, nullable=True)             # SHA-256 of the uploaded bytes (None for backfilled legacy entries)
+    chunk_ids = Column(Text, default="[]")                   # JSON list of vector-store/keyword-index chunk ids, in document order
+    chunk_count = Column(Integer, default=0)
+    size_bytes = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("tenant", "source", name="uq_documents_tenant_source"),)
+
+    @property
+    def chunk_id_list(self):
+        return json.loads(self.chunk_ids or "[]")
+
+    @property
+    def content_key(self):
+        return self.content_hash or f"doc:{self.id}"
+
+class DocumentSummary(Base):
+    """Cached document summary, keyed by content (so it survives renames and is shared by identical uploads)."""
+    __tablename__ = 'document_summaries'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_key = Column(String, nullable=False)             # IndexedDocument content hash (or "doc:<id>" for legacy entries)
+    model = Column(String, nullable=False)
+    summary = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("content_key", "model", name="uq_document_summaries_key_model"),)
+
+class IngestJobRecord(Base):
+    """Last reported progress of an ingestion job, so any API worker process can answer /jobs/{id}."""
+    __tablename__ = 'ingest_jobs'
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False, index=True)
+    state = Column(Text)                                     # JSON of IngestJob.to_dict()
+    finished_at = Column(DateTime, nullable=True, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers proceed during a write; NORMAL sync is durable across app crashes in WAL mode."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+def create_db_engine(url: str):
+    """Pooled engine; SQLite files get WAL mode on every connection, other databases (e.g. Postgres) pre-ping pooled connections."""
+    if url.startswith("sqlite"):
+        in_memory = url in ("sqlite://", "sqlite:///:memory:")
+        pool = {} if in_memory else {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+        db_engine = create_engine(url, connect_args={"check_same_thread": False}, **pool)
+        if not in_memory: event.listen(db_engine, "connect", _sqlite_pragmas)
+        return db_engine
+    return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _migrate()
+
+def _migrate():
+    """Add columns and indexes introduced after a database was created (create_all only adds missing tables)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def create_session_factory(url: str):
+    """Session factory for a separate database (e.g. a benchmark engine's own catalog), with the schema created."""
+    db_engine = create_db_engine(url)
+    Base.metadata.create_all(bind=db_engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
 
 def get_db():
     db = SessionLocal()
@@ -178,6 +178,11 @@ async function loadDocuments() {
         const response = await apiCall('/documents', {
             headers: getAuthHeaders()
         });
+        if (response.status === 503) {
+            // Document store still loading after a restart; chat already works, retry the list shortly
+            setTimeout(loadDocuments, 3000);
+            return;
+        }
         const data = await response.json();
         docList.innerHTML = '';
         if (data.documents && data.documents.length > 0) {
@@ -201,13 +206,15 @@ async function loadDocuments() {
     }
 }
 
-async function loadSessions() {
+// Sessions are paginated newest first; older pages load on demand via the cursor
+async function loadSessions(cursor = null) {
     try {
-        const response = await apiCall('/sessions', {
+        const url = cursor ? `/sessions?cursor=${encodeURIComponent(cursor)}` : '/sessions';
+        const response = await apiCall(url, {
             headers: getAuthHeaders()
         });
         const data = await response.json();
-        sessionList.innerHTML = '';
+        if (!cursor) sessionList.innerHTML = '';
 
         data.sessions.forEach(session => {
             const li = document.createElement('li');
@@ -220,6 +227,15 @@ async function loadSessions() {
             sessionList.appendChild(li);
         });
 
+        if (data.next_cursor) {
+            const more = document.createElement('li');
+            more.className = 'session-item';
+            more.innerHTML = '<i class="fas fa-clock-rotate-left"></i><span class="session-title">Show older chats</span>';
+            more.onclick = () => { more.remove(); loadSessions(data.next_cursor); };
+            sessionList.appendChild(more);
+        }
+        if (cursor) return;
+
         // If no active session, create one
         if (!currentSessionId && data.sessions.length > 0) {
             switchSession(data.sessions[0].id);
@@ -281,12 +297,43 @@ async function switchSession(id) {
                 const content = msg.role === 'assistant' ? marked.parse(msg.content) : msg.content;
                 addMessage(msg.role, content);
             });
+            if (data.next_cursor) addEarlierMessagesButton(id, data.next_cursor);
         }
     } catch (error) {
         chatContainer.innerHTML = '<div class="error-msg">Failed to load chat history.</div>';
     }
 }
 
+// History loads the latest page only; older pages are prepended on request, keeping the scroll position
+function addEarlierMessagesButton(sessionId, cursor) {
+    const button = document.createElement('button');
+    button.className = 'load-earlier';
+    button.textContent = 'Load earlier messages';
+    button.onclick = async () => {
+        button.disabled = true;
+        try {
+            const response = await apiCall(`/sessions/${sessionId}/history?cursor=${encodeURIComponent(cursor)}`, {
+                headers: getAuthHeaders()
+            });
+            const data = await response.json();
+            if (currentSessionId !== sessionId) return;
+            const previousHeight = chatContainer.scrollHeight;
+            button.remove();
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach(msg => {
+                const content = msg.role === 'assistant' ? marked.parse(msg.content) : msg.content;
+                fragment.appendChild(createMessageElement(msg.role, content));
+            });
+            chatContainer.prepend(fragment);
+            if (data.next_cursor) addEarlierMessagesButton(sessionId, data.next_cursor);
+            chatContainer.scrollTop += chatContainer.scrollHeight - previousHeight;
+        } catch (error) {
+            button.disabled = false;
+        }
+    };
+    chatContainer.prepend(button);
+}
+
 async function deleteSession(event, id) {
     event.stopPropagation();
     if (!confirm('Delete this conversation?')) return;
@@ -371,17 +418,17 @@ uploadCard.addEventListener('dragleave', () => {
 uploadCard.addEventListener('drop', (e) => {
     e.preventDefault();
     uploadCard.classList.remove('drag-over');
-    const file = e.dataTransfer.files[0];
-    if (file) {
-        handleFileUpload(file);
+    const files = Array.from(e.dataTransfer.files);
+    if (files.length > 0) {
+        handleFileUpload(files);
     }
 });
 
-async function handleFileUpload(file) {
+async function handleFileUpload(files) {
     const formData = new FormData();
-    formData.append('file', file);
+    files.forEach(file => formData.append('files', file));
 
-    uploadStatus.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processing...';
+    uploadStatus.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Uploading...';
 
     try {
         const response = await apiCall('/process', {
@@ -398,9 +445,30 @@ async function handleFileUpload(file) {
         }
 
         if (data.status === 'success') {
-            uploadStatus.innerHTML = `<i class="fas fa-check-circle"></i> Indexed.`;
-            addMessage('assistant', marked.parse(`**${file.name}** added to the knowledge base.`));
-            loadDocuments();
+            const results = await Promise.all(data.jobs.map(job => pollJob(job.job_id)));
+            const indexed = results.filter(job => job && job.status === 'completed');
+            const failed = results.filter(job => !job || job.status === 'failed');
+
+            const added = indexed.filter(job => !job.skipped);
+            const unchanged = indexed.filter(job => job.skipped);
+            if (added.length > 0) {
+                const names = added.map(job => `**${job.filename}**`).join(', ');
+                addMessage('assistant', marked.parse(`${names} added to the knowledge base.`));
+                loadDocuments();
+            }
+            if (unchanged.length > 0) {
+                const names = unchanged.map(job => `**${job.filename}**`).join(', ');
+                addMessage('assistant', marked.parse(`${names} already indexed and unchanged; skipped.`));
+            }
+            if (failed.length > 0) {
+                const reason = failed[0] ? failed[0].error : 'Processing failed';
+                uploadStatus.innerHTML = `<span style="color: #ff4d4d; font-size: 0.75rem;">Error: ${reason}</span>`;
+            } else {
+                const hits = indexed.reduce((sum, job) => sum + job.cache_hits, 0);
+                const total = indexed.reduce((sum, job) => sum + job.cache_hits + job.cache_misses, 0);
+                const cacheNote = total ? ` (${Math.round(100 * hits / total)}% embedding cache hits)` : '';
+                uploadStatus.innerHTML = `<i class="fas fa-check-circle"></i> Indexed${cacheNote}.`;
+            }
         } else {
             uploadStatus.innerHTML = `<span style="color: #ff4d4d; font-size: 0.75rem;">Error: ${data.detail || data.message || 'Processing failed'}</span>`;
         }
@@ -409,10 +477,28 @@ async function handleFileUpload(file) {
     }
 }
 
+// Poll a background ingestion job until it finishes, mirroring its progress in the upload card
+async function pollJob(jobId) {
+    while (true) {
+        const response = await apiCall(`/jobs/${jobId}`, {
+            headers: getAuthHeaders()
+        });
+        if (!response || !response.ok) return null;
+        const { job } = await response.json();
+
+        if (job.status === 'completed' || job.status === 'failed') return job;
+
+        const counts = job.chunks_total ? ` ${job.chunks_indexed}/${job.chunks_total} chunks` : '';
+        const rate = job.chunks_per_second ? ` (${job.chunks_per_second}/s)` : '';
+        uploadStatus.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${job.filename}: ${job.stage}${counts}${rate}`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 // Handle File Upload via Input
 fileInput.addEventListener('change', () => {
-    const file = fileInput.files[0];
-    if (file) handleFileUpload(file);
+    const files = Array.from(fileInput.files);
+    if (files.length > 0) handleFileUpload(files);
 });
 
 // Handle Sending Messages
@@ -439,41 +525,76 @@ async function sendMessage() {
         formData.append('message', message);
         formData.append('session_id', currentSessionId);
 
-        const response = await apiCall('/chat', {
+        const response = await apiCall('/chat/stream', {
             method: 'POST',
             body: formData,
             headers: getAuthHeaders(true)
         });
-        const data = await response.json();
 
         const thinkingMsg = document.getElementById(thinkingId);
         const contentDiv = thinkingMsg.querySelector('.content');
 
-        if (data.status === 'success') {
-            contentDiv.innerHTML = marked.parse(data.response);
-
-            if (data.sources && data.sources.length > 0) {
-                const sourcesDiv = document.createElement('div');
-                sourcesDiv.className = 'sources-container';
-                data.sources.forEach(source => {
-                    const badge = document.createElement('span');
-                    badge.className = 'source-badge';
-                    badge.textContent = source;
-                    sourcesDiv.appendChild(badge);
-                });
-                contentDiv.appendChild(sourcesDiv);
-            }
-            // Title might have changed, reload sessions
-            loadSessions();
-        } else {
+        // Non-streamed responses are errors (503 warming up, 404 session, ...)
+        if (!response.ok) {
+            const data = await response.json();
             contentDiv.innerHTML = `<span style="color: #ff4d4d;">Error: ${data.message || data.detail || 'Processing failed'}</span>`;
+            return;
         }
+
+        let answer = '';
+        let sources = [];
+        await readEventStream(response, (event) => {
+            if (event.type === 'sources') {
+                sources = event.sources;
+            } else if (event.type === 'token') {
+                answer += event.content;
+                contentDiv.innerHTML = marked.parse(answer);
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            } else if (event.type === 'error') {
+                contentDiv.innerHTML = `<span style="color: #ff4d4d;">Error: ${event.message}</span>`;
+            } else if (event.type === 'done') {
+                if (sources.length > 0) {
+                    const sourcesDiv = document.createElement('div');
+                    sourcesDiv.className = 'sources-container';
+                    sources.forEach(source => {
+                        const badge = document.createElement('span');
+                        badge.className = 'source-badge';
+                        badge.textContent = source;
+                        sourcesDiv.appendChild(badge);
+                    });
+                    contentDiv.appendChild(sourcesDiv);
+                }
+                // Title might have changed, reload sessions
+                loadSessions();
+            }
+        });
     } catch (error) {
         const msg = document.getElementById(thinkingId);
         if (msg) msg.querySelector('.content').innerHTML = 'The connection to VANT AI failed.';
     }
 }
 
+// Parse a server-sent event stream from a fetch() response (EventSource can't send POST bodies or auth headers)
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const data = frame.split('\n').filter(line => line.startsWith('data:')).map(line => line.slice(5).trim()).join('');
+            if (data) onEvent(JSON.parse(data));
+        }
+    }
+}
+
 sendBtn.addEventListener('click', sendMessage);
 userInput.addEventListener('keydown', (e) => {
     if (e.key === 'Enter' && !e.shiftKey) {
@@ -483,7 +604,7 @@ userInput.addEventListener('keydown', (e) => {
 });
 
 // Add Message to DOM
-function addMessage(role, content, id = null) {
+function createMessageElement(role, content, id = null) {
     const div = document.createElement('div');
     div.className = `message ${role}`;
     if (id) div.id = id;
@@ -493,7 +614,11 @@ function addMessage(role, content, id = null) {
     contentDiv.innerHTML = content;
 
     div.appendChild(contentDiv);
-    chatContainer.appendChild(div);
+    return div;
+}
+
+function addMessage(role, content, id = null) {
+    chatContainer.appendChild(createMessageElement(role, content, id));
     chatContainer.scrollTop = chatContainer.scrollHeight;
 }
 
@@ -0,0 +1,98 @@
+"""
+VANT AI: Map-Reduce Document Summarizer
+Summarizes every chunk of a document instead of a truncated prefix: consecutive chunks are
+packed into token-bounded groups, summarized with bounded concurrency, and the partial
+summaries are merged (in more rounds if they don't fit one call) into the final bullets.
+Every LLM call retries on rate limits, and async calls each take one of the caller's LLM slots.
+"""
+import asyncio
+from typing import List, Optional
+
+from langchain_core.runnables import RunnableLambda
+
+import metrics
+from prompts import SUMMARIZATION_PROMPT_TEMPLATE, SUMMARY_MAP_PROMPT, SUMMARY_COMBINE_PROMPT, SUMMARY_REDUCE_PROMPT
+from retry import acall_with_retry, call_with_retry
+from tokens import estimate_tokens
+
+
+def pack_groups(texts: List[str], group_tokens: int) -> List[str]:
+    """Join consecutive texts into groups of at most `group_tokens` (a single longer text forms its own group)."""
+    groups, current, used = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and used + tokens > group_tokens:
+            groups.append("\n".join(current))
+            current, used = [], 0
+        current.append(text)
+        used += tokens
+    if current: groups.append("\n".join(current))
+    return groups
+
+
+class DocumentSummarizer:
+    """
+    Hierarchical summaries with at most `max_concurrency` LLM calls in flight (and, for
+    asummarize, each inside one of `llm_slots`, the server-wide LLM concurrency cap).
+    Documents that fit in one group take a single call, as before.
+    """
+    def __init__(self, group_tokens: int = 3000, max_concurrency: int = 4):
+        self.group_tokens = group_tokens
+        self.max_concurrency = max_concurrency
+
+    def summarize(self, llm, texts: List[str]) -> str:
+        groups = pack_groups(texts, self.group_tokens)
+        if len(groups) == 1:
+            return self._invoke(llm, SUMMARIZATION_PROMPT_TEMPLATE.format(content=groups[0]))
+
+        with metrics.timer("summary_map"):
+            partials = self._batch(llm, self._map_prompts(groups))
+        with metrics.timer("summary_reduce"):
+            while True:
+                groups = self._merge_groups(partials)
+                if len(groups) == 1: break
+                partials = self._batch(llm, [SUMMARY_COMBINE_PROMPT.format(summaries=g) for g in groups])
+            return self._invoke(llm, SUMMARY_REDUCE_PROMPT.format(summaries=groups[0]))
+
+    async def asummarize(self, llm, texts: List[str], llm_slots: Optional[asyncio.Semaphore] = None) -> str:
+        groups = pack_groups(texts, self.group_tokens)
+        if len(groups) == 1:
+            return await self._ainvoke(llm, SUMMARIZATION_PROMPT_TEMPLATE.format(content=groups[0]), llm_slots)
+
+        with metrics.timer("summary_map"):
+            partials = await self._abatch(llm, self._map_prompts(groups), llm_slots)
+        with metrics.timer("summary_reduce"):
+            while True:
+                groups = self._merge_groups(partials)
+                if len(groups) == 1: break
+                partials = await self._abatch(llm, [SUMMARY_COMBINE_PROMPT.format(summaries=g) for g in groups], llm_slots)
+            return await self._ainvoke(llm, SUMMARY_REDUCE_PROMPT.format(summaries=groups[0]), llm_slots)
+
+    def _merge_groups(self, partials: List[str]) -> List[str]:
+        groups = pack_groups(partials, self.group_tokens)
+        if len(groups) == len(partials) > 1:  # Partials too long to pack: merge pairwise so every round shrinks
+            groups = ["\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+        return groups
+
+    @staticmethod
+    def _map_prompts(groups: List[str]) -> List[str]:
+        return [SUMMARY_MAP_PROMPT.format(part=i + 1, parts=len(groups), content=g) for i, g in enumerate(groups)]
+
+    @staticmethod
+    def _invoke(llm, prompt: str) -> str:
+        return call_with_retry(lambda: llm.invoke(prompt)).content
+
+    @staticmethod
+    async def _ainvoke(llm, prompt: str, llm_slots: Optional[asyncio.Semaphore]) -> str:
+        return (await acall_with_retry(lambda: llm.ainvoke(prompt), llm_slots)).content
+
+    def _batch(self, llm, prompts: List[str]) -> List[str]:
+        return RunnableLambda(lambda prompt: self._invoke(llm, prompt)).batch(prompts, config={"max_concurrency": self.max_concurrency})
+
+    async def _abatch(self, llm, prompts: List[str], llm_slots: Optional[asyncio.Semaphore]) -> List[str]:
+        limit = asyncio.Semaphore(self.max_concurrency)
+
+        async def one(prompt):
+            async with limit:  # Held through rate-limit backoff, like the batch path
+                return await self._ainvoke(llm, prompt, llm_slots)
+        return list(await asyncio.gather(*(one(p) for p in prompts)))
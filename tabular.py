@@ -0,0 +1,358 @@
+"""
+VANT AI: Columnar Table Store
+Keeps ingested CSV/XLSX sheets as Parquet files next to the vector store and answers
+aggregate/filter questions with vectorized pandas operations, so the LLM only reads
+the result rows instead of hundreds of text chunks.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from file_lock import file_lock
+
+# pandas/pyarrow are imported on first use so server startup doesn't pay for them
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+MAX_RESULT_ROWS = 50  # Rows handed to the LLM from a structured query
+NUMERIC_COLUMN_RATIO = 0.9  # Share of non-empty cells that must parse as numbers for a numeric column
+
+# Cheap router: only questions that ask for an aggregation/filter AND name one of the tenant's
+# tables or columns (TableStore.mentioned_in) pay for the planner call
+TABULAR_QUESTION_PATTERN = re.compile(
+    r"\b(how many|count|total|sum|average|avg|mean|median|max(imum)?|min(imum)?|highest|lowest|largest|smallest|"
+    r"top \d+|bottom \d+|greater than|less than|more than|fewer than|group(ed)? by)\b",
+    re.IGNORECASE,
+)
+
+AGGREGATIONS = {"sum", "mean", "min", "max", "count", "median", "nunique"}
+NUMERIC_AGGREGATIONS = {"sum", "mean", "min", "max", "median"}  # Meaningless (or string concatenation) on text
+FILTER_OPS = {"==", "!=", ">", ">=", "<", "<=", "contains", "in"}
+
+
+def looks_tabular(question: str) -> bool:
+    return bool(TABULAR_QUESTION_PATTERN.search(question))
+
+
+def _words(text: str) -> str:
+    """Lower-case words only, so "unit_price" matches "unit price?"."""
+    return " ".join(re.sub(r"[\W_]+", " ", text).lower().split())
+
+
+def validate_plan(plan) -> dict:
+    """Check the planner's JSON has the shapes execute() relies on; raises ValueError otherwise."""
+    def names(value, field):
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"{field} must be a list of column names")
+
+    if not isinstance(plan, dict): raise ValueError("plan must be a JSON object")
+    if not isinstance(plan.get("table"), str): raise ValueError("table must be a string")
+    names(plan.get("group_by") or [], "group_by")
+    names(plan.get("columns") or [], "columns")
+    for field, keys in (("filters", ("column", "op")), ("aggregations", ("func",))):
+        items = plan.get(field) or []
+        if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+            raise ValueError(f"{field} must be a list of objects")
+        for item in items:
+            if field == "filters" and not isinstance(item.get("column"), str): raise ValueError("each filter needs a column")
+            if any(k in item and not isinstance(item[k], str) for k in keys + ("column",)):
+                raise ValueError(f"{field} entries must use strings for {', '.join(keys)} and column")
+    sort_by = plan.get("sort_by") or {}
+    if not isinstance(sort_by, dict) or ("column" in sort_by and not isinstance(sort_by["column"], str)):
+        raise ValueError("sort_by must be an object with a column name")
+    limit = plan.get("limit")
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, (int, float)) or limit < 1):
+        raise ValueError("limit must be a positive number")
+    return plan
+
+
+class TableIngest:
+    """
+    Streams one source's sheets into Parquet files batch by batch.
+    Column types are fixed from the first batch (numeric when most values parse; the stray rest become
+    missing) and later batches are coerced to them, so a stray value can't break the file schema. Nothing becomes visible until `commit()`.
+    """
+    def __init__(self, store: "TableStore", source: str):
+        self.store = store
+        self.source = source
+        self._writers: Dict[str, dict] = {}
+
+    def append(self, sheet: Optional[str], header: list, rows: list):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not rows: return
+        key = sheet or ""
+        columns = self._unique_columns(header)
+        frame = pd.DataFrame([list(r)[:len(columns)] + [None] * (len(columns) - len(r)) for r in rows], columns=columns)
+
+        state = self._writers.get(key)
+        if state is None:
+            numeric = {c: self._is_numeric(frame[c]) for c in columns}
+            frame = self._coerce(frame, numeric)
+            path = self.store._table_path(self.source, key, staging=True)
+            schema = pa.schema([(c, pa.float64() if numeric[c] else pa.string()) for c in columns])
+            state = {
+                "sheet": sheet,
+                "path": path,
+                "numeric": numeric,
+                "schema": schema,
+                "writer": pq.ParquetWriter(path, schema),
+                "rows": 0,
+            }
+            self._writers[key] = state
+        else:
+            frame = self._coerce(frame, state["numeric"])
+
+        state["writer"].write_table(pa.Table.from_pandas(frame, schema=state["schema"], preserve_index=False))
+        state["rows"] += len(frame)
+
+    def commit(self):
+        """Close the Parquet writers and atomically replace any previous tables for this source."""
+        for state in self._writers.values():
+            state["writer"].close()
+        self.store._publish(self.source, [
+            {"sheet": s["sheet"], "staging_path": s["path"], "columns": {c: ("number" if n else "text") for c, n in s["numeric"].items()}, "rows": s["rows"]}
+            for s in self._writers.values()
+        ])
+
+    def abort(self):
+        for state in self._writers.values():
+            try:
+                state["writer"].close()
+            finally:
+                if os.path.exists(state["path"]): os.remove(state["path"])
+
+    @staticmethod
+    def _unique_columns(header: list) -> List[str]:
+        seen, columns = {}, []
+        for i, name in enumerate(header):
+            name = str(name).strip() if name not in (None, "") else f"column_{i + 1}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}_{seen[name]}"
+            else:
+                seen[name] = 0
+            columns.append(name)
+        return columns
+
+    @staticmethod
+    def _is_numeric(series: "pd.Series") -> bool:
+        import pandas as pd
+        values = series.dropna()
+        values = values[values.astype(str).str.strip() != ""]
+        return len(values) > 0 and pd.to_numeric(values, errors="coerce").notna().mean() >= NUMERIC_COLUMN_RATIO
+
+    @staticmethod
+    def _coerce(frame: "pd.DataFrame", numeric: Dict[str, bool]) -> "pd.DataFrame":
+        import numpy as np
+        import pandas as pd
+        out = {}
+        for column, is_numeric in numeric.items():
+            if is_numeric:
+                out[column] = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+            else:
+                out[column] = frame[column].map(lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else str(v)).astype("object")
+        return pd.DataFrame(out)
+
+
+class TableStore:
+    """
+    Catalog of Parquet tables (one per CSV file / XLSX sheet) plus a vectorized query executor.
+    The catalog file is re-read when another process has changed it.
+    """
+    CATALOG_FILE = "catalog.json"
+    LOCK_FILE = "catalog.lock"
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._catalog: Dict[str, dict] = {}
+        self._catalog_mtime = None
+        self._refresh()
+
+    @property
+    def catalog_path(self) -> str:
+        return os.path.join(self.root_dir, self.CATALOG_FILE)
+
+    def _refresh(self):
+        """Reload the catalog if its file changed since it was last read."""
+        try:
+            st = os.stat(self.catalog_path)
+        except FileNotFoundError:
+            return
+        mtime = (st.st_mtime_ns, st.st_size)
+        if mtime == self._catalog_mtime: return
+        with self._lock:
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                self._catalog = json.load(f)
+            self._catalog_mtime = mtime
+
+    def __len__(self):
+        self._refresh()
+        return len(self._catalog)
+
+    def _table_path(self, source: str, sheet: str, staging: bool = False) -> str:
+        digest = hashlib.sha1(f"{source}\x00{sheet}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root_dir, f"{digest}{'.staging' if staging else ''}.parquet")
+
+    @staticmethod
+    def table_name(source: str, sheet: Optional[str]) -> str:
+        return f"{source} / {sheet}" if sheet else source
+
+    # ---------------------------------------------------------
+    # Catalog maintenance
+    # ---------------------------------------------------------
+
+    def ingest(self, source: str) -> TableIngest:
+        return TableIngest(self, source)
+
+    def _publish(self, source: str, tables: List[dict]):
+        with file_lock(os.path.join(self.root_dir, self.LOCK_FILE)):
+            self._refresh()
+            self._publish_locked(source, tables)
+
+    def _publish_locked(self, source: str, tables: List[dict]):
+        with self._lock:
+            self._drop_source(source)
+            for table in tables:
+                path = self._table_path(source, table["sheet"] or "")
+                shutil.move(table["staging_path"], path)
+                self._catalog[self.table_name(source, table["sheet"])] = {
+                    "source": source, "sheet": table["sheet"], "path": path, "columns": table["columns"], "rows": table["rows"],
+                }
+            self._save()
+
+    def remove_source(self, source: str):
+        with file_lock(os.path.join(self.root_dir, self.LOCK_FILE)):
+            self._refresh()
+            with self._lock:
+                if self._drop_source(source): self._save()
+
+    def _drop_source(self, source: str) -> bool:
+        names = [name for name, t in self._catalog.items() if t["source"] == source]
+        for name in names:
+            table = self._catalog.pop(name)
+            if os.path.exists(table["path"]): os.remove(table["path"])
+        return bool(names)
+
+    def _save(self):
+        path = self.catalog_path
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._catalog, f)
+        os.replace(path + ".tmp", path)
+        st = os.stat(path)
+        self._catalog_mtime = (st.st_mtime_ns, st.st_size)
+
+    def describe(self) -> str:
+        """Schema listing for the planner prompt."""
+        self._refresh()
+        lines = []
+        for name, table in self._catalog.items():
+            columns = ", ".join(f"{c} ({t})" for c, t in table["columns"].items())
+            lines.append(f'- "{name}" ({table["rows"]} rows): {columns}')
+        return "\n".join(lines)
+
+    def mentioned_in(self, question: str) -> bool:
+        """Whether the question names one of the tables (file stem or sheet) or their columns."""
+        self._refresh()
+        text = f" {_words(question)} "
+        for table in self._catalog.values():
+            names = [os.path.splitext(table["source"])[0], table["sheet"] or "", *table["columns"]]
+            if any(len(name) > 1 and f" {name} " in text for name in map(_words, names)): return True
+        return False
+
+    # ---------------------------------------------------------
+    # Structured query execution
+    # ---------------------------------------------------------
+
+    def execute(self, plan: dict) -> Optional["pd.DataFrame"]:
+        """
+        Run a planner-produced JSON query (filters, group_by, aggregations, columns, sort_by, limit)
+        with vectorized pandas operations, reading only the referenced Parquet columns.
+        Returns None if the plan doesn't target a known table; raises ValueError on a malformed plan.
+        """
+        validate_plan(plan)
+        self._refresh()
+        table = self._catalog.get(plan.get("table") or "")
+        if table is None: return None
+        schema = table["columns"]
+
+        filters = plan.get("filters") or []
+        group_by = plan.get("group_by") or []
+        aggregations = plan.get("aggregations") or []
+        columns = plan.get("columns") or []
+        sort_by = plan.get("sort_by") or {}
+
+        referenced = set(group_by) | set(columns) | {f.get("column") for f in filters}
+        referenced |= {a.get("column") for a in aggregations if a.get("column") not in (None, "*")}
+        if sort_by.get("column") in schema: referenced.add(sort_by["column"])
+        unknown = referenced - set(schema)
+        if unknown: raise ValueError(f"Unknown columns: {', '.join(sorted(map(str, unknown)))}")
+
+        import numpy as np
+        import pandas as pd
+        df = pd.read_parquet(table["path"], columns=sorted(referenced) or None)
+
+        # 1. Filters as one boolean mask
+        mask = np.ones(len(df), dtype=bool)
+        for f in filters:
+            mask &= self._filter_mask(df[f["column"]], f.get("op", "=="), f.get("value"), schema[f["column"]] == "number")
+        df = df[mask]
+
+        # 2. Aggregations (optionally grouped) or a projection
+        if aggregations:
+            named = {}
+            for a in aggregations:
+                func = a.get("func", "count")
+                if func not in AGGREGATIONS: raise ValueError(f"Unsupported aggregation: {func}")
+                column = a.get("column")
+                if func in NUMERIC_AGGREGATIONS and schema.get(column) != "number":
+                    raise ValueError(f"{func} needs a numeric column, not {column!r}")
+                if column in (None, "*"):
+                    func, column = "size", (group_by[0] if group_by else df.columns[0])
+                named[f"{func}_{column}" if func != "size" else "row_count"] = pd.NamedAgg(column=column, aggfunc=func)
+            if group_by:
+                result = df.groupby(group_by, dropna=False).agg(**named).reset_index()
+            else:
+                result = pd.DataFrame({name: [len(df) if agg.aggfunc == "size" else df[agg.column].agg(agg.aggfunc)] for name, agg in named.items()})
+        else:
+            result = df[columns] if columns else df
+
+        # 3. Ordering and row cap
+        if sort_by.get("column") in result.columns:
+            result = result.sort_values(sort_by["column"], ascending=not sort_by.get("descending", False))
+        limit = min(int(plan.get("limit") or MAX_RESULT_ROWS), MAX_RESULT_ROWS)
+        result = result.head(limit)
+        result.attrs.update({"table": plan["table"], "source": table["source"], "matched_rows": int(mask.sum()), "total_rows": table["rows"]})
+        return result
+
+    @staticmethod
+    def _filter_mask(series: "pd.Series", op: str, value, numeric: bool) -> "np.ndarray":
+        if op not in FILTER_OPS: raise ValueError(f"Unsupported filter: {op}")
+        if op == "contains":
+            return series.astype(str).str.contains(str(value), case=False, na=False, regex=False).to_numpy()
+        if op == "in":
+            values = value if isinstance(value, list) else [value]
+            if numeric: values = [float(v) for v in values]
+            else: values = [str(v) for v in values]
+            return series.isin(values).to_numpy()
+        if numeric:
+            value = float(value)
+        else:
+            series, value = series.fillna("").astype(str), str(value)
+            if op in ("==", "!="):
+                # Text equality is case-insensitive so "north" matches "North"
+                series, value = series.str.lower(), value.lower()
+        comparisons = {
+            "==": series == value, "!=": series != value,
+            ">": series > value, ">=": series >= value,
+            "<": series < value, "<=": series <= value,
+        }
+        return comparisons[op].fillna(False).to_numpy(dtype=bool)
@@ -0,0 +1,145 @@
+"""
+VANT AI: Tenant Stores
+Each workspace (one per user) gets its own Chroma collection, keyword index and table
+store, so query, listing and delete cost scales with that tenant's corpus instead of the
+whole deployment. Keyword indexes are loaded on first use and evicted when idle.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from file_lock import file_lock
+
+logger = logging.getLogger("VANT-AI")
+
+DEFAULT_COLLECTION = "langchain"  # langchain_chroma's default: the pre-tenancy shared collection
+SOURCE_LOCK_DIR = "source_locks"  # Per-document lock files inside each tenant's root directory
+
+
+class Tenant:
+    """One tenant's stores. `tenant_id` None is the shared workspace that predates tenancy."""
+    def __init__(self, tenant_id: Optional[str], root_dir: str, keyword_index, table_store):
+        self.tenant_id = tenant_id
+        self.root_dir = root_dir
+        self.keyword_index = keyword_index
+        self.table_store = table_store
+        self.vectorstore = None  # Attached by the engine once ChromaDB is loaded
+        self.last_used = time.monotonic()
+        self.active = 0          # In-flight ingestions/deletes; an active tenant is never evicted
+        self.lock = threading.Lock()
+        self._source_locks: Dict[str, list] = {}  # source -> [lock, holders + waiters]; dropped when unused
+
+    @contextmanager
+    def source_lock(self, source: str):
+        """
+        Serialize catalog lookup-replace-put for one document name, across threads and worker processes,
+        so concurrent uploads (or an upload and a delete) of the same name can't orphan each other's chunks.
+        """
+        with self.lock:
+            entry = self._source_locks.setdefault(source, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            lock_dir = os.path.join(self.root_dir, SOURCE_LOCK_DIR)
+            os.makedirs(lock_dir, exist_ok=True)
+            with entry[0], file_lock(os.path.join(lock_dir, hashlib.sha1(source.encode("utf-8")).hexdigest() + ".lock")):
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]: del self._source_locks[source]
+
+    @property
+    def collection_name(self) -> str:
+        if self.tenant_id is None: return DEFAULT_COLLECTION
+        # Chroma names allow [a-zA-Z0-9._-] only; hash anything else
+        safe = "".join(c if c.isalnum() or c in "._-" else "-" for c in self.tenant_id)
+        return f"tenant-{safe}" if safe == self.tenant_id else f"tenant-{hashlib.sha1(self.tenant_id.encode('utf-8')).hexdigest()}"
+
+
+class TenantRegistry:
+    """
+    Lazily opens tenants via `open_tenant(tenant_id, root_dir)` and keeps at most `max_loaded`
+    in memory, evicting the least recently used idle ones (and any unused for `idle_seconds`).
+    """
+    def __init__(self, open_tenant: Callable, shared_dir: str, tenants_dir: str, idle_seconds: float = 900, max_loaded: int = 64):
+        self.open_tenant = open_tenant
+        self.shared_dir = shared_dir
+        self.tenants_dir = tenants_dir
+        self.idle_seconds = idle_seconds
+        self.max_loaded = max_loaded
+        self._tenants: "OrderedDict[Optional[str], Tenant]" = OrderedDict()
+        self._opening: Dict[Optional[str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def root_dir(self, tenant_id: Optional[str]) -> str:
+        if tenant_id is None: return self.shared_dir
+        return os.path.join(self.tenants_dir, hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:24])
+
+    def get(self, tenant_id: Optional[str]) -> Tenant:
+        """Return the tenant's stores, loading them on first use."""
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._touch(tenant)
+                self._evict()
+                return tenant
+            opening = self._opening.setdefault(tenant_id, threading.Lock())
+
+        # Load outside the registry lock so one tenant's index load doesn't stall the others
+        with opening:
+            with self._lock:
+                tenant = self._tenants.get(tenant_id)
+            if tenant is None:
+                start = time.perf_counter()
+                tenant = self.open_tenant(tenant_id, self.root_dir(tenant_id))
+                logger.info(f"Loaded tenant {tenant_id or '(shared)'} in {time.perf_counter() - start:.2f}s")
+                with self._lock:
+                    self._tenants[tenant_id] = tenant
+                    self._opening.pop(tenant_id, None)
+                    self._touch(tenant)
+                    self._evict()
+            else:
+                with self._lock:
+                    self._touch(tenant)
+            return tenant
+
+    @contextmanager
+    def use(self, tenant_id: Optional[str]):
+        """Pin a tenant for the duration of a write so it can't be evicted (and reloaded stale) mid-way."""
+        while True:
+            tenant = self.get(tenant_id)
+            with self._lock:
+                # Evicted between get() and here: reload rather than pin a detached copy
+                if self._tenants.get(tenant_id) is tenant:
+                    tenant.active += 1
+                    break
+        try:
+            yield tenant
+        finally:
+            with self._lock:
+                tenant.active -= 1
+                tenant.last_used = time.monotonic()
+
+    def loaded(self) -> List[Tenant]:
+        with self._lock:
+            return list(self._tenants.values())
+
+    def _touch(self, tenant: Tenant):
+        tenant.last_used = time.monotonic()
+        # An eviction since the caller looked it up may already have dropped it; use() reloads in that case
+        if self._tenants.get(tenant.tenant_id) is tenant: self._tenants.move_to_end(tenant.tenant_id)
+
+    def _evict(self):
+        """Drop idle tenants past the idle timeout, then the least recently used past `max_loaded` (registry lock held)."""
+        now = time.monotonic()
+        for tenant_id, tenant in list(self._tenants.items()):
+            over_capacity = len(self._tenants) > self.max_loaded
+            if tenant.active or not (over_capacity or now - tenant.last_used > self.idle_seconds): continue
+            del self._tenants[tenant_id]
+            self.evictions += 1
@@ -0,0 +1,11 @@
+"""
+VANT AI: Token Estimation
+Cheap, dependency-free token counts for budgeting prompts. Llama-family tokenizers
+average roughly four characters of English text per token.
+"""
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of LLM tokens in `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
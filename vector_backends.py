@@ -0,0 +1,355 @@
+"""
+VANT AI: Vector Backends
+Chunk vectors are written, searched and deleted through one of two interchangeable backends
+(VECTOR_BACKEND): a ChromaDB collection, or a quantized index that keeps int8/float16 codes in
+memory-mapped files with an IVF coarse index and optional exact re-scoring, so a large corpus
+needs a fraction of the memory. Both return (ids, documents or None, embeddings) from search;
+the quantized backend stores no text, so the engine takes documents from the keyword index.
+"""
+import json
+import logging
+import mmap
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from file_lock import file_lock
+
+logger = logging.getLogger("VANT-AI")
+
+
+class ChromaVectors:
+    """Backend over one langchain_chroma collection; hits come back with their documents."""
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+
+    def __len__(self):
+        return self.vectorstore._collection.count()
+
+    def add(self, ids: List[str], vectors: list, chunks: list):
+        self.vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[c.page_content for c in chunks],
+            metadatas=[c.metadata for c in chunks],
+        )
+
+    def search(self, query_vector: list, k: int):
+        from langchain_core.documents import Document
+        result = self.vectorstore._collection.query(query_embeddings=[query_vector], n_results=k, include=["documents", "metadatas", "embeddings"])
+        ids = result["ids"][0]
+        docs = [Document(page_content=text, metadata=meta or {}) for text, meta in zip(result["documents"][0], result["metadatas"][0])]
+        embeddings = np.asarray(result["embeddings"][0], dtype=np.float32).reshape(len(ids), -1 if ids else len(query_vector))
+        return ids, docs, embeddings
+
+    def delete(self, ids: List[str]):
+        self.vectorstore.delete(ids=ids)
+
+    def get(self, **kwargs):
+        """Raw collection pages (used to build a keyword index for stores that predate it)."""
+        return self.vectorstore.get(**kwargs)
+
+
+# ---------------------------------------------------------
+# Quantized, memory-mapped backend
+# ---------------------------------------------------------
+
+def kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (unit vectors, dot-product assignment); returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]  # Re-seed empty clusters
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class QuantizedVectors:
+    """
+    Unit-normalized vectors stored as int8 (per-row scale) or float16 codes in append-only files
+    that are memory-mapped for search, so only the pages a query touches need to be resident.
+
+    Until `ivf_min_rows` rows exist, queries scan every code. Past that, rows are clustered into
+    ~sqrt(rows) inverted lists (retrained each time the index grows 4x) and queries scan the
+    `nprobe` nearest lists. With `rescore`, float32 copies are kept on disk and the best
+    `rescore_factor * k` candidates are re-ranked exactly.
+
+    Deletes clear a row's alive flag; dead rows are dropped once they are half the file.
+    Like the keyword index, several processes can share a directory: writers hold a file
+    lock and readers pick up new rows (or a rebuilt file generation) from meta.json.
+    """
+    META_FILE = "meta.json"
+    IDS_FILE = "ids.txt"
+    LOCK_FILE = "lock"
+    SCAN_BLOCK_ROWS = 65536  # Codes dequantized per block during a scan (bounds the float32 temporary)
+
+    def __init__(self, index_dir: str, dtype: str = "int8", rescore: bool = True, nprobe: int = 16,
+                 ivf_min_rows: int = 20_000, rescore_factor: int = 4):
+        if dtype not in ("int8", "float16"): raise ValueError(f"Unsupported quantized dtype: {dtype}")
+        self.index_dir = index_dir
+        self.nprobe = nprobe
+        self.ivf_min_rows = ivf_min_rows
+        self.rescore_factor = rescore_factor
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+        self._meta = {"dim": None, "dtype": dtype, "rescore": rescore, "rows": 0, "generation": 0, "trained_rows": 0}
+        self._ids: List[str] = []
+        self._ids_offset = 0
+        self._arrays = {}
+        self._lists = None
+        self._seen = None
+        with file_lock(self._path(self.LOCK_FILE), shared=True):
+            self._catch_up()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def __len__(self):
+        self.refresh()
+        with self._lock:
+            rows = self._meta["rows"]
+            return int(np.count_nonzero(self._arrays["alive"][:rows])) if rows else 0
+
+    # ---------------------------------------------------------
+    # Mutations
+    # ---------------------------------------------------------
+
+    def add(self, ids: List[str], vectors: list, chunks: Optional[list] = None):
+        """Append vectors under fresh chunk ids (`chunks` is unused: text lives in the keyword index)."""
+        if not ids: return
+        full = np.asarray(vectors, dtype=np.float32)
+        full /= np.maximum(np.linalg.norm(full, axis=1, keepdims=True), 1e-12)
+        with self._lock, file_lock(self._path(self.LOCK_FILE)):
+            self._catch_up()
+            meta = self._meta
+            if meta["dim"] is None: meta["dim"] = full.shape[1]
+            codes, scales = self._quantize(full)
+            assign = np.full(len(ids), -1, dtype=np.int32)
+            if os.path.exists(self._path("centroids.npy")):
+                assign = self._nearest_lists(np.load(self._path("centroids.npy")), full)
+
+            self._discard_partial_append()
+            self._append("codes.bin", codes)
+            if scales is not None: self._append("scales.bin", scales)
+            if meta["rescore"]: self._append("full.bin", full)
+            self._append("assign.bin", assign)
+            self._append("alive.bin", np.ones(len(ids), dtype=np.uint8))
+            with open(self._path(self.IDS_FILE), "a", encoding="utf-8") as f:
+                f.write("".join(f"{i}\n" for i in ids))
+                self._ids_offset = f.tell()
+            self._ids.extend(ids)
+            meta["rows"] += len(ids)
+
+            if meta["rows"] >= self.ivf_min_rows and meta["rows"] >= 4 * meta["trained_rows"]:
+                self._train()  # Rewrites the coarse index and bumps the generation
+            self._write_meta()
+
+    def delete(self, ids: List[str]):
+        wanted = set(ids)
+        with self._lock, file_lock(self._path(self.LOCK_FILE)):
+            self._catch_up()
+            rows = [row for row, chunk_id in enumerate(self._ids) if chunk_id in wanted]
+            if not rows: return
+            alive = np.memmap(self._path("alive.bin"), dtype=np.uint8, mode="r+", shape=(self._meta["rows"],))
+            alive[rows] = 0
+            alive.flush()
+            del alive
+            dead = self._meta["rows"] - int(np.count_nonzero(self._arrays["alive"][:self._meta["rows"]]))
+            if dead * 2 > self._meta["rows"]:
+                self._compact()
+            self._write_meta()
+
+    def _discard_partial_append(self):
+        """Cut off bytes a crashed writer appended past meta.json's row count, so new rows stay aligned."""
+        rows, dim = self._meta["rows"], self._meta["dim"]
+        row_bytes = {"codes.bin": dim * (1 if self._meta["dtype"] == "int8" else 2), "scales.bin": 4, "full.bin": dim * 4, "assign.bin": 4, "alive.bin": 1}
+        for name, size in [(name, rows * width) for name, width in row_bytes.items()] + [(self.IDS_FILE, self._ids_offset)]:
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > size: os.truncate(path, size)
+
+    def _append(self, name: str, array: np.ndarray):
+        with open(self._path(name), "ab") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    def _quantize(self, full: np.ndarray):
+        if self._meta["dtype"] == "float16": return full.astype(np.float16), None
+        scales = np.maximum(np.abs(full).max(axis=1), 1e-12) / 127.0
+        codes = np.clip(np.rint(full / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    # The readers below take the arrays and meta explicitly: search() works on a snapshot taken under
+    # the lock, since a concurrent compaction or retrain remaps self._arrays and renumbers rows.
+
+    @staticmethod
+    def _dequantize(arrays: dict, meta: dict, rows: np.ndarray) -> np.ndarray:
+        codes = arrays["codes"][rows].astype(np.float32)
+        if meta["dtype"] == "int8": codes *= arrays["scales"][rows][:, None]
+        return codes
+
+    @staticmethod
+    def _approximate_scores(arrays: dict, meta: dict, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Dot products on the codes; int8 row scales are applied to the scores, not the vectors."""
+        scores = arrays["codes"][rows].astype(np.float32) @ query
+        if meta["dtype"] == "int8": scores *= arrays["scales"][rows]
+        return scores
+
+    @classmethod
+    def _exact(cls, arrays: dict, meta: dict, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(arrays["full"][rows]) if meta["rescore"] else cls._dequantize(arrays, meta, rows)
+
+    def _train(self):
+        """(Re)build the IVF coarse index from a sample of live rows and reassign every row (file lock held)."""
+        self._map_arrays()
+        rows = self._meta["rows"]
+        live = np.flatnonzero(self._arrays["alive"][:rows])
+        n_lists = max(1, int(2 * np.sqrt(len(live))))  # sqrt of the size at the next retrain (4x), so lists stay ~sqrt(rows)
+        rng = np.random.default_rng(self._meta["generation"])
+        sample = np.sort(rng.choice(live, min(len(live), 64 * n_lists), replace=False))
+        centroids = kmeans(self._exact(self._arrays, self._meta, sample), n_lists)
+        assign = np.concatenate([
+            self._nearest_lists(centroids, self._exact(self._arrays, self._meta, np.arange(start, min(start + self.SCAN_BLOCK_ROWS, rows))))
+            for start in range(0, rows, self.SCAN_BLOCK_ROWS)
+        ])
+        self._replace("assign.bin", assign)
+        np.save(self._path("centroids.tmp.npy"), centroids)
+        os.replace(self._path("centroids.tmp.npy"), self._path("centroids.npy"))
+        self._meta["trained_rows"] = len(live)
+        self._meta["generation"] += 1
+        logger.info(f"Vector index trained: {n_lists} lists over {len(live)} rows ({self.index_dir})")
+
+    def _compact(self):
+        """Rewrite every file without dead rows (file lock held)."""
+        self._map_arrays()
+        keep = np.flatnonzero(self._arrays["alive"][:self._meta["rows"]])
+        for name, key in (("codes.bin", "codes"), ("scales.bin", "scales"), ("full.bin", "full"), ("assign.bin", "assign")):
+            if key in self._arrays: self._replace(name, np.asarray(self._arrays[key][keep]))
+        self._replace("alive.bin", np.ones(len(keep), dtype=np.uint8))
+        ids = [self._ids[row] for row in keep]
+        with open(self._path(self.IDS_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            f.write("".join(f"{i}\n" for i in ids))
+        os.replace(self._path(self.IDS_FILE + ".tmp"), self._path(self.IDS_FILE))
+        self._ids, self._ids_offset = ids, os.path.getsize(self._path(self.IDS_FILE))
+        self._meta["rows"] = len(keep)
+        self._meta["generation"] += 1
+
+    def _replace(self, name: str, array: np.ndarray):
+        with open(self._path(name + ".tmp"), "wb") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(self._path(name + ".tmp"), self._path(name))
+
+    def _write_meta(self):
+        with open(self._path(self.META_FILE + ".tmp"), "w") as f:
+            json.dump(self._meta, f)
+        os.replace(self._path(self.META_FILE + ".tmp"), self._path(self.META_FILE))
+        self._map_arrays()
+        self._seen = self._signature()
+
+    @staticmethod
+    def _nearest_lists(centroids: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+    # ---------------------------------------------------------
+    # Search
+    # ---------------------------------------------------------
+
+    def search(self, query_vector: list, k: int):
+        """Top-k (ids, None, unit embeddings) by cosine similarity, best first."""
+        self.refresh()
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:  # Snapshot: nothing below reads self._arrays or self._meta
+            rows, ids, lists = self._meta["rows"], self._ids, self._inverted_lists()
+            arrays, meta, centroids = dict(self._arrays), dict(self._meta), self._arrays.get("centroids")
+        if not rows: return [], None, np.zeros((0, len(query)), dtype=np.float32)
+
+        # 1. Candidate rows: the nearest inverted lists, or everything while the index is small
+        if centroids is not None and lists is not None:
+            order, bounds = lists
+            probe = np.argsort(-(centroids @ query))[:self.nprobe]
+            candidates = np.sort(np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probe]))
+        else:
+            candidates = np.arange(rows)
+        candidates = candidates[arrays["alive"][candidates].astype(bool)]
+        if not len(candidates): return [], None, np.zeros((0, len(query)), dtype=np.float32)
+
+        # 2. Approximate scores over the quantized codes, block by block
+        scores = np.empty(len(candidates), dtype=np.float32)
+        for start in range(0, len(candidates), self.SCAN_BLOCK_ROWS):
+            block = candidates[start:start + self.SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = self._approximate_scores(arrays, meta, block, query)
+
+        # 3. Keep the best few (more when re-scoring), then optionally re-rank them on float32 vectors
+        keep = min(len(candidates), k * self.rescore_factor if meta["rescore"] else k)
+        best = np.argpartition(-scores, keep - 1)[:keep] if keep < len(candidates) else np.arange(len(candidates))
+        rows_kept = candidates[best]
+        embeddings = self._exact(arrays, meta, rows_kept)
+        exact = embeddings @ query if meta["rescore"] else scores[best]
+        top = np.argsort(-exact)[:k]
+        return [ids[row] for row in rows_kept[top]], None, embeddings[top]
+
+    # ---------------------------------------------------------
+    # Cross-process refresh
+    # ---------------------------------------------------------
+
+    def _signature(self):
+        try:
+            st = os.stat(self._path(self.META_FILE))
+            return st.st_size, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Pick up rows other processes wrote since the last call (one stat() when nothing changed)."""
+        if self._signature() == self._seen: return
+        with self._lock, file_lock(self._path(self.LOCK_FILE), shared=True):
+            self._catch_up()
+
+    def _catch_up(self):
+        """Load meta.json and any new ids; a new generation (retrain/compaction) re-reads every id (file lock held)."""
+        signature = self._signature()
+        if signature is None or signature == self._seen: return
+        with open(self._path(self.META_FILE), "r") as f:
+            meta = json.load(f)
+        if meta["generation"] != self._meta["generation"]:
+            self._ids, self._ids_offset = [], 0
+        with open(self._path(self.IDS_FILE), "r", encoding="utf-8") as f:
+            f.seek(self._ids_offset)
+            while len(self._ids) < meta["rows"]:
+                self._ids.append(f.readline().rstrip("\n"))
+            self._ids_offset = f.tell()
+        self._meta = meta
+        self._map_arrays()
+        self._seen = signature
+
+    def _map_arrays(self):
+        """Memory-map the first `rows` rows of every file (inverted lists are rebuilt on the next search)."""
+        meta, rows = self._meta, self._meta["rows"]
+        self._arrays, self._lists = {}, None
+        if not rows: return
+        dim = meta["dim"]
+        mapped = lambda name, dtype, shape: np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+        self._arrays["codes"] = mapped("codes.bin", np.int8 if meta["dtype"] == "int8" else np.float16, (rows, dim))
+        if meta["dtype"] == "int8": self._arrays["scales"] = mapped("scales.bin", np.float32, (rows,))
+        if meta["rescore"]:
+            self._arrays["full"] = mapped("full.bin", np.float32, (rows, dim))
+            if hasattr(mmap, "MADV_RANDOM"):  # Re-scoring reads scattered rows: skip readahead so they don't pull the whole file into memory
+                self._arrays["full"]._mmap.madvise(mmap.MADV_RANDOM)
+        self._arrays["assign"] = mapped("assign.bin", np.int32, (rows,))
+        self._arrays["alive"] = mapped("alive.bin", np.uint8, (rows,))
+        if meta["trained_rows"] and os.path.exists(self._path("centroids.npy")):
+            self._arrays["centroids"] = np.load(self._path("centroids.npy"))
+
+    def _inverted_lists(self):
+        """(rows ordered by list, list start offsets), built lazily so ingest batches don't pay for it."""
+        if self._lists is None and "centroids" in self._arrays:
+            assign = np.asarray(self._arrays["assign"])
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self._arrays["centroids"]) + 1))
+            self._lists = (order, bounds)
+        return self._lists